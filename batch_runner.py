@@ -0,0 +1,158 @@
+import argparse
+import os
+import sys
+
+from container_pool import ContainerPool
+from execution_backends import DockerBackend, NativeBackend, SchedulerBackend
+from job_chain import JobChain
+from job_manager import JobManager
+from openqp_input_generator import OpenQPInputGenerator, parse_input
+from result_cache import ResultCache
+
+
+def parse_sweep(options):
+    """Turn ["basis=3-21g,6-31g*", "nstate=1,2"] into {"basis": [...], "nstate": [...]}."""
+    parameters = {}
+    for option in options or []:
+        name, separator, values = option.partition("=")
+        if not separator or not values:
+            raise ValueError(f"Sweep must look like name=value1,value2: {option}")
+        parameters.setdefault(name.strip(), []).extend(value for value in values.split(",") if value.strip())
+    return parameters
+
+
+BACKENDS = ("docker", "pool", "native", "slurm", "pbs")
+
+
+def make_backend(name, input_paths, max_workers=1, cpus_per_job=None, openqp="openqp", mpi_ranks=1,
+                 local_command=None, scheduler_options=None, poll_interval=15.0):
+    """Execution backend called `name` (one of BACKENDS) for running `input_paths`."""
+    if name == "docker":
+        return DockerBackend()
+    if name == "pool":
+        workspace = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in input_paths])
+        return ContainerPool(max_workers, workspace=workspace, local_command=local_command)
+    if name == "native":
+        return NativeBackend(openqp, mpi_ranks)
+    if name in ("slurm", "pbs"):
+        # The scheduler runs the array; --workers caps how many of its tasks run at once.
+        return SchedulerBackend(name, openqp, cpus_per_task=cpus_per_job or 1, mpi_ranks=mpi_ranks,
+                                directives=scheduler_options, max_running=max_workers if max_workers > 1 else None,
+                                poll_interval=poll_interval)
+    raise ValueError(f"Unknown backend: {name}")
+
+
+def chain_groups(input_paths):
+    """Inputs grouped by the geometry they run on, in their original order."""
+    groups = {}
+    for path in input_paths:
+        with open(path, 'r') as input_file:
+            system = parse_input(input_file.read()).get("input", {}).get("system")
+        groups.setdefault((os.path.dirname(os.path.abspath(path)), system), []).append(path)
+    return list(groups.values())
+
+
+def run_batch(xyz_source, calc_type, output_dir=None, max_workers=1, cpus_per_job=None, submit=True,
+              parameters=None, use_cache=True, backend="docker", backend_options=None, chain=False, echo=print):
+    """Generate inputs for every XYZ file of `xyz_source` and run them through a headless JobManager.
+
+    `parameters` ({name: [values]}) sweeps the template over every combination.
+    Inputs already run with the same geometry and OpenQP build are restored from the result cache.
+    `backend` picks how jobs run (see BACKENDS); `backend_options` go to make_backend.
+    With `chain` the sweep points of each geometry run one after another, each
+    starting from the orbitals of the point before it.
+    Returns the generated input paths and, when submitted, the finished jobs.
+    """
+    generator = OpenQPInputGenerator(None)
+    input_paths = generator.generate_batch(xyz_source, calc_type, output_dir, parameters)
+    echo(f"Wrote {len(input_paths)} input files")
+    if not submit:
+        return input_paths, []
+
+    backend = make_backend(backend, input_paths, max_workers, cpus_per_job, **(backend_options or {}))
+    job_manager = JobManager(None, max_workers=max_workers, cpus_per_job=cpus_per_job,
+                             result_cache=ResultCache() if use_cache else None, backend=backend)
+    finished = []
+
+    def report(job):
+        finished.append(job)
+        echo(f"[{len(finished)}/{len(input_paths)}] {job.name}: {job.status}{' (cached)' if job.cached else ''}")
+
+    chains = []
+    try:
+        if chain:
+            chains = [job_manager.submit_chain(JobChain(paths, on_finished=report), use_cache=use_cache)
+                      for paths in chain_groups(input_paths)]
+            for job_chain in chains:
+                job_chain.join()
+        else:
+            job_manager.wait(job_manager.submit_batch(input_paths, use_cache=use_cache), on_finished=report)
+    except KeyboardInterrupt:
+        echo("Cancelling remaining jobs...")
+        job_manager.cancel_all()
+        for job_chain in chains:
+            job_chain.join()
+        job_manager.wait()
+        raise
+    finally:
+        if isinstance(backend, ContainerPool):
+            backend.stop()
+
+    summary = job_manager.throughput()
+    echo(
+        f"{summary['done']} done, {summary['failed']} failed, {summary['cancelled']} cancelled; "
+        f"{summary['jobs_per_hour']:.1f} jobs/hour"
+    )
+    if len(finished) < len(input_paths):
+        echo(f"{len(input_paths) - len(finished)} inputs not run because an earlier job in their chain failed")
+    return input_paths, finished
+
+
+def main(argv=None):
+    calc_types = list(OpenQPInputGenerator(None).templates)
+    parser = argparse.ArgumentParser(description="Generate and run OpenQP inputs for a set of XYZ files.")
+    parser.add_argument("xyz_source", help="directory of .xyz files or a glob such as 'conformers/*.xyz'")
+    parser.add_argument("--calc-type", default=calc_types[0], choices=calc_types,
+                        help=f"calculation template (default: {calc_types[0]})")
+    parser.add_argument("--sweep", action="append", metavar="NAME=V1,V2",
+                        help="vary an input key over values, e.g. basis=3-21g,6-31g* or scf.conv=1e-6; repeatable")
+    parser.add_argument("--output-dir", help="write inputs here instead of next to each geometry")
+    parser.add_argument("--workers", type=int, default=1, help="jobs to run at the same time")
+    parser.add_argument("--cpus-per-job", type=int, help="cores per job (default: split evenly)")
+    parser.add_argument("--chain", action="store_true",
+                        help="run each geometry's sweep points in order, warm-starting each from the previous one")
+    parser.add_argument("--no-cache", action="store_true", help="always run, ignoring cached results")
+    parser.add_argument("--backend", choices=BACKENDS, default="docker",
+                        help="docker: a container per job; pool: long-lived containers; native: a local openqp; "
+                             "slurm/pbs: one array job (default: docker)")
+    parser.add_argument("--warm-pool", action="store_true", help="same as --backend pool")
+    parser.add_argument("--local-command", metavar="CMD",
+                        help="run the pool locally with this command in place of openqp (for testing)")
+    parser.add_argument("--openqp", default="openqp", help="openqp executable for the native and scheduler backends")
+    parser.add_argument("--mpi-ranks", type=int, default=1, help="MPI ranks per job (native and scheduler backends)")
+    parser.add_argument("--scheduler-option", action="append", metavar="DIRECTIVE",
+                        help="extra #SBATCH/#PBS directive, e.g. --scheduler-option=--partition=short; repeatable")
+    parser.add_argument("--poll-interval", type=float, default=15.0, help="seconds between scheduler status checks")
+    parser.add_argument("--no-submit", action="store_true", help="only write the input files")
+    args = parser.parse_args(argv)
+
+    try:
+        _, jobs = run_batch(args.xyz_source, args.calc_type, args.output_dir, args.workers,
+                            args.cpus_per_job, submit=not args.no_submit, parameters=parse_sweep(args.sweep),
+                            use_cache=not args.no_cache, chain=args.chain,
+                            backend="pool" if args.warm_pool or args.local_command else args.backend,
+                            backend_options={
+                                "openqp": args.openqp, "mpi_ranks": args.mpi_ranks,
+                                "local_command": args.local_command, "scheduler_options": args.scheduler_option,
+                                "poll_interval": args.poll_interval,
+                            })
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 130
+    return 0 if all(job.status == "done" for job in jobs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
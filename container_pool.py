@@ -0,0 +1,189 @@
+import os
+import queue
+import shlex
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+from execution_backends import DOCKER_IMAGE, DockerBackend, ProcessBackend, format_cpuset
+
+RUNNER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "openqp_runner.py")
+CONTAINER_RUNNER = "/opt/openqp_gui/openqp_runner.py"
+CONTAINER_SOCKET = "/tmp/openqp_runner.sock"
+
+
+class PoolSlot:
+    """One resident runner: a long-lived container, or a local process standing in for one."""
+
+    def __init__(self, index: int, name: str, socket_path: str, process: Optional[subprocess.Popen] = None):
+        self.index = index
+        self.name = name
+        self.socket_path = socket_path
+        self.process = process
+
+
+class ContainerPool(ProcessBackend):
+    """Long-lived OpenQP containers that jobs are dispatched to with `docker exec`.
+
+    Each container runs openqp_runner.py, which imports OpenQP once and forks a
+    child per job, so a job pays neither the container start nor the Python
+    import. The workspace is mounted at the same path inside the containers;
+    inputs outside it get a fresh container of their own. With `local_command`
+    (e.g. "python3 fake_openqp.py") the runners are local processes instead,
+    which is useful for testing without Docker.
+    """
+
+    def __init__(self, size: int = 1, image: str = DOCKER_IMAGE, workspace: Optional[str] = None,
+                 local_command=None):
+        self.size = max(1, size)
+        self.image = image
+        self.workspace = os.path.abspath(workspace or os.getcwd())
+        if isinstance(local_command, str):
+            local_command = shlex.split(local_command)
+        self.local_command = local_command
+        self.fallback = DockerBackend(image)
+        self._slots: List[PoolSlot] = []
+        self._free = queue.Queue()
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.ensure_size(self.size)
+        return self
+
+    @property
+    def cache_tag(self) -> str:
+        return self.image
+
+    def scale(self, workers: int):
+        self.ensure_size(workers)
+
+    def launch(self, job, input_dir: str, input_filename: str) -> Dict:
+        """Reserve an idle runner for the job; the client runs the job until its stdin is closed."""
+        if not self.accepts(input_dir):
+            return self.fallback.launch(job, input_dir, input_filename)
+        job.slot = self.acquire()
+        self.pin(job.slot, job.cpus)
+        return {"args": self.command(job.slot, input_dir, input_filename, job.cpus), "stdin": subprocess.PIPE}
+
+    def finish(self, job):
+        if job.slot is None:
+            return
+        if job.process is not None and job.process.stdin is not None:
+            job.process.stdin.close()
+        self.release(job.slot)
+        job.slot = None
+
+    def terminate(self, job):
+        """A pool job shares its container, so only the client is stopped and the runner kills the job."""
+        process = job.process
+        if job.slot is None:
+            self.fallback.terminate(job)
+            return
+        if process is None or process.poll() is not None:
+            return
+        try:
+            process.stdin.close()
+        except (OSError, AttributeError):
+            pass
+        process.terminate()
+
+    def ensure_size(self, size: int):
+        """Start runners until the pool has `size` of them; existing ones are kept."""
+        with self._lock:
+            while len(self._slots) < size:
+                slot = self._start_slot(len(self._slots))
+                self._slots.append(slot)
+                self._free.put(slot)
+            self.size = max(self.size, size)
+
+    def _start_slot(self, index: int) -> PoolSlot:
+        name = f"openqp-pool-{os.getpid()}-{index}"
+        if self.local_command:
+            socket_path = os.path.join(tempfile.gettempdir(), f"{name}.sock")
+            process = subprocess.Popen(
+                [sys.executable, RUNNER_SCRIPT, "serve", "--socket", socket_path, "--no-preload",
+                 *self.local_command],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            return PoolSlot(index, name, socket_path, process)
+
+        subprocess.run(
+            [
+                "docker", "run", "-d", "--rm",
+                "--name", name,
+                "-v", f"{self.workspace}:{self.workspace}",
+                "-v", f"{RUNNER_SCRIPT}:{CONTAINER_RUNNER}:ro",
+                self.image,
+                "python3", "-u", CONTAINER_RUNNER, "serve", "--socket", CONTAINER_SOCKET, "/usr/local/bin/openqp",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            check=True,
+            timeout=300
+        )
+        return PoolSlot(index, name, CONTAINER_SOCKET)
+
+    def accepts(self, input_dir: str) -> bool:
+        """Whether a job in `input_dir` is visible inside the pool's containers."""
+        if self.local_command:
+            return True
+        input_dir = os.path.abspath(input_dir)
+        return os.path.commonpath([self.workspace, input_dir]) == self.workspace
+
+    def acquire(self) -> PoolSlot:
+        """Block until a runner is idle and reserve it."""
+        return self._free.get()
+
+    def release(self, slot: PoolSlot):
+        self._free.put(slot)
+
+    def command(self, slot: PoolSlot, input_dir: str, input_filename: str, cpus: List[int]) -> List[str]:
+        """Client command that runs one input on `slot` and exits with the job's exit code.
+
+        The client ends the job when its stdin is closed, so the job manager
+        keeps a pipe open to it and closes that pipe to cancel.
+        """
+        runner_args = ["run", "--socket", slot.socket_path, "--watch-stdin", "--cwd", os.path.abspath(input_dir)]
+        if cpus:
+            runner_args += ["--env", f"OMP_NUM_THREADS={len(cpus)}"]
+        runner_args.append(input_filename)
+        if self.local_command:
+            return [sys.executable, RUNNER_SCRIPT] + runner_args
+        return ["docker", "exec", "-i", slot.name, "python3", CONTAINER_RUNNER] + runner_args
+
+    def pin(self, slot: PoolSlot, cpus: List[int]):
+        """Limit a container to the cores reserved for its next job."""
+        if self.local_command or not cpus:
+            return
+        try:
+            subprocess.run(
+                ["docker", "update", "--cpus", str(len(cpus)), "--cpuset-cpus", format_cpuset(cpus), slot.name],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=30
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+    def stop(self):
+        """Shut every runner down; the containers remove themselves (--rm)."""
+        with self._lock:
+            slots, self._slots = self._slots, []
+            self._free = queue.Queue()
+        for slot in slots:
+            if slot.process is not None:
+                slot.process.terminate()
+                slot.process.wait()
+                continue
+            try:
+                subprocess.run(
+                    ["docker", "kill", slot.name],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    timeout=30
+                )
+            except (OSError, subprocess.TimeoutExpired):
+                pass
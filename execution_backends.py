@@ -0,0 +1,367 @@
+"""Ways of running an OpenQP input for the JobManager.
+
+A ProcessBackend turns a queued job into a local process whose output the
+job manager streams and whose exit code decides the job's status:
+
+- DockerBackend starts a fresh container per job (the default).
+- NativeBackend runs an `openqp` installed on this machine, optionally
+  under mpirun, with OpenMP threads matched to the job's cores.
+
+container_pool.ContainerPool is a process backend as well.
+
+SchedulerBackend instead writes one SLURM or PBS array script per submitted
+batch; the job manager follows all of its tasks from one thread, asking the
+scheduler about each array once per poll interval.
+"""
+import abc
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+DOCKER_IMAGE = "alireza0027/openqp:fixed"
+
+SCHEDULER_COMMANDS = {
+    "slurm": {
+        "submit": ["sbatch", "--parsable"],
+        "status": ["squeue", "-h", "-r", "-o", "%i %T", "-j"],
+        "cancel": ["scancel"],
+    },
+    "pbs": {
+        "submit": ["qsub"],
+        "status": ["qstat", "-t"],
+        "cancel": ["qdel"],
+    },
+}
+
+# Messages of squeue/qstat for a job that is no longer known, i.e. has finished.
+_FINISHED_MESSAGES = ("Invalid job id", "Unknown Job Id", "Job has finished")
+
+
+def format_cpuset(cpus: List[int]) -> str:
+    """Format core ids the way `docker run --cpuset-cpus` expects, e.g. "0-3,8"."""
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+class ExecutionBackend(abc.ABC):
+    """How a JobManager runs an OpenQP input."""
+
+    # Whether jobs need cores reserved on this machine.
+    local_cpus = True
+    # Whether a running job carries on, writing its log, once the GUI that started it exits.
+    outlives_gui = False
+
+    @property
+    @abc.abstractmethod
+    def cache_tag(self) -> str:
+        """Identifies the OpenQP build in result cache keys."""
+
+    def scale(self, workers: int):
+        """Called before each job with the number of jobs that may run at once."""
+
+    def prepare(self, jobs):
+        """Called once per submission with its jobs, before any of them is queued."""
+
+    def finish(self, job):
+        """Release what the job acquired; called once the job has ended."""
+
+    @abc.abstractmethod
+    def terminate(self, job):
+        """Stop a queued or running job."""
+
+
+class ProcessBackend(ExecutionBackend):
+    """Runs each job as a local process started by a worker thread.
+
+    `launch` returns keyword arguments for the subprocess.Popen that stands
+    for the job; the job manager adds the stdout/stderr pipes.
+    """
+
+    @abc.abstractmethod
+    def launch(self, job, input_dir: str, input_filename: str) -> Dict:
+        """Popen keyword arguments that start the job."""
+
+    def terminate(self, job):
+        process = job.process
+        if process is not None and process.poll() is None:
+            process.terminate()
+
+
+class DockerBackend(ProcessBackend):
+    """One `docker run --rm` container per job."""
+
+    # The container keeps running when its `docker run` client goes away.
+    outlives_gui = True
+
+    def __init__(self, image: str = DOCKER_IMAGE):
+        self.image = image
+
+    @property
+    def cache_tag(self) -> str:
+        return self.image
+
+    def launch(self, job, input_dir: str, input_filename: str) -> Dict:
+        cmd = [
+            "docker", "run",
+            "--rm",
+            "--name", job.container_name,
+            "-v", f"{input_dir}:/data",
+            "-w", "/data",
+        ]
+        if job.cpus:
+            cmd += [
+                "--cpus", str(len(job.cpus)),
+                "--cpuset-cpus", format_cpuset(job.cpus),
+                "-e", f"OMP_NUM_THREADS={len(job.cpus)}",
+            ]
+        cmd += [
+            self.image,
+            "/usr/local/bin/openqp",
+            input_filename
+        ]
+        return {"args": cmd}
+
+    def terminate(self, job):
+        """Kill the container behind a job, then its docker client process."""
+        process = job.process
+        if process is None or process.poll() is not None:
+            return
+        try:
+            subprocess.run(
+                ["docker", "kill", job.container_name],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=30
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        super().terminate(job)
+
+
+class NativeBackend(ProcessBackend):
+    """Run an `openqp` installed on this machine in the input's directory.
+
+    With `mpi_ranks` > 1 it is started through `mpirun -np <ranks>` (extra
+    launcher flags such as "--bind-to none" go in `mpirun_args`), and the
+    job's cores are split into OpenMP threads per rank. The job is confined
+    to its cores with taskset when that is available.
+    """
+
+    def __init__(self, openqp: str = "openqp", mpi_ranks: int = 1, mpirun: str = "mpirun",
+                 mpirun_args: Optional[List[str]] = None):
+        self.openqp = openqp
+        self.mpi_ranks = max(1, mpi_ranks)
+        self.mpirun = mpirun
+        self.mpirun_args = list(mpirun_args or [])
+
+    @property
+    def cache_tag(self) -> str:
+        return f"native:{shutil.which(self.openqp) or self.openqp}"
+
+    def launch(self, job, input_dir: str, input_filename: str) -> Dict:
+        cmd = [self.openqp, input_filename]
+        if self.mpi_ranks > 1:
+            cmd = [self.mpirun, "-np", str(self.mpi_ranks)] + self.mpirun_args + cmd
+        env = dict(os.environ)
+        if job.cpus:
+            env["OMP_NUM_THREADS"] = str(max(1, len(job.cpus) // self.mpi_ranks))
+            if self.mpi_ranks == 1:
+                env.update(OMP_PROC_BIND="close", OMP_PLACES="cores")
+            if shutil.which("taskset"):
+                cmd = ["taskset", "-c", format_cpuset(job.cpus)] + cmd
+        return {"args": cmd, "cwd": input_dir, "env": env}
+
+
+class SchedulerBackend(ExecutionBackend):
+    """Submit each batch of jobs to SLURM or PBS Pro as one array job.
+
+    The array script runs OpenQP in each input's directory, which must be on
+    a file system shared with the compute nodes, and records the exit code in
+    `<job>.exitcode`. The job manager follows the logs and calls `poll`
+    every `poll_interval` seconds with all tasks it is waiting for; cancelling
+    goes through scancel/qdel. `commands` overrides the submit/status/cancel
+    commands, e.g. to go through ssh.
+    """
+
+    local_cpus = False
+    outlives_gui = True
+    # Seconds to wait for a finished task's exit file to reach this node over the shared file system.
+    exit_grace = 60.0
+
+    def __init__(self, scheduler: str = "slurm", openqp: str = "openqp", cpus_per_task: int = 1,
+                 mpi_ranks: int = 1, directives: Optional[List[str]] = None, max_running: Optional[int] = None,
+                 poll_interval: float = 15.0, commands: Optional[Dict[str, List[str]]] = None):
+        if scheduler not in SCHEDULER_COMMANDS:
+            raise ValueError(f"Unknown scheduler: {scheduler}")
+        self.scheduler = scheduler
+        self.openqp = openqp
+        self.cpus_per_task = max(1, cpus_per_task)
+        self.mpi_ranks = max(1, mpi_ranks)
+        self.directives = list(directives or [])
+        self.max_running = max_running
+        self.poll_interval = poll_interval
+        self.commands = dict(SCHEDULER_COMMANDS[scheduler])
+        for name, command in (commands or {}).items():
+            self.commands[name] = shlex.split(command) if isinstance(command, str) else list(command)
+
+    @property
+    def cache_tag(self) -> str:
+        return f"{self.scheduler}:{self.openqp}"
+
+    def array_script(self, input_paths: List[str], output_dir: str) -> str:
+        """Text of an array job script with one task per input."""
+        last = len(input_paths) - 1
+        throttle = f"%{self.max_running}" if self.max_running else ""
+        if self.scheduler == "slurm":
+            header = [
+                "#SBATCH --job-name=openqp-array",
+                f"#SBATCH --array=0-{last}{throttle}",
+                f"#SBATCH --ntasks={self.mpi_ranks}",
+                f"#SBATCH --cpus-per-task={self.cpus_per_task}",
+                f"#SBATCH --output={output_dir}/openqp-array-%A_%a.out",
+            ] + [f"#SBATCH {directive}" for directive in self.directives]
+            index = "SLURM_ARRAY_TASK_ID"
+            launcher = "srun " if self.mpi_ranks > 1 else ""
+        else:
+            header = [
+                "#PBS -N openqp-array",
+                f"#PBS -J 0-{last}{throttle}",
+                f"#PBS -l select=1:ncpus={self.mpi_ranks * self.cpus_per_task}:mpiprocs={self.mpi_ranks}"
+                f":ompthreads={self.cpus_per_task}",
+                "#PBS -j oe",
+                f"#PBS -o {output_dir}/",
+            ] + [f"#PBS {directive}" for directive in self.directives]
+            index = "PBS_ARRAY_INDEX"
+            launcher = f"mpiexec -n {self.mpi_ranks} " if self.mpi_ranks > 1 else ""
+
+        inputs = "".join(f"  {shlex.quote(os.path.abspath(path))}\n" for path in input_paths)
+        return (
+            "#!/bin/bash\n" + "".join(line + "\n" for line in header) + "\n"
+            f"export OMP_NUM_THREADS={self.cpus_per_task}\n"
+            f"INPUTS=(\n{inputs})\n"
+            f'INPUT="${{INPUTS[${index}]}}"\n'
+            'cd "$(dirname "$INPUT")" || exit 1\n'
+            f'{launcher}{shlex.quote(self.openqp)} "$(basename "$INPUT")"\n'
+            "STATUS=$?\n"
+            'echo "$STATUS" > "${INPUT%.inp}.exitcode"\n'
+            'exit "$STATUS"\n'
+        )
+
+    def prepare(self, jobs):
+        """Write and submit the array script for the jobs; each job records its task id."""
+        if not jobs:
+            return
+        output_dir = os.path.dirname(os.path.abspath(jobs[0].input_file_path))
+        script_path = os.path.join(
+            output_dir, f"openqp_array_{time.strftime('%Y%m%d-%H%M%S')}_{jobs[0].job_id}.{self.scheduler}"
+        )
+        with open(script_path, 'w') as script_file:
+            script_file.write(self.array_script([job.input_file_path for job in jobs], output_dir))
+        # Logs are followed from their start, so an old run's log must not be mistaken for this one's.
+        for job in jobs:
+            for stale in (self.exit_file(job), job.log_file_path):
+                if os.path.exists(stale):
+                    os.remove(stale)
+
+        try:
+            result = subprocess.run(
+                self.commands["submit"] + [script_path],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=120
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise ValueError(f"Could not submit {script_path}: {str(e)}")
+        array_id = result.stdout.strip().split(";")[0]
+        if result.returncode != 0 or not array_id:
+            raise ValueError(f"Could not submit {script_path}: {result.stderr.strip() or result.stdout.strip()}")
+        for index, job in enumerate(jobs):
+            job.backend_ref = self.task_id(array_id, index)
+
+    def task_id(self, array_id: str, index: int) -> str:
+        """Scheduler id of one array task: 1234_5 (SLURM) or 1234[5].server (PBS)."""
+        if self.scheduler == "slurm":
+            return f"{array_id}_{index}"
+        return array_id.replace("[]", f"[{index}]", 1)
+
+    def array_id(self, task: str) -> str:
+        """Scheduler id of the array job a task belongs to: 1234 (SLURM) or 1234[].server (PBS)."""
+        if self.scheduler == "slurm":
+            return task.rsplit("_", 1)[0]
+        return re.sub(r"\[\d+\]", "[]", task, count=1)
+
+    @staticmethod
+    def exit_file(job) -> str:
+        return f"{os.path.splitext(os.path.abspath(job.input_file_path))[0]}.exitcode"
+
+    def exit_code(self, job) -> Optional[int]:
+        """Exit code the array script recorded for a job, None while there is none yet."""
+        try:
+            with open(self.exit_file(job), 'r') as file:
+                return int(file.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def is_running(self, state: str) -> bool:
+        return state in ("RUNNING", "COMPLETING") if self.scheduler == "slurm" else state in ("R", "E")
+
+    def poll(self, jobs) -> Dict[str, Optional[str]]:
+        """Current state of every job's task, from one status query per array job.
+
+        A task that has left the queue maps to None; "UNKNOWN" means the
+        scheduler could not be asked.
+        """
+        states = {}
+        arrays: Dict[str, List[str]] = {}
+        for job in jobs:
+            arrays.setdefault(self.array_id(job.backend_ref), []).append(job.backend_ref)
+        for array, tasks in arrays.items():
+            listed = self._array_states(array)
+            for task in tasks:
+                if listed is None:
+                    states[task] = "UNKNOWN"
+                else:
+                    # qstat truncates long ids ("1234[5].serv*"), so compare up to the server name.
+                    states[task] = listed.get(task if self.scheduler == "slurm" else task.split(".")[0])
+        return states
+
+    def _array_states(self, array: str) -> Optional[Dict[str, Optional[str]]]:
+        """{task: state} of the tasks of an array job still in the queue, None if the query failed."""
+        try:
+            result = subprocess.run(self.commands["status"] + [array], stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, text=True, timeout=120)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode != 0 and not any(message in result.stderr for message in _FINISHED_MESSAGES):
+            return None
+        listed = {}
+        for line in result.stdout.splitlines():
+            fields = line.split()
+            if self.scheduler == "slurm" and len(fields) >= 2:
+                listed[fields[0]] = fields[1]
+            elif self.scheduler == "pbs" and len(fields) >= 5:
+                listed[fields[0].split(".")[0]] = None if fields[4] in ("F", "X") else fields[4]
+        return listed
+
+    def terminate(self, job):
+        if job.backend_ref is None:
+            return
+        try:
+            subprocess.run(
+                self.commands["cancel"] + [job.backend_ref],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=60
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            pass
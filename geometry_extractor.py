@@ -1,38 +1,36 @@
+import os
 import re
 from pathlib import Path
 
+OPT_STEP_MARKER = "PyOQP: Geometry Optimization Step"
+CARTESIAN_MARKER = "Cartesian Coordinate in Angstrom"
+
+PERIODIC_TABLE = {
+    1: 'H', 2: 'He', 3: 'Li', 4: 'Be', 5: 'B', 6: 'C', 7: 'N', 8: 'O', 9: 'F', 10: 'Ne',
+    11: 'Na', 12: 'Mg', 13: 'Al', 14: 'Si', 15: 'P', 16: 'S', 17: 'Cl', 18: 'Ar', 19: 'K', 20: 'Ca',
+    21: 'Sc', 22: 'Ti', 23: 'V', 24: 'Cr', 25: 'Mn', 26: 'Fe', 27: 'Co', 28: 'Ni', 29: 'Cu', 30: 'Zn',
+    31: 'Ga', 32: 'Ge', 33: 'As', 34: 'Se', 35: 'Br', 36: 'Kr', 37: 'Rb', 38: 'Sr', 39: 'Y', 40: 'Zr',
+    41: 'Nb', 42: 'Mo', 43: 'Tc', 44: 'Ru', 45: 'Rh', 46: 'Pd', 47: 'Ag', 48: 'Cd', 49: 'In', 50: 'Sn',
+    51: 'Sb', 52: 'Te', 53: 'I', 54: 'Xe', 55: 'Cs', 56: 'Ba', 57: 'La', 58: 'Ce', 59: 'Pr', 60: 'Nd',
+    61: 'Pm', 62: 'Sm', 63: 'Eu', 64: 'Gd'
+}
+
 class GeometryExtractor:
-    def __init__(self, log_file_path):
+    def __init__(self, log_file_path, chunk_size=1 << 20):
         self.log_file_path = log_file_path
+        self.chunk_size = chunk_size
 
     def extract_optimized_geometry(self):
-        geometry_data = []
-        found_geometry = False
-        
         try:
-            with open(self.log_file_path, 'r') as file:
-                lines = file.readlines()
-
-            for i in range(len(lines)-1, -1, -1):
-                line = lines[i]
-                if "PyOQP: Geometry Optimization Step" in line:
-                    found_geometry = True
-                    break
-
-            if not found_geometry:
+            offset = self.find_last_step_offset()
+            if offset is None:
                 raise ValueError("Optimized geometry not found in log file.")
 
-            for j in range(i, len(lines)):
-                line = lines[j]
-                if "Cartesian Coordinate in Angstrom" in line:
-                    j += 2
-                    while j < len(lines) and lines[j].strip():
-                        if "ATOM" in lines[j] or "ZNUC" in lines[j]:
-                            j += 1
-                            continue
-                        geometry_data.append(lines[j].strip())
-                        j += 1
-                    break
+            with open(self.log_file_path, 'rb') as file:
+                file.seek(offset)
+                geometry_data = self.read_cartesian_block(
+                    line.decode('utf-8', errors='replace') for line in file
+                )
 
             xyz_data = self.convert_to_xyz(geometry_data)
             return xyz_data
@@ -40,6 +38,44 @@ class GeometryExtractor:
         except Exception as e:
             raise ValueError(f"Failed to extract geometry: {e}")
 
+    def find_last_step_offset(self):
+        """Scan the log backwards in fixed-size chunks and return the byte offset
+        of the last optimization-step marker, or None if there is none."""
+        marker = OPT_STEP_MARKER.encode()
+        overlap = len(marker) - 1
+
+        with open(self.log_file_path, 'rb') as file:
+            end = file.seek(0, os.SEEK_END)
+            tail = b""
+            while end > 0:
+                start = max(0, end - self.chunk_size)
+                file.seek(start)
+                # Keep the head of the previous chunk so a marker split across
+                # the chunk boundary is still found.
+                window = file.read(end - start) + tail
+                index = window.rfind(marker)
+                if index != -1:
+                    return start + index
+                tail = window[:overlap]
+                end = start
+        return None
+
+    def read_cartesian_block(self, lines):
+        """Collect the atom lines of the first Cartesian block in `lines`."""
+        geometry_data = []
+        lines = iter(lines)
+        for line in lines:
+            if CARTESIAN_MARKER in line:
+                next(lines, None)
+                for line in lines:
+                    if not line.strip():
+                        break
+                    if "ATOM" in line or "ZNUC" in line:
+                        continue
+                    geometry_data.append(line.strip())
+                break
+        return geometry_data
+
     def convert_to_xyz(self, geometry_data):
         atom_lines = [line for line in geometry_data if len(line.split()) >= 5]
         atom_count = len(atom_lines)
@@ -51,27 +87,18 @@ class GeometryExtractor:
                 element = self.get_element_symbol(float(parts[1]))
                 x, y, z = map(float, parts[2:5])
                 xyz_content.append(f"{element:<2} {x:>10.6f} {y:>10.6f} {z:>10.6f}")
-        
+
         return "\n".join(xyz_content)
 
     def get_element_symbol(self, atomic_number):
-        periodic_table = {
-            1: 'H', 2: 'He', 3: 'Li', 4: 'Be', 5: 'B', 6: 'C', 7: 'N', 8: 'O', 9: 'F', 10: 'Ne',
-            11: 'Na', 12: 'Mg', 13: 'Al', 14: 'Si', 15: 'P', 16: 'S', 17: 'Cl', 18: 'Ar', 19: 'K', 20: 'Ca',
-            21: 'Sc', 22: 'Ti', 23: 'V', 24: 'Cr', 25: 'Mn', 26: 'Fe', 27: 'Co', 28: 'Ni', 29: 'Cu', 30: 'Zn',
-            31: 'Ga', 32: 'Ge', 33: 'As', 34: 'Se', 35: 'Br', 36: 'Kr', 37: 'Rb', 38: 'Sr', 39: 'Y', 40: 'Zr',
-            41: 'Nb', 42: 'Mo', 43: 'Tc', 44: 'Ru', 45: 'Rh', 46: 'Pd', 47: 'Ag', 48: 'Cd', 49: 'In', 50: 'Sn',
-            51: 'Sb', 52: 'Te', 53: 'I', 54: 'Xe', 55: 'Cs', 56: 'Ba', 57: 'La', 58: 'Ce', 59: 'Pr', 60: 'Nd',
-            61: 'Pm', 62: 'Sm', 63: 'Eu', 64: 'Gd'
-        }
-        return periodic_table.get(int(atomic_number), "X")
+        return PERIODIC_TABLE.get(int(atomic_number), "X")
 
     def save_optimized_geometry(self, job_name):
         xyz_data = self.extract_optimized_geometry()
         file_name = f"{job_name}_opt_geo.xyz"
         save_path = Path(file_name)
-        
+
         with open(save_path, 'w') as xyz_file:
             xyz_file.write(xyz_data)
-        
+
         return save_path
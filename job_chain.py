@@ -0,0 +1,105 @@
+import os
+import re
+import threading
+from typing import Callable, List, Optional
+
+from geometry_extractor import GeometryExtractor
+from openqp_input_generator import parse_input, render_input, warm_start
+
+
+def saved_orbitals_path(input_file_path: str) -> str:
+    """Where OpenQP writes the orbitals of a job run with `[guess] save_mol=True`."""
+    return f"{os.path.splitext(os.path.abspath(input_file_path))[0]}.json"
+
+
+def _relative_to(path: str, input_file_path: str) -> str:
+    # OpenQP resolves file names relative to the input, which is also the container's /data.
+    return os.path.relpath(path, os.path.dirname(os.path.abspath(input_file_path)))
+
+
+def prepare_follow_up(input_file_path: str, previous_input_path: str, carry_geometry: bool = False) -> bool:
+    """Rewrite an input to start from the orbitals of a finished job.
+
+    With `carry_geometry` the previous job's optimized geometry, when its log
+    has one, replaces the input's geometry too. Returns False if the previous
+    job saved no orbitals, leaving the input unchanged.
+    """
+    guess_path = saved_orbitals_path(previous_input_path)
+    if not os.path.exists(guess_path):
+        return False
+
+    system_file = None
+    if carry_geometry:
+        previous_stem = os.path.splitext(os.path.abspath(previous_input_path))[0]
+        xyz_path = f"{previous_stem}_opt_geo.xyz"
+        try:
+            if not os.path.exists(xyz_path):
+                geometry = GeometryExtractor(f"{previous_stem}.log").extract_optimized_geometry()
+                with open(xyz_path, 'w') as xyz_file:
+                    xyz_file.write(geometry)
+            system_file = _relative_to(xyz_path, input_file_path)
+        except (OSError, ValueError):
+            # Not an optimization: keep the input's own geometry.
+            pass
+
+    with open(input_file_path, 'r') as input_file:
+        sections = parse_input(input_file.read())
+    sections = warm_start(sections, _relative_to(guess_path, input_file_path), system_file)
+    with open(input_file_path, 'w') as input_file:
+        input_file.write(render_input(sections))
+    return True
+
+
+def restart_input(input_file_path: str, log_file_path: Optional[str] = None) -> str:
+    """Write an input that resumes a failed or killed optimization and return its path.
+
+    The geometry is the last one in the job's log and, if the job saved
+    orbitals, they are the guess. Restarts are named `<job>_restart1.inp`,
+    `<job>_restart2.inp`, ...
+    """
+    stem = os.path.splitext(os.path.abspath(input_file_path))[0]
+    log_file_path = log_file_path or f"{stem}.log"
+    geometry = GeometryExtractor(log_file_path).extract_optimized_geometry()
+
+    base = re.sub(r"_restart\d*$", "", stem)
+    number = 1
+    while os.path.exists(f"{base}_restart{number}.inp"):
+        number += 1
+    restart_stem = f"{base}_restart{number}"
+    with open(f"{restart_stem}.xyz", 'w') as xyz_file:
+        xyz_file.write(geometry)
+
+    with open(input_file_path, 'r') as input_file:
+        sections = parse_input(input_file.read())
+    sections.setdefault("input", {})["system"] = os.path.basename(f"{restart_stem}.xyz")
+    if os.path.exists(saved_orbitals_path(input_file_path)):
+        sections = warm_start(sections, _relative_to(saved_orbitals_path(input_file_path), f"{restart_stem}.inp"))
+    with open(f"{restart_stem}.inp", 'w') as input_file:
+        input_file.write(render_input(sections))
+    return f"{restart_stem}.inp"
+
+
+class JobChain:
+    """Inputs that a JobManager runs one after another, each warm-started from the job before it.
+
+    `after` is a job id or another chain to wait for before the first input.
+    The chain stops at the first job that does not finish successfully; that
+    job is kept in `stopped_by` and the inputs after it are not run. With
+    `continue_on_failure` a failed job is skipped instead and the next input
+    runs from its own (cold) guess; only a cancelled job stops the chain.
+    """
+
+    def __init__(self, input_file_paths: List[str], carry_geometry: bool = False, after=None,
+                 on_finished: Optional[Callable] = None, continue_on_failure: bool = False):
+        self.input_file_paths = list(input_file_paths)
+        self.carry_geometry = carry_geometry
+        self.continue_on_failure = continue_on_failure
+        self.after = after
+        self.on_finished = on_finished
+        self.job_ids: List[int] = []
+        self.stopped_by = None
+        self.thread: Optional[threading.Thread] = None
+
+    def join(self):
+        if self.thread is not None:
+            self.thread.join()
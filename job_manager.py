@@ -4,92 +4,724 @@ import subprocess
 import os
 import threading
 import queue
-from typing import Optional
+import itertools
+import time
+from typing import Callable, Dict, List, Optional
+
+from execution_backends import DockerBackend, ExecutionBackend, ProcessBackend
+from job_chain import JobChain, prepare_follow_up
+from log_tailer import LogTailer
+from optimization_trajectory import TrajectoryParser
+from result_cache import ResultCache
+
+_END_OF_STREAM = object()
+
+class Job:
+    """State of a single OpenQP run submitted to the JobManager."""
+
+    def __init__(self, job_id: int, input_file_path: str, log_file_path: str):
+        self.job_id = job_id
+        self.name = os.path.splitext(os.path.basename(input_file_path))[0]
+        self.input_file_path = input_file_path
+        self.log_file_path = log_file_path
+        self.container_name = f"openqp-{os.getpid()}-{job_id}"
+        self.status = "queued"
+        self.returncode: Optional[int] = None
+        self.process: Optional[subprocess.Popen] = None
+        self.thread: Optional[threading.Thread] = None
+        self.stop_flag = threading.Event()
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cpus: List[int] = []
+        self.energies: List[float] = []
+        self.use_cache = True
+        self.cached = False
+        self.backend: Optional[ExecutionBackend] = None
+        # Scheduler task id, set by the backend's prepare().
+        self.backend_ref: Optional[str] = None
+        self.slot = None
+
+class _RemoteJob:
+    """A scheduler job being followed by the JobManager's remote thread."""
+
+    def __init__(self, job: Job, log_text_widget, cache_key: Optional[str]):
+        self.job = job
+        self.log_text_widget = log_text_widget
+        self.tailer: Optional[LogTailer] = None
+        self.trajectory_parser = TrajectoryParser()
+        self.cache_key = cache_key
+        self.state: Optional[str] = None
+        self.terminated = False
+        # When the task was first missing from the queue without an exit code.
+        self.left_queue_at: Optional[float] = None
+
+class CpuAllocator:
+    """Hands out disjoint sets of CPU cores to concurrently running jobs."""
+
+    def __init__(self, cpus: Optional[List[int]] = None):
+        if cpus is None:
+            if hasattr(os, "sched_getaffinity"):
+                cpus = sorted(os.sched_getaffinity(0))
+            else:
+                cpus = list(range(os.cpu_count() or 1))
+        self.cpus = list(cpus)
+        self._free = list(self.cpus)
+        self._condition = threading.Condition()
+
+    def acquire(self, count: int) -> List[int]:
+        """Block until `count` cores are free and reserve them."""
+        count = max(1, min(count, len(self.cpus)))
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._free) >= count)
+            self._free.sort()
+            reserved, self._free = self._free[:count], self._free[count:]
+            return reserved
+
+    def release(self, cpus: List[int]):
+        with self._condition:
+            self._free.extend(cpus)
+            self._condition.notify_all()
 
 class JobManager:
-    def __init__(self, parent):
+    def __init__(self, parent, max_workers: int = 1, cpus_per_job: Optional[int] = None,
+                 cpus: Optional[List[int]] = None, log_refresh_ms: int = 33, log_scrollback_lines: int = 5000,
+                 on_frame: Optional[Callable[[Job, dict], None]] = None,
+                 result_cache: Optional[ResultCache] = None, backend: Optional[ExecutionBackend] = None):
         self.parent = parent
-        self.process: Optional[subprocess.Popen] = None
+        self.on_frame = on_frame
+        self.result_cache = result_cache
+        # Jobs keep the backend that was selected when they were submitted.
+        self.backend = backend or DockerBackend()
         self.stop_flag = threading.Event()
+        # Set when the GUI quits without cancelling running jobs; their log offsets are kept.
+        self.detached = False
         self.log_queue = queue.Queue()
-        
-    def _execute_job(self, input_file_path: str, log_file_path: str, log_text_widget: scrolledtext.ScrolledText):
+        self.jobs: Dict[int, Job] = {}
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._workers: List[threading.Thread] = []
+        # Scheduler jobs are followed by one thread instead of a worker each.
+        self._remote_pending = queue.Queue()
+        self._remote_thread: Optional[threading.Thread] = None
+        self.remote_log_interval = 1.0
+        self.tailers: Dict[str, LogTailer] = {}
+        self.cpu_allocator = CpuAllocator(cpus)
+        self.max_workers = max_workers
+        self.cpus_per_job = cpus_per_job
+        self.stream_flush_interval = 0.1
+        self.stream_batch_chars = 64 * 1024
+        self.stream_queue_lines = 10000
+        self.log_refresh_ms = log_refresh_ms
+        self.log_scrollback_lines = log_scrollback_lines
+        # Without a Tk parent (batch/CLI use) there is no log widget to refresh.
+        if self.parent is not None:
+            self.parent.after(self.log_refresh_ms, self._drain_log_queue)
+
+    def configure(self, max_workers: Optional[int] = None, cpus_per_job: Optional[int] = None):
+        """Change the worker count or per-job core budget for jobs submitted from now on."""
+        if max_workers is not None:
+            self.max_workers = max(1, max_workers)
+        if cpus_per_job is not None:
+            self.cpus_per_job = max(1, cpus_per_job)
+
+    def job_cpu_budget(self) -> int:
+        """Cores given to each job; by default the available cores split evenly across workers."""
+        if self.cpus_per_job:
+            return min(self.cpus_per_job, len(self.cpu_allocator.cpus))
+        return max(1, len(self.cpu_allocator.cpus) // self.max_workers)
+
+    def submit(self, input_file_path: str, log_file_path: str, log_text_widget: scrolledtext.ScrolledText,
+               use_cache: bool = True) -> int:
+        """Queue a job for the worker pool and return its id.
+
+        With a result cache configured and `use_cache` set, an identical earlier
+        run is restored instead of starting a container.
+        """
+        return self._submit_jobs([(input_file_path, log_file_path)], log_text_widget, use_cache)[0]
+
+    def submit_batch(self, input_file_paths: List[str],
+                     log_text_widget: Optional[scrolledtext.ScrolledText] = None, use_cache: bool = True) -> List[int]:
+        """Queue many inputs at once; each log is written next to its input.
+
+        A scheduler backend submits all of them as one array job.
+        """
+        return self._submit_jobs(
+            [(path, f"{os.path.splitext(path)[0]}.log") for path in input_file_paths], log_text_widget, use_cache
+        )
+
+    def _submit_jobs(self, file_paths, log_text_widget: Optional[scrolledtext.ScrolledText],
+                     use_cache: bool) -> List[int]:
+        jobs = []
+        for input_file_path, log_file_path in file_paths:
+            job = Job(next(self._job_ids), input_file_path, log_file_path)
+            job.use_cache = use_cache
+            job.backend = self.backend
+            jobs.append(job)
+        # Errors here (e.g. a rejected array job) reach the caller before anything is queued.
+        self.backend.prepare([job for job in jobs if not self._is_cached(job)])
+
+        with self._lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            for job in jobs:
+                self.jobs[job.job_id] = job
+                if not isinstance(job.backend, ProcessBackend):
+                    self._remote_pending.put((job, log_text_widget))
+                    if self._remote_thread is None:
+                        self._remote_thread = threading.Thread(
+                            target=self._follow_remote_jobs, name="openqp-remote", daemon=True
+                        )
+                        self._remote_thread.start()
+                    continue
+                self._pending.put((job, log_text_widget))
+                if len(self._workers) < self.max_workers:
+                    worker = threading.Thread(
+                        target=self._worker_loop,
+                        name=f"openqp-worker-{len(self._workers) + 1}",
+                        daemon=True
+                    )
+                    self._workers.append(worker)
+                    worker.start()
+        return [job.job_id for job in jobs]
+
+    def submit_chain(self, chain: JobChain, log_text_widget: Optional[scrolledtext.ScrolledText] = None,
+                     use_cache: bool = True) -> JobChain:
+        """Run a chain of inputs in the background, each starting from the previous job's orbitals."""
+        chain.thread = threading.Thread(
+            target=self._run_chain, args=(chain, log_text_widget, use_cache), name="openqp-chain", daemon=True
+        )
+        chain.thread.start()
+        return chain
+
+    def _run_chain(self, chain: JobChain, log_text_widget: Optional[scrolledtext.ScrolledText], use_cache: bool):
+        previous = None
+        if isinstance(chain.after, JobChain):
+            chain.after.join()
+            if not chain.after.job_ids:
+                chain.stopped_by = chain.after.stopped_by
+                return
+            previous = self.jobs[chain.after.job_ids[-1]]
+        elif chain.after is not None:
+            previous = self.jobs[chain.after]
+        if previous is not None:
+            self.wait([previous.job_id])
+
+        for input_file_path in chain.input_file_paths:
+            if chain.continue_on_failure and previous is not None and previous.status == "failed":
+                self._safe_log_update(log_text_widget, f"\n{previous.name} failed; the next input starts cold.\n")
+                previous = None
+            if previous is not None:
+                if previous.status != "done":
+                    chain.stopped_by = previous
+                    skipped = len(chain.input_file_paths) - len(chain.job_ids)
+                    self._safe_log_update(
+                        log_text_widget, f"\nChain stopped because {previous.name} {previous.status}; "
+                                         f"{skipped} input(s) not run.\n"
+                    )
+                    return
+                try:
+                    warm = prepare_follow_up(input_file_path, previous.input_file_path, chain.carry_geometry)
+                except (OSError, ValueError) as e:
+                    warm = False
+                    self._safe_log_update(log_text_widget, f"\nCould not warm-start: {str(e)}\n")
+                if warm:
+                    self._safe_log_update(log_text_widget, f"\nStarting from the orbitals of {previous.name}.\n")
+            if self.stop_flag.is_set():
+                return
+
+            try:
+                job_id = self.submit(input_file_path, f"{os.path.splitext(input_file_path)[0]}.log",
+                                     log_text_widget, use_cache)
+            except (OSError, ValueError) as e:
+                self._safe_log_update(log_text_widget, f"\nCould not submit {input_file_path}: {str(e)}\n")
+                return
+            chain.job_ids.append(job_id)
+            previous = self.jobs[job_id]
+            self.wait([job_id], on_finished=chain.on_finished)
+        if previous is not None and previous.status != "done" and not chain.continue_on_failure:
+            chain.stopped_by = previous
+
+    def wait(self, job_ids: Optional[List[int]] = None, poll_interval: float = 0.2,
+             on_finished: Optional[Callable[[Job], None]] = None):
+        """Block until the given jobs (default: all) have finished, calling `on_finished` for each."""
+        remaining = set(self.jobs if job_ids is None else job_ids)
+        while remaining:
+            for job_id in sorted(remaining):
+                job = self.jobs[job_id]
+                if job.status not in ("queued", "running") and job.finished_at is not None:
+                    remaining.discard(job_id)
+                    if on_finished is not None:
+                        on_finished(job)
+            if remaining:
+                time.sleep(poll_interval)
+
+    def _worker_loop(self):
+        """Run queued jobs one after another until the queue stays empty."""
+        while True:
+            try:
+                job, log_text_widget = self._pending.get(timeout=5)
+            except queue.Empty:
+                with self._lock:
+                    if self._pending.empty():
+                        self._workers.remove(threading.current_thread())
+                        return
+                continue
+
+            job.thread = threading.current_thread()
+            if self._is_stopped(job):
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                continue
+
+            if job.backend.local_cpus:
+                job.cpus = self.cpu_allocator.acquire(self.job_cpu_budget())
+            try:
+                self._execute_job(job.input_file_path, job.log_file_path, log_text_widget, job)
+            finally:
+                self.cpu_allocator.release(job.cpus)
+
+    def cancel(self, job_id: int):
+        """Stop a queued or running job and terminate its container."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"Unknown job id: {job_id}")
+        job.stop_flag.set()
+        if job.status not in ("queued", "running"):
+            return
+        if job.status == "queued":
+            job.status = "cancelled"
+        self._terminate(job)
+
+    def cancel_all(self):
+        """Stop every job, e.g. when the GUI is closing."""
+        self.stop_flag.set()
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+
+    def detach(self):
+        """Stop watching running jobs without stopping them, e.g. when the GUI quits.
+
+        Queued jobs are cancelled. The running ones keep their saved log
+        offsets, so `follow_log` picks their logs up after a restart.
+        """
+        self.detached = True
+        for job in self.active_jobs():
+            if job.status == "queued":
+                self.cancel(job.job_id)
+        for log_file_path in list(self.tailers):
+            self.stop_following(log_file_path)
+
+    def status(self, job_id: int) -> str:
+        """Return the state of a job: queued, running, done, failed or cancelled."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"Unknown job id: {job_id}")
+        return job.status
+
+    def throughput(self) -> Dict[str, float]:
+        """Summarize job states and the completion rate of the pool."""
+        jobs = list(self.jobs.values())
+        summary = {state: 0 for state in ("queued", "running", "done", "failed", "cancelled")}
+        for job in jobs:
+            summary[job.status] += 1
+
+        finished = [job for job in jobs if job.finished_at and job.started_at]
+        if finished:
+            elapsed = max(job.finished_at for job in finished) - min(job.started_at for job in finished)
+            summary["jobs_per_hour"] = len(finished) * 3600.0 / elapsed if elapsed > 0 else 0.0
+            summary["mean_runtime_s"] = sum(job.finished_at - job.started_at for job in finished) / len(finished)
+        else:
+            summary["jobs_per_hour"] = 0.0
+            summary["mean_runtime_s"] = 0.0
+        return summary
+
+    def active_jobs(self):
+        """Return the jobs that have not finished yet."""
+        return [job for job in self.jobs.values() if job.status in ("queued", "running")]
+
+    def follow_log(self, log_file_path: str, log_text_widget: scrolledtext.ScrolledText,
+                   idle_timeout: Optional[float] = None) -> LogTailer:
+        """Stream a log into the widget from the last saved offset, e.g. after a GUI restart.
+
+        With `idle_timeout` following stops once the log has been quiet that
+        long, which is taken to mean its job has ended.
+        """
+        self.stop_following(log_file_path)
+        tailer = LogTailer(
+            log_file_path,
+            lambda text: self._safe_log_update(log_text_widget, text),
+            idle_timeout=idle_timeout
+        ).start()
+        self.tailers[os.path.abspath(log_file_path)] = tailer
+        return tailer
+
+    def stop_following(self, log_file_path: str):
+        tailer = self.tailers.pop(os.path.abspath(log_file_path), None)
+        if tailer is not None:
+            tailer.stop()
+
+    def _terminate(self, job: Job):
+        """Stop the process behind a job the way its backend requires."""
+        if job.backend is not None:
+            job.backend.terminate(job)
+
+    def _is_stopped(self, job: Job) -> bool:
+        return job.stop_flag.is_set() or self.stop_flag.is_set()
+
+    def _execute_job(self, input_file_path: str, log_file_path: str, log_text_widget: scrolledtext.ScrolledText,
+                     job: Optional[Job] = None):
         """
         Execute the job and monitor log output.
         """
+        if job is None:
+            job = Job(next(self._job_ids), input_file_path, log_file_path)
+            job.backend = self.backend
+            with self._lock:
+                self.jobs[job.job_id] = job
+
+        tailer = None
         try:
+            if self._is_stopped(job):
+                job.status = "cancelled"
+                return
+
+            cache_key = self._cache_key(job)
+            if cache_key is not None and self._restore_cached(job, cache_key, log_text_widget):
+                return
+
             abs_input_path = os.path.abspath(input_file_path)
             input_dir = os.path.dirname(abs_input_path)
             input_filename = os.path.basename(abs_input_path)
 
-            cmd = [
-                "docker", "run",
-                "--rm",
-                "-v", f"{input_dir}:/data",
-                "-w", "/data",
-                "alireza0027/openqp:fixed",  
-                "/usr/local/bin/openqp",  
-                input_filename
-            ]
-            
-            self._safe_log_update(log_text_widget, f"Starting job with command:\n{' '.join(cmd)}\n\n")
-            
-            self.process = subprocess.Popen(
-                cmd,
+            job.backend.scale(self.max_workers)
+            launch = job.backend.launch(job, input_dir, input_filename)
+            self._safe_log_update(log_text_widget, f"Starting job with command:\n{' '.join(launch['args'])}\n\n")
+
+            def on_log_text(text):
+                self._safe_log_update(log_text_widget, text)
+                self._emit_frames(job, trajectory_parser.feed_text(text), log_text_widget)
+
+            trajectory_parser = TrajectoryParser()
+            tailer = LogTailer(
+                log_file_path,
+                on_log_text,
+                resume=False,
+                skip_existing=True
+            ).start()
+
+            job.status = "running"
+            job.started_at = time.time()
+            job.process = subprocess.Popen(
+                **launch,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
                 bufsize=1
             )
-            
-            while self.process.poll() is None and not self.stop_flag.is_set():
-                stdout_line = self.process.stdout.readline()
-                if stdout_line:
-                    self._safe_log_update(log_text_widget, stdout_line)
-                
-                stderr_line = self.process.stderr.readline()
-                if stderr_line:
-                    self._safe_log_update(log_text_widget, f"Error: {stderr_line}")
-            
-            stdout, stderr = self.process.communicate()
-            if stdout:
-                self._safe_log_update(log_text_widget, stdout)
-            if stderr:
-                self._safe_log_update(log_text_widget, f"Error: {stderr}\n")
-            
-            if self.process.returncode != 0:
-                self._safe_log_update(
-                    log_text_widget,
-                    f"\nJob failed with exit code {self.process.returncode}\n"
-                )
-            else:
-                self._safe_log_update(log_text_widget, "\nJob completed successfully.\n")
-                
-            if os.path.exists(log_file_path):
-                self._safe_log_update(log_text_widget, "\nLog file contents:\n")
-                with open(log_file_path, 'r') as log_file:
-                    self._safe_log_update(log_text_widget, log_file.read())
-                    
+            # A cancel that raced with Popen found no process to kill.
+            if self._is_stopped(job):
+                self._terminate(job)
+
+            self._stream_output(job, log_text_widget)
+            job.process.wait()
+            tailer.stop()
+
+            self._record_exit(job, job.process.returncode, cache_key, log_text_widget)
+
         except Exception as e:
+            job.status = "failed"
             self._safe_log_update(
                 log_text_widget,
                 f"\nAn error occurred while executing the job: {str(e)}\n"
             )
         finally:
-            self.process = None
+            if tailer is not None:
+                tailer.stop()
+                if not self.detached:
+                    tailer.discard_state()
+                self._emit_frames(job, trajectory_parser.finish(), log_text_widget)
+            if job.backend is not None:
+                job.backend.finish(job)
+            job.finished_at = time.time()
+            job.process = None
+
+    def _record_exit(self, job: Job, returncode: int, cache_key: Optional[str],
+                     log_text_widget: scrolledtext.ScrolledText):
+        """Set the status of a job that has ended and cache its result if it succeeded."""
+        job.returncode = returncode
+        if self._is_stopped(job):
+            job.status = "cancelled"
+            self._safe_log_update(log_text_widget, f"\nJob {job.name} was cancelled.\n")
+        elif job.returncode != 0:
+            job.status = "failed"
+            self._safe_log_update(
+                log_text_widget,
+                f"\nJob failed with exit code {job.returncode}\n"
+            )
+        else:
+            job.status = "done"
+            self._safe_log_update(log_text_widget, "\nJob completed successfully.\n")
+            if cache_key is not None:
+                try:
+                    self.result_cache.store(cache_key, job.input_file_path, since=job.started_at)
+                except OSError as e:
+                    self._safe_log_update(log_text_widget, f"Could not cache the result: {str(e)}\n")
+
+    def _follow_remote_jobs(self):
+        """Thread body following every scheduler job until none is left.
+
+        Each backend is asked about all of its watched tasks once per
+        `poll_interval`; in between, the jobs' logs are read from their start
+        every `remote_log_interval` seconds, so output a task wrote before it
+        was watched is not lost.
+        """
+        watched: Dict[int, _RemoteJob] = {}
+        next_poll = 0.0
+        while True:
+            with self._lock:
+                if not watched and self._remote_pending.empty():
+                    self._remote_thread = None
+                    return
+            while not self._remote_pending.empty():
+                remote = self._start_remote(*self._remote_pending.get())
+                if remote is not None:
+                    watched[remote.job.job_id] = remote
+
+            for remote in watched.values():
+                self._read_remote_log(remote)
+                if not remote.terminated and self._is_stopped(remote.job):
+                    self._terminate(remote.job)
+                    remote.terminated = True
+
+            if time.monotonic() >= next_poll and watched:
+                next_poll = time.monotonic() + min(remote.job.backend.poll_interval for remote in watched.values())
+                for remote in self._poll_remote(list(watched.values())):
+                    del watched[remote.job.job_id]
+            time.sleep(self.remote_log_interval)
+
+    def _start_remote(self, job: Job, log_text_widget: scrolledtext.ScrolledText) -> Optional[_RemoteJob]:
+        """Begin following a scheduler job; None if it ended before that (cancelled, cached or not submitted)."""
+        if self._is_stopped(job):
+            job.status = "cancelled"
+            self._terminate(job)
+            job.finished_at = time.time()
+            return None
+        cache_key = self._cache_key(job)
+        try:
+            if cache_key is not None and self._restore_cached(job, cache_key, log_text_widget):
+                job.finished_at = time.time()
+                return None
+        except Exception as e:
+            job.status = "failed"
+            self._safe_log_update(log_text_widget, f"\nAn error occurred while executing the job: {str(e)}\n")
+            job.finished_at = time.time()
+            return None
+        if job.backend_ref is None:
+            job.status = "failed"
+            self._safe_log_update(log_text_widget, f"\n{job.name} was not submitted to the scheduler.\n")
+            job.finished_at = time.time()
+            return None
+
+        self._safe_log_update(log_text_widget, f"Following {job.name} as task {job.backend_ref}\n\n")
+        remote = _RemoteJob(job, log_text_widget, cache_key)
+
+        def on_log_text(text):
+            self._safe_log_update(log_text_widget, text)
+            self._emit_frames(job, remote.trajectory_parser.feed_text(text), log_text_widget)
+
+        remote.tailer = LogTailer(job.log_file_path, on_log_text, resume=False)
+        return remote
+
+    def _read_remote_log(self, remote: _RemoteJob):
+        text = remote.tailer.read_new()
+        if text:
+            remote.tailer.callback(text)
+
+    def _poll_remote(self, remotes: List[_RemoteJob]) -> List[_RemoteJob]:
+        """Ask the scheduler about the watched jobs and finish those that have ended; returns the finished."""
+        finished = []
+        backends = {id(remote.job.backend): remote.job.backend for remote in remotes}
+        for backend in backends.values():
+            mine = [remote for remote in remotes if remote.job.backend is backend]
+            states = backend.poll([remote.job for remote in mine])
+            for remote in mine:
+                job = remote.job
+                state = states.get(job.backend_ref, "UNKNOWN")
+                if state is not None:
+                    remote.left_queue_at = None
+                    if state != remote.state:
+                        self._safe_log_update(remote.log_text_widget, f"{job.backend_ref}: {state}\n")
+                        remote.state = state
+                    if job.status == "queued" and backend.is_running(state):
+                        job.status = "running"
+                        job.started_at = time.time()
+                    continue
+
+                returncode = backend.exit_code(job)
+                if returncode is None:
+                    if remote.left_queue_at is None:
+                        remote.left_queue_at = time.monotonic()
+                    if not self._is_stopped(job) and time.monotonic() - remote.left_queue_at < backend.exit_grace:
+                        continue
+                    self._safe_log_update(
+                        remote.log_text_widget, f"{job.backend_ref} left the queue without recording an exit code\n"
+                    )
+                    returncode = 1
+                self._finish_remote(remote, returncode)
+                finished.append(remote)
+        return finished
+
+    def _finish_remote(self, remote: _RemoteJob, returncode: int):
+        job = remote.job
+        self._read_remote_log(remote)
+        if job.started_at is None:
+            job.started_at = time.time()
+        try:
+            self._record_exit(job, returncode, remote.cache_key, remote.log_text_widget)
+        finally:
+            if not self.detached:
+                remote.tailer.discard_state()
+            self._emit_frames(job, remote.trajectory_parser.finish(), remote.log_text_widget)
+            job.backend.finish(job)
+            job.finished_at = time.time()
+
+    def _cache_key(self, job: Job) -> Optional[str]:
+        if self.result_cache is None or not job.use_cache:
+            return None
+        try:
+            return self.result_cache.key(job.input_file_path, job.backend.cache_tag)
+        except OSError:
+            return None
+
+    def _is_cached(self, job: Job) -> bool:
+        cache_key = self._cache_key(job)
+        return cache_key is not None and self.result_cache.contains(cache_key)
+
+    def _restore_cached(self, job: Job, cache_key: str, log_text_widget: scrolledtext.ScrolledText) -> bool:
+        """Finish a job from the result cache, replaying its optimization steps; False on a miss."""
+        job.started_at = time.time()
+        restored = self.result_cache.restore(cache_key, job.input_file_path)
+        if not restored:
+            return False
+
+        job.cached = True
+        job.returncode = 0
+        job.status = "done"
+        self._safe_log_update(
+            log_text_widget,
+            f"Restored cached result for {job.name}:\n" + "".join(f"  {path}\n" for path in restored)
+        )
+        if os.path.exists(job.log_file_path):
+            parser = TrajectoryParser()
+            with open(job.log_file_path, 'r', errors='replace') as log_file:
+                for line in log_file:
+                    self._emit_frames(job, parser.feed(line), log_text_widget)
+            self._emit_frames(job, parser.finish(), log_text_widget)
+        return True
+
+    def _emit_frames(self, job: Job, frames: List[dict], log_text_widget: scrolledtext.ScrolledText):
+        """Hand optimization steps parsed from the live log to `on_frame` as they complete."""
+        for frame in frames:
+            if not frame["coordinates"]:
+                continue
+            job.energies.append(frame["energy"])
+            if self.on_frame is None:
+                continue
+            try:
+                self.on_frame(job, frame)
+            except Exception as e:
+                self._safe_log_update(log_text_widget, f"\nLive view error: {str(e)}\n")
+
+    def _stream_output(self, job: Job, log_text_widget: scrolledtext.ScrolledText):
+        """Forward stdout and stderr to the log in batches until both streams close.
+
+        Each stream gets its own reader thread, so a quiet stream can never block
+        a busy one, and the bounded line queue caps memory on huge outputs.
+        """
+        lines = queue.Queue(maxsize=self.stream_queue_lines)
+        readers = [
+            threading.Thread(target=self._read_stream, args=(stream, prefix, lines), daemon=True)
+            for stream, prefix in ((job.process.stdout, ""), (job.process.stderr, "Error: "))
+        ]
+        for reader in readers:
+            reader.start()
+
+        open_streams = len(readers)
+        batch, batch_chars, deadline = [], 0, 0.0
+        terminated = False
+        while open_streams:
+            try:
+                line = lines.get(timeout=self.stream_flush_interval)
+            except queue.Empty:
+                line = None
+
+            if line is _END_OF_STREAM:
+                open_streams -= 1
+            elif line is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.stream_flush_interval
+                batch.append(line)
+                batch_chars += len(line)
+
+            if batch and (line is None or batch_chars >= self.stream_batch_chars or time.monotonic() >= deadline):
+                self._safe_log_update(log_text_widget, "".join(batch))
+                batch, batch_chars = [], 0
+
+            if not terminated and self._is_stopped(job):
+                self._terminate(job)
+                terminated = True
+
+        if batch:
+            self._safe_log_update(log_text_widget, "".join(batch))
+
+    def _read_stream(self, stream, prefix: str, lines: queue.Queue):
+        """Reader thread body: push every line of `stream` onto `lines`."""
+        try:
+            for line in iter(lambda: stream.readline(self.stream_batch_chars), ""):
+                lines.put(prefix + line)
+        finally:
+            lines.put(_END_OF_STREAM)
+
+    def configure_log_view(self, refresh_ms: Optional[int] = None, scrollback_lines: Optional[int] = None):
+        """Set how often the log widget is refreshed and how many lines it keeps."""
+        if refresh_ms is not None:
+            self.log_refresh_ms = max(1, refresh_ms)
+        if scrollback_lines is not None:
+            self.log_scrollback_lines = max(1, scrollback_lines)
 
     def _safe_log_update(self, log_widget: scrolledtext.ScrolledText, message: str):
         """Thread-safe method to update the log widget."""
-        self.log_queue.put(message)
-        self.parent.after(10, self._process_log_queue, log_widget)
+        if log_widget is not None:
+            self.log_queue.put((log_widget, message))
 
-    def _process_log_queue(self, log_widget: scrolledtext.ScrolledText):
-        """Process pending log messages."""
+    def _drain_log_queue(self):
+        """Periodic Tk callback: flush queued messages with one insert per widget."""
+        pending: Dict[scrolledtext.ScrolledText, List[str]] = {}
         try:
             while True:
-                message = self.log_queue.get_nowait()
-                log_widget.insert(tk.END, message)
-                log_widget.see(tk.END)
-                log_widget.update_idletasks()
+                log_widget, message = self.log_queue.get_nowait()
+                pending.setdefault(log_widget, []).append(message)
         except queue.Empty:
             pass
+
+        for log_widget, messages in pending.items():
+            try:
+                self._append_log_text(log_widget, "".join(messages))
+            except tk.TclError:
+                # The widget was destroyed while messages were still queued.
+                pass
+
+        self.parent.after(self.log_refresh_ms, self._drain_log_queue)
+
+    def _append_log_text(self, log_widget: scrolledtext.ScrolledText, text: str):
+        """Append text and trim the widget so it never holds more than the scrollback."""
+        if text.count("\n") > self.log_scrollback_lines:
+            text = "".join(text.splitlines(keepends=True)[-self.log_scrollback_lines:])
+        log_widget.insert(tk.END, text)
+
+        line_count = int(log_widget.index("end-1c").split(".")[0])
+        excess = line_count - self.log_scrollback_lines
+        if excess > 0:
+            log_widget.delete("1.0", f"{excess + 1}.0")
+        log_widget.see(tk.END)
@@ -0,0 +1,208 @@
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+from geometry_extractor import OPT_STEP_MARKER
+
+INDEX_VERSION = 1
+
+NUMBER = r"-?\d+\.\d+(?:[eEdD][-+]?\d+)?"
+
+SCF_HEADER_PATTERN = re.compile(r"\bIter\b.*\bEnergy\b", re.IGNORECASE)
+SCF_ITERATION_PATTERN = re.compile(rf"^\s*(\d+)\s+({NUMBER})\s+({NUMBER})")
+TOTAL_ENERGY_PATTERN = re.compile(
+    rf"\b(?:TOTAL|FINAL)\s+(?:[A-Z-]+\s+)?ENERGY\s*(?:IS|=|:)?\s*({NUMBER})",
+    re.IGNORECASE
+)
+# MRSF/TDDFT summary rows: state, energy, excitation (Eh), excitation (eV), ..., oscillator strength.
+EXCITATION_HEADER_PATTERN = re.compile(r"\bState\b.*\bExcitation\b", re.IGNORECASE)
+EXCITATION_ROW_PATTERN = re.compile(rf"^\s*(\d+)((?:\s+{NUMBER}){{4,}})\s*$")
+TIMING_PATTERN = re.compile(
+    r"\b(wall|cpu|elapsed)(?:\s+clock)?\s+time\b[^0-9\n]*?(\d+(?:\.\d+)?)",
+    re.IGNORECASE
+)
+
+RECORD_FIELDS = {
+    "scf_iteration": ("iteration", "energy", "delta_energy"),
+    "total_energy": ("energy",),
+    "excitation": ("state", "energy", "excitation_hartree", "excitation_ev", "oscillator_strength"),
+    "optimization_step": ("step",),
+    "timing": ("kind", "seconds"),
+}
+
+
+def _to_float(text):
+    return float(text.replace('D', 'E').replace('d', 'e'))
+
+
+class LogParser:
+    """One-pass parser that turns OpenQP log lines into structured records.
+
+    Every record keeps the byte offset of the line it came from, so viewers can
+    seek straight to it. Records are stored column-wise per kind.
+    """
+
+    def __init__(self):
+        self.records = {
+            kind: {"offset": [], **{field: [] for field in fields}}
+            for kind, fields in RECORD_FIELDS.items()
+        }
+        self._section = None
+
+    def _add(self, kind, offset, *values):
+        columns = self.records[kind]
+        columns["offset"].append(offset)
+        for field, value in zip(RECORD_FIELDS[kind], values):
+            columns[field].append(value)
+
+    def feed(self, line: str, offset: int):
+        """Parse one decoded log line starting at byte `offset`."""
+        if self._section == "scf":
+            match = SCF_ITERATION_PATTERN.match(line)
+            if match:
+                self._add("scf_iteration", offset, int(match.group(1)),
+                          _to_float(match.group(2)), _to_float(match.group(3)))
+                return
+            # Column headers, unit lines and ---- rules carry no digits; the
+            # section ends at the first other line that does.
+            if line.strip() and any(char.isdigit() for char in line):
+                self._section = None
+        elif self._section == "excitation":
+            match = EXCITATION_ROW_PATTERN.match(line)
+            if match:
+                values = [_to_float(value) for value in match.group(2).split()]
+                self._add("excitation", offset, int(match.group(1)),
+                          values[0], values[1], values[2], values[-1])
+                return
+            # Keep going through the multi-line column header; stop at the
+            # first row that is neither a header nor a summary entry.
+            if line.strip() and any(char.isdigit() for char in line):
+                self._section = None
+
+        if OPT_STEP_MARKER in line:
+            step = line.split(OPT_STEP_MARKER, 1)[1].split()
+            self._add("optimization_step", offset, int(step[0]) if step and step[0].isdigit() else None)
+            return
+
+        if "Iter" in line or "ITER" in line:
+            if SCF_HEADER_PATTERN.search(line):
+                self._section = "scf"
+                return
+
+        if "xcitation" in line or "XCITATION" in line:
+            if EXCITATION_HEADER_PATTERN.search(line):
+                self._section = "excitation"
+                return
+
+        if "NERGY" in line or "nergy" in line:
+            match = TOTAL_ENERGY_PATTERN.search(line)
+            if match:
+                self._add("total_energy", offset, _to_float(match.group(1)))
+                return
+
+        if "ime" in line or "IME" in line:
+            match = TIMING_PATTERN.search(line)
+            if match:
+                self._add("timing", offset, match.group(1).lower(), float(match.group(2)))
+
+
+class LogIndex:
+    """Queryable summary of an OpenQP log, cached in a `<log>.index.json` sidecar."""
+
+    def __init__(self, log_file_path: str, records: Dict[str, Dict[str, list]], size: int, mtime_ns: int):
+        self.log_file_path = log_file_path
+        self.records_by_kind = records
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    @staticmethod
+    def sidecar_path(log_file_path: str) -> str:
+        return f"{log_file_path}.index.json"
+
+    @classmethod
+    def build(cls, log_file_path: str) -> "LogIndex":
+        """Parse the whole log once and write the sidecar index."""
+        stat = os.stat(log_file_path)
+        parser = LogParser()
+        offset = 0
+        with open(log_file_path, 'rb') as log_file:
+            for raw_line in log_file:
+                parser.feed(raw_line.decode('latin-1'), offset)
+                offset += len(raw_line)
+
+        index = cls(log_file_path, parser.records, stat.st_size, stat.st_mtime_ns)
+        index.save()
+        return index
+
+    @classmethod
+    def load(cls, log_file_path: str, rebuild: bool = True) -> Optional["LogIndex"]:
+        """Return the cached index if it matches the log, rebuilding it if stale."""
+        stat = os.stat(log_file_path)
+        try:
+            with open(cls.sidecar_path(log_file_path), 'r') as index_file:
+                data = json.load(index_file)
+            if (data.get("version") == INDEX_VERSION and data.get("size") == stat.st_size
+                    and data.get("mtime_ns") == stat.st_mtime_ns):
+                return cls(log_file_path, data["records"], data["size"], data["mtime_ns"])
+        except (OSError, ValueError, KeyError):
+            pass
+        return cls.build(log_file_path) if rebuild else None
+
+    def save(self):
+        data = {
+            "version": INDEX_VERSION,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "records": self.records_by_kind,
+        }
+        try:
+            with open(self.sidecar_path(self.log_file_path), 'w') as index_file:
+                json.dump(data, index_file, separators=(",", ":"))
+        except OSError:
+            # A read-only results directory only costs us the cache.
+            pass
+
+    def column(self, kind: str, field: str) -> list:
+        """Return one field of every record of a kind, e.g. column("scf_iteration", "energy")."""
+        return self.records_by_kind[kind][field]
+
+    def records(self, kind: str) -> List[dict]:
+        """Return the records of a kind as a list of dicts."""
+        columns = self.records_by_kind[kind]
+        fields = ("offset",) + RECORD_FIELDS[kind]
+        return [dict(zip(fields, row)) for row in zip(*(columns[field] for field in fields))]
+
+    def final_energy(self) -> Optional[float]:
+        energies = self.column("total_energy", "energy")
+        return energies[-1] if energies else None
+
+    def excitations(self) -> List[dict]:
+        return self.records("excitation")
+
+    def optimization_steps(self) -> List[dict]:
+        return self.records("optimization_step")
+
+    def sections(self) -> List[tuple]:
+        """Return (label, byte offset) pairs of landmarks worth jumping to, in file order."""
+        sections = []
+        scf_offsets = self.column("scf_iteration", "offset")
+        scf_iterations = self.column("scf_iteration", "iteration")
+        for offset, iteration in zip(scf_offsets, scf_iterations):
+            if iteration == 1:
+                sections.append(("SCF", offset))
+        for record in self.optimization_steps():
+            sections.append((f"Optimization step {record['step']}", record["offset"]))
+        excitation_offsets = self.column("excitation", "offset")
+        excitation_states = self.column("excitation", "state")
+        for offset, state in zip(excitation_offsets, excitation_states):
+            if state == 1:
+                sections.append(("Excited states", offset))
+        for offset, energy in zip(self.column("total_energy", "offset"), self.column("total_energy", "energy")):
+            sections.append((f"Total energy {energy:.8f}", offset))
+        return sorted(sections, key=lambda section: section[1])
+
+
+def parse_log(log_file_path: str) -> LogIndex:
+    """Return the structured summary of a log, reusing its sidecar index when valid."""
+    return LogIndex.load(log_file_path)
@@ -0,0 +1,89 @@
+import glob
+import mmap
+import os
+import queue
+import re
+import threading
+from typing import List, Optional
+
+
+def job_log_files(directory: str) -> List[str]:
+    """Return every OpenQP log in a job directory."""
+    return sorted(glob.glob(os.path.join(directory, "*.log")))
+
+
+class LogSearch:
+    """Regex search over memory-mapped log files on a background thread.
+
+    Matches are published to `results` in batches of (path, [(start, end), ...])
+    as soon as they are found, followed by (path, None) once a file is done, so a
+    viewer can start highlighting before the scan of a large file finishes. Files
+    are scanned in chunks of whole lines of about `chunk_size` bytes and a
+    cancelled search stops at the next chunk, however few matches it finds.
+    """
+
+    def __init__(self, pattern: str, paths: List[str], use_regex: bool = False, ignore_case: bool = True,
+                 batch_size: int = 500, chunk_size: int = 4 << 20):
+        flags = re.IGNORECASE if ignore_case else 0
+        source = pattern if use_regex else re.escape(pattern)
+        self.regex = re.compile(source.encode('utf-8'), flags)
+        self.paths = list(paths)
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.results: queue.Queue = queue.Queue()
+        self.match_counts = {path: 0 for path in self.paths}
+        self.error: Optional[Exception] = None
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-search", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        try:
+            for path in self.paths:
+                if self._cancel.is_set():
+                    break
+                self._search_file(path)
+        except Exception as e:
+            self.error = e
+
+    def _search_file(self, path: str):
+        batch = []
+        with open(path, 'rb') as log_file:
+            if os.fstat(log_file.fileno()).st_size == 0:
+                self.results.put((path, None))
+                return
+            with mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = 0
+                while start < len(mm):
+                    if self._cancel.is_set():
+                        return
+                    end = mm.find(b"\n", min(start + self.chunk_size, len(mm)))
+                    end = len(mm) if end < 0 else end + 1
+                    for match in self.regex.finditer(mm, start, end):
+                        if match.end() == match.start():
+                            continue
+                        batch.append((match.start(), match.end()))
+                        if len(batch) >= self.batch_size:
+                            self._publish(path, batch)
+                            batch = []
+                    start = end
+        if batch:
+            self._publish(path, batch)
+        self.results.put((path, None))
+
+    def _publish(self, path: str, batch):
+        self.match_counts[path] += len(batch)
+        self.results.put((path, batch))
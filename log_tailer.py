@@ -0,0 +1,170 @@
+import codecs
+import ctypes
+import ctypes.util
+import glob
+import os
+import select
+import threading
+import time
+from typing import Callable, List, Optional
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+
+
+class _InotifyWatch:
+    """Minimal inotify wrapper that wakes up when files in a directory change."""
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout: float):
+        """Block until an event arrives or `timeout` seconds pass."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+def resumable_logs(directory: str) -> List[str]:
+    """Logs in `directory` with a saved offset, i.e. logs whose job had not finished when last followed."""
+    logs = [path[:-len(".offset")] for path in glob.glob(os.path.join(glob.escape(directory), "*.log.offset"))]
+    return sorted(path for path in logs if os.path.exists(path))
+
+
+class LogTailer:
+    """Follow a growing log file by byte offset and emit only newly written text.
+
+    The consumed offset is saved to `<log>.offset`, so a tailer created with
+    `resume=True` after a restart continues where the previous one stopped.
+    With `skip_existing=True` a fresh tailer ignores whatever the file already
+    holds; if the file is then truncated and rewritten, it restarts from zero.
+    Changes are detected with inotify where available and by polling otherwise.
+    With `idle_timeout` the tailer gives up, and forgets the saved offset, once
+    the log has not grown for that many seconds.
+    """
+
+    def __init__(self, log_file_path: str, callback: Callable[[str], None], resume: bool = True,
+                 skip_existing: bool = False, poll_interval: float = 0.5, chunk_size: int = 1 << 20,
+                 idle_timeout: Optional[float] = None):
+        self.log_file_path = os.path.abspath(log_file_path)
+        self.state_path = f"{self.log_file_path}.offset"
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.chunk_size = chunk_size
+        self.idle_timeout = idle_timeout
+        if resume:
+            self.offset = self._load_offset()
+        elif skip_existing and os.path.exists(self.log_file_path):
+            self.offset = os.path.getsize(self.log_file_path)
+        else:
+            self.offset = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"tail-{os.path.basename(self.log_file_path)}",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop following after one last read of anything still unread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def discard_state(self):
+        """Remove the saved offset once the log no longer needs to be resumed."""
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+
+    def read_new(self) -> str:
+        """Read everything appended since the last call and advance the offset."""
+        try:
+            size = os.path.getsize(self.log_file_path)
+        except OSError:
+            return ""
+        if size < self.offset:
+            # The log was truncated or replaced; start over.
+            self.offset = 0
+            self._decoder.reset()
+        if size == self.offset:
+            return ""
+
+        parts = []
+        with open(self.log_file_path, 'rb') as log_file:
+            log_file.seek(self.offset)
+            while self.offset < size:
+                chunk = log_file.read(min(self.chunk_size, size - self.offset))
+                if not chunk:
+                    break
+                self.offset += len(chunk)
+                parts.append(self._decoder.decode(chunk))
+        self._save_offset()
+        return "".join(parts)
+
+    def _run(self):
+        watch = None
+        try:
+            watch = _InotifyWatch(os.path.dirname(self.log_file_path))
+        except (OSError, AttributeError):
+            pass
+
+        try:
+            last_change = time.monotonic()
+            while not self._stop.is_set():
+                text = self.read_new()
+                if text:
+                    last_change = time.monotonic()
+                    self._emit(text)
+                elif self.idle_timeout is not None and time.monotonic() - last_change > self.idle_timeout:
+                    self.discard_state()
+                    return
+                if watch is not None:
+                    watch.wait(self.poll_interval)
+                else:
+                    self._stop.wait(self.poll_interval)
+            self._emit(self.read_new())
+        finally:
+            if watch is not None:
+                watch.close()
+
+    def _emit(self, text: str):
+        if text:
+            self.callback(text)
+
+    def _load_offset(self) -> int:
+        try:
+            with open(self.state_path, 'r') as state_file:
+                return int(state_file.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _save_offset(self):
+        # Bytes held back by the decoder (a split UTF-8 sequence) are not consumed yet.
+        pending = len(self._decoder.getstate()[0])
+        try:
+            with open(self.state_path, 'w') as state_file:
+                state_file.write(str(self.offset - pending))
+        except OSError:
+            pass
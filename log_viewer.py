@@ -0,0 +1,290 @@
+import bisect
+import mmap
+import os
+import threading
+import tkinter as tk
+from tkinter import messagebox
+import tkinter.font as tkfont
+
+import numpy as np
+
+from log_parser import LogIndex
+
+
+class LineIndex:
+    """Line lookup for a memory-mapped file.
+
+    Only every `stride`-th line start is stored; lines in between are found by
+    scanning at most `stride` newlines, so the index stays small for huge logs.
+    """
+
+    def __init__(self, file_path, stride=64, chunk_size=64 << 20):
+        self.file_path = file_path
+        self.stride = stride
+        self._file = open(file_path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.checkpoints, self.line_count = self._build(chunk_size)
+
+    def _build(self, chunk_size):
+        checkpoints = [np.zeros(1, dtype=np.int64)]
+        newlines = 0
+        for start in range(0, self.size, chunk_size):
+            count = min(chunk_size, self.size - start)
+            chunk = np.frombuffer(self.mm, dtype=np.uint8, count=count, offset=start)
+            line_starts = np.flatnonzero(chunk == 10).astype(np.int64) + (start + 1)
+            del chunk
+            # Line number of each start is newlines + 1 ... newlines + len(line_starts).
+            first = (-(newlines + 1)) % self.stride
+            checkpoints.append(line_starts[first::self.stride])
+            newlines += len(line_starts)
+
+        checkpoints = np.concatenate(checkpoints)
+        line_count = newlines
+        if self.size and self.mm[self.size - 1:self.size] != b"\n":
+            line_count += 1
+        # A checkpoint at EOF (file ending in a newline) is not a real line.
+        if len(checkpoints) and self.size and checkpoints[-1] >= self.size:
+            checkpoints = checkpoints[:-1]
+        return checkpoints, max(line_count, 1)
+
+    def __len__(self):
+        return self.line_count
+
+    def line_offset(self, line_number):
+        """Byte offset of a 0-based line."""
+        line_number = max(0, min(line_number, self.line_count - 1))
+        offset = int(self.checkpoints[line_number // self.stride])
+        for _ in range(line_number % self.stride):
+            offset = self.mm.find(b"\n", offset) + 1
+        return offset
+
+    def line_at_offset(self, offset):
+        """0-based line containing byte `offset`."""
+        checkpoint = int(np.searchsorted(self.checkpoints, offset, side='right')) - 1
+        start = int(self.checkpoints[checkpoint])
+        return checkpoint * self.stride + self.mm[start:offset].count(b"\n")
+
+    def lines(self, first, count):
+        """Decode `count` lines starting at line `first`, returned with their byte offsets."""
+        offset = self.line_offset(first)
+        lines = []
+        for _ in range(count):
+            if offset >= self.size:
+                break
+            end = self.mm.find(b"\n", offset)
+            if end == -1:
+                end = self.size
+            lines.append((offset, self.mm[offset:end].decode('utf-8', errors='replace').rstrip("\r")))
+            offset = end + 1
+        return lines
+
+    def close(self):
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self._file.close()
+
+
+class PagedLogViewer(tk.Frame):
+    """Text view that renders only the visible window of a log of any size."""
+
+    def __init__(self, parent, log_file_path, font=('Courier', 10)):
+        super().__init__(parent)
+        self.log_file_path = log_file_path
+        self.index = LineIndex(log_file_path)
+        self.top_line = 0
+        self.visible_lines = 40
+        self.sections = []
+        self.match_starts = []
+        self.match_ends = []
+        self._current_match = -1
+
+        nav_frame = tk.Frame(self)
+        nav_frame.pack(fill='x', padx=5, pady=(0, 5))
+
+        tk.Label(nav_frame, text="Line:").pack(side='left')
+        self.line_var = tk.StringVar()
+        line_entry = tk.Entry(nav_frame, textvariable=self.line_var, width=10)
+        line_entry.pack(side='left', padx=5)
+        line_entry.bind("<Return>", lambda event: self.goto_line_text(self.line_var.get()))
+        tk.Button(nav_frame, text="Go", command=lambda: self.goto_line_text(self.line_var.get())).pack(side='left')
+
+        tk.Label(nav_frame, text="Section:").pack(side='left', padx=(15, 0))
+        self.section_var = tk.StringVar(value="Indexing...")
+        self.section_menu = tk.OptionMenu(nav_frame, self.section_var, "Indexing...")
+        self.section_menu.pack(side='left', padx=5)
+
+        self.status_var = tk.StringVar()
+        tk.Label(nav_frame, textvariable=self.status_var, anchor='e').pack(side='right')
+
+        body = tk.Frame(self)
+        body.pack(expand=True, fill='both')
+        self.text = tk.Text(body, wrap='none', font=font, height=self.visible_lines, width=80)
+        self.line_height = max(1, tkfont.Font(root=self, font=font).metrics("linespace"))
+        self.vscroll = tk.Scrollbar(body, orient='vertical', command=self._on_scrollbar)
+        hscroll = tk.Scrollbar(body, orient='horizontal', command=self.text.xview)
+        self.text.configure(xscrollcommand=hscroll.set)
+        self.vscroll.pack(side='right', fill='y')
+        hscroll.pack(side='bottom', fill='x')
+        self.text.pack(side='left', expand=True, fill='both')
+
+        self.text.bind("<Configure>", self._on_resize)
+        self.text.bind("<MouseWheel>", self._on_mousewheel)
+        self.text.bind("<Button-4>", lambda event: self.scroll_lines(-3))
+        self.text.bind("<Button-5>", lambda event: self.scroll_lines(3))
+        self.text.bind("<Prior>", lambda event: self.scroll_lines(-self.visible_lines) or "break")
+        self.text.bind("<Next>", lambda event: self.scroll_lines(self.visible_lines) or "break")
+        self.text.bind("<Up>", lambda event: self.scroll_lines(-1) or "break")
+        self.text.bind("<Down>", lambda event: self.scroll_lines(1) or "break")
+        self.text.bind("<Control-Home>", lambda event: self.goto_line(0) or "break")
+        self.text.bind("<Control-End>", lambda event: self.goto_line(len(self.index)) or "break")
+
+        self.render()
+        self._load_sections()
+
+    def destroy(self):
+        self.index.close()
+        super().destroy()
+
+    def render(self):
+        """Draw the lines currently in view."""
+        self.top_line = max(0, min(self.top_line, len(self.index) - self.visible_lines))
+        lines = self.index.lines(self.top_line, self.visible_lines)
+
+        self.text.configure(state='normal')
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(line for _, line in lines))
+        self._highlight(lines)
+        self.text.configure(state='disabled')
+
+        total = len(self.index)
+        self.vscroll.set(self.top_line / total, min(1.0, (self.top_line + self.visible_lines) / total))
+        last = min(total, self.top_line + self.visible_lines)
+        self.status_var.set(f"Lines {self.top_line + 1}-{last} of {total}")
+
+    def scroll_lines(self, delta):
+        self.top_line += delta
+        self.render()
+
+    def goto_line(self, line_number):
+        """Scroll so that the 0-based line is at the top of the view."""
+        self.top_line = line_number
+        self.render()
+
+    def goto_offset(self, offset):
+        self.goto_line(self.index.line_at_offset(offset))
+
+    def goto_line_text(self, text):
+        try:
+            self.goto_line(int(text) - 1)
+        except ValueError:
+            messagebox.showwarning("Warning", f"Not a line number: {text}", parent=self)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.goto_line(int(float(amount) * len(self.index)))
+        elif action == "scroll":
+            step = self.visible_lines if unit == "pages" else 1
+            self.scroll_lines(int(amount) * step)
+
+    def _on_mousewheel(self, event):
+        self.scroll_lines(-3 if event.delta > 0 else 3)
+
+    def _on_resize(self, event):
+        visible = max(1, event.height // self.line_height)
+        if visible != self.visible_lines:
+            self.visible_lines = visible
+            self.render()
+
+    def _load_sections(self):
+        """Build the structured log index off the Tk thread, then fill the section menu."""
+        result = {}
+
+        def build():
+            try:
+                result["sections"] = LogIndex.load(self.log_file_path).sections()
+            except Exception as e:
+                result["error"] = e
+
+        worker = threading.Thread(target=build, daemon=True)
+        worker.start()
+
+        def poll():
+            if worker.is_alive():
+                self.after(100, poll)
+                return
+            self.sections = result.get("sections", [])
+            menu = self.section_menu["menu"]
+            menu.delete(0, tk.END)
+            for label, offset in self.sections:
+                menu.add_command(label=label, command=lambda o=offset, l=label: self._jump_to_section(l, o))
+            self.section_var.set("Jump to..." if self.sections else "No sections")
+
+        self.after(100, poll)
+
+    def _jump_to_section(self, label, offset):
+        self.section_var.set(label)
+        self.goto_offset(offset)
+
+    def clear_matches(self):
+        self.match_starts = []
+        self.match_ends = []
+        self._current_match = -1
+        self.render()
+
+    def add_matches(self, matches):
+        """Append (start, end) byte ranges found by a search, in file order."""
+        first_visible, last_visible = self._visible_range()
+        visible = False
+        for start, end in matches:
+            self.match_starts.append(start)
+            self.match_ends.append(end)
+            visible = visible or (start < last_visible and end > first_visible)
+        if visible:
+            self.render()
+
+    def goto_match(self, step=1):
+        """Move to the next (step=1) or previous (step=-1) match, wrapping around."""
+        if not self.match_starts:
+            return None
+        if self._current_match < 0:
+            position = self.index.line_offset(self.top_line)
+            self._current_match = bisect.bisect_left(self.match_starts, position)
+            if step < 0:
+                self._current_match -= 1
+        else:
+            self._current_match += step
+        self._current_match %= len(self.match_starts)
+        offset = self.match_starts[self._current_match]
+        self.goto_line(self.index.line_at_offset(offset) - self.visible_lines // 2)
+        return offset
+
+    def _visible_range(self):
+        first = self.index.line_offset(self.top_line)
+        last_line = self.top_line + self.visible_lines
+        last = self.index.size if last_line >= len(self.index) else self.index.line_offset(last_line)
+        return first, last
+
+    def _highlight(self, lines):
+        """Tag only the search matches that fall inside the visible lines."""
+        if not lines or not self.match_starts:
+            return
+        last_offset, last_text = lines[-1]
+        first_visible = lines[0][0]
+        last_visible = last_offset + len(last_text.encode('utf-8'))
+        # Matches never overlap, so their ends are sorted like their starts.
+        first = bisect.bisect_right(self.match_ends, first_visible)
+        last = bisect.bisect_left(self.match_starts, last_visible)
+        line_offsets = [offset for offset, _ in lines]
+        for match in range(first, last):
+            start, end = self.match_starts[match], self.match_ends[match]
+            self.text.tag_add("search", self._text_index(lines, line_offsets, start),
+                              self._text_index(lines, line_offsets, end))
+        self.text.tag_config("search", background="yellow")
+
+    def _text_index(self, lines, line_offsets, offset):
+        """Convert a byte offset inside the visible window to a Tk text index."""
+        row = max(0, bisect.bisect_right(line_offsets, offset) - 1)
+        line_offset = line_offsets[row]
+        column = len(self.index.mm[line_offset:offset].decode('utf-8', errors='replace'))
+        return f"{row + 1}.{min(column, len(lines[row][1]))}"
@@ -5,17 +5,43 @@ from openqp_input_generator import OpenQPInputGenerator
 from job_manager import JobManager
 from results_viewer import ResultsViewer
 from geometry_extractor import GeometryExtractor
+from optimization_trajectory import format_frame_xyz, save_trajectory
+from viewer_server import ViewerServer
+from result_cache import ResultCache
+from container_pool import ContainerPool
+from execution_backends import DockerBackend, NativeBackend, SchedulerBackend
+from job_chain import JobChain, restart_input
+from log_tailer import resumable_logs
+from pes_scan import PESScan, read_xyz
+import math
 import os
+import threading
+
+# A resumed log that stays this quiet (seconds) belongs to a job that has ended.
+RESUMED_LOG_IDLE_TIMEOUT = 1800
 
 class OpenQPGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("OpenQP GUI")
         
-        self.visualizer = MoleculeVisualizer(self.root)
+        self.viewer_server = ViewerServer().start()
+        self.visualizer = MoleculeVisualizer(self.root, server=self.viewer_server)
         self.input_generator = OpenQPInputGenerator(self.root)
-        self.job_manager = JobManager(self.root)
-        self.results_viewer = ResultsViewer(self.root)
+        self.container_pool = ContainerPool()
+        self.backends = {
+            "Docker": DockerBackend(),
+            "Warm Container Pool": self.container_pool,
+            "Native OpenQP": NativeBackend(),
+            "SLURM Array": SchedulerBackend("slurm"),
+            "PBS Array": SchedulerBackend("pbs"),
+        }
+        self.job_manager = JobManager(self.root, on_frame=self.show_live_frame, result_cache=ResultCache())
+        self.live_job_id = None
+        # The last submission, a job id or a JobChain, that a warm-started job follows.
+        self.last_submission = None
+        self.live_lock = threading.Lock()
+        self.results_viewer = ResultsViewer(self.root, server=self.viewer_server)
         
         calc_options = [
             "DFT Energy",
@@ -53,13 +79,41 @@ class OpenQPGUI:
         self.job_name_entry = tk.Entry(right_frame)
         self.job_name_entry.pack()
 
+        tk.Label(right_frame, text="Concurrent Jobs").pack()
+        self.max_workers_var = tk.IntVar(value=self.job_manager.max_workers)
+        tk.Spinbox(
+            right_frame, from_=1, to=os.cpu_count() or 1, width=5,
+            textvariable=self.max_workers_var, command=self.update_max_workers
+        ).pack()
+
+        self.live_view_var = tk.BooleanVar(value=True)
+        # Read by the job log threads, which must not touch Tk variables.
+        self.live_view = True
+        self.live_view_var.trace_add("write", lambda *args: setattr(self, "live_view", self.live_view_var.get()))
+        tk.Checkbutton(right_frame, text="Live Optimization View", variable=self.live_view_var).pack()
+        self.use_cache_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(right_frame, text="Reuse Cached Results", variable=self.use_cache_var).pack()
+        self.warm_start_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(right_frame, text="Warm Start From Previous Job", variable=self.warm_start_var).pack()
+
+        tk.Label(right_frame, text="Execution Backend").pack()
+        self.backend_var = StringVar(value="Docker")
+        OptionMenu(right_frame, self.backend_var, *self.backends, command=self.update_backend).pack()
+
         tk.Button(right_frame, text="Submit Job", command=self.submit_job).pack(pady=5)
+        tk.Button(right_frame, text="Cancel Job", command=self.cancel_job).pack(pady=5)
+        tk.Button(right_frame, text="Restart Job", command=self.restart_job).pack(pady=5)
 
         self.log_text = scrolledtext.ScrolledText(right_frame, wrap="word", height=5, width=40)
         self.log_text.pack(pady=5)
 
         tk.Button(right_frame, text="View Results", command=self.results_viewer.show_results).pack(pady=5)
         tk.Button(right_frame, text="Extract Optimized Geometry", command=self.extract_geometry).pack(pady=5)
+        tk.Button(right_frame, text="Export Optimization Trajectory", command=self.export_trajectory).pack(pady=5)
+        tk.Button(right_frame, text="PES Scan", command=self.open_scan_dialog).pack(pady=5)
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.resume_logs()
 
     def load_geometry(self):
         file_path = filedialog.askopenfilename(
@@ -116,8 +170,130 @@ class OpenQPGUI:
         input_file_path = self.input_generator.generate_input_file(self.input_text.get("1.0", tk.END), job_name)
         log_file_path = os.path.join(os.path.dirname(input_file_path), f"{job_name}.log")
 
-        if input_file_path:
-            self.job_manager._execute_job(input_file_path, log_file_path, self.log_text)
+        if not input_file_path:
+            return
+        if self.warm_start_var.get() and self.last_submission is not None:
+            # Waits for the previous job, then starts from its orbitals and optimized geometry.
+            try:
+                self.last_submission = self.job_manager.submit_chain(
+                    JobChain([input_file_path], carry_geometry=True, after=self.last_submission),
+                    self.log_text, self.use_cache_var.get()
+                )
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Error", str(e))
+            return
+        try:
+            self.last_submission = self.job_manager.submit(
+                input_file_path, log_file_path, self.log_text, self.use_cache_var.get()
+            )
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+
+    def restart_job(self):
+        """Resubmit a failed or killed optimization from the last geometry in its log."""
+        job_name = self.job_name_entry.get().strip()
+        if not job_name:
+            messagebox.showwarning("Warning", "Please enter a job name.")
+            return
+
+        try:
+            input_file_path = restart_input(os.path.join(os.getcwd(), f"{job_name}.inp"))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        restart_name = os.path.splitext(os.path.basename(input_file_path))[0]
+        self.job_name_entry.delete(0, tk.END)
+        self.job_name_entry.insert(0, restart_name)
+        with open(input_file_path, 'r') as input_file:
+            self.input_text.delete("1.0", tk.END)
+            self.input_text.insert("1.0", input_file.read())
+        try:
+            self.last_submission = self.job_manager.submit(
+                input_file_path, os.path.join(os.path.dirname(input_file_path), f"{restart_name}.log"),
+                self.log_text, self.use_cache_var.get()
+            )
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+
+    def update_max_workers(self):
+        self.job_manager.configure(max_workers=self.max_workers_var.get())
+
+    def update_backend(self, backend_name):
+        """Run jobs submitted from now on with the chosen backend; running jobs keep theirs."""
+        self.job_manager.backend = self.backends[backend_name]
+
+    def cancel_job(self):
+        job_name = self.job_name_entry.get().strip()
+        running = [job for job in self.job_manager.active_jobs() if not job_name or job.name == job_name]
+        if not running:
+            messagebox.showinfo("Cancel Job", "No running job to cancel.")
+            return
+
+        for job in running:
+            self.job_manager.cancel(job.job_id)
+
+    def show_live_frame(self, job, frame):
+        """Push an optimization step of a running job to the viewer; called from the job's log thread.
+
+        The viewer follows one job at a time: another job's steps take over only
+        once the job on screen has stopped running.
+        """
+        if not self.live_view:
+            return
+        with self.live_lock:
+            if job.job_id != self.live_job_id:
+                live_job = self.job_manager.jobs.get(self.live_job_id)
+                if live_job is not None and live_job.status == "running":
+                    return
+                self.live_job_id = job.job_id
+                self.viewer_server.show_trajectory(title=f"{job.name} (live)")
+
+            label = f"Step {frame['step']}"
+            if not math.isnan(frame["energy"]):
+                label += f"  E = {frame['energy']:.8f} Eh"
+                if len(job.energies) > 1 and not math.isnan(job.energies[-2]):
+                    label += f"  dE = {frame['energy'] - job.energies[-2]:+.2e}"
+            if not math.isnan(frame["gradient_norm"]):
+                label += f"  |g| = {frame['gradient_norm']:.2e}"
+
+            xyz = format_frame_xyz(frame["atomic_numbers"], frame["coordinates"], frame["step"],
+                                   frame["energy"], frame["gradient_norm"])
+            self.viewer_server.append_frame(xyz, label)
+
+    def resume_logs(self):
+        """Follow the logs of jobs that were left running when the GUI last quit."""
+        for log_file_path in resumable_logs(os.getcwd()):
+            self.log_text.insert(tk.END, f"Resuming log of {os.path.basename(log_file_path)}\n")
+            self.job_manager.follow_log(log_file_path, self.log_text, idle_timeout=RESUMED_LOG_IDLE_TIMEOUT)
+
+    def on_close(self):
+        """Quit, cancelling running jobs unless all of them can outlive the GUI and the user keeps them."""
+        running = [job for job in self.job_manager.active_jobs() if job.status == "running"]
+        if running and all(job.backend.outlives_gui for job in running):
+            cancel = messagebox.askyesnocancel(
+                "Quit",
+                f"{len(running)} job(s) are still running. Cancel them?\n\n"
+                "Choose No to leave them running; their logs are resumed the next time the GUI starts."
+            )
+        elif running:
+            # Native and warm-pool jobs end with the GUI, so they cannot be left running.
+            cancel = messagebox.askokcancel(
+                "Quit", f"{len(running)} job(s) are still running and will be cancelled. Quit anyway?"
+            ) or None
+        else:
+            cancel = True
+        if cancel is None:
+            return
+
+        if cancel:
+            self.job_manager.cancel_all()
+        else:
+            self.job_manager.detach()
+        # Left-running jobs never use the pool, so stopping it only ends idle or cancelled runners.
+        self.container_pool.stop()
+        self.viewer_server.stop()
+        self.root.destroy()
 
     def extract_geometry(self):
         job_name = self.job_name_entry.get().strip()
@@ -138,6 +314,91 @@ class OpenQPGUI:
         except ValueError as e:
             messagebox.showerror("Error", str(e))
 
+    def export_trajectory(self):
+        job_name = self.job_name_entry.get().strip()
+        if not job_name:
+            messagebox.showwarning("Warning", "Please enter a job name.")
+            return
+
+        log_file_path = os.path.join(os.getcwd(), f"{job_name}.log")
+
+        try:
+            trajectory, xyz_path, npz_path = save_trajectory(log_file_path, job_name)
+            self.viewer_server.show_trajectory(trajectory, f"{job_name} optimization")
+            messagebox.showinfo(
+                "Success",
+                f"Saved {len(trajectory)} optimization steps as {xyz_path} and {npz_path}"
+            )
+
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", str(e))
+
+    def open_scan_dialog(self):
+        """Ask for a bond, angle or dihedral and scan it on the current geometry."""
+        geometry_content = self.geometry_text.get("1.0", tk.END).strip()
+        job_name = self.job_name_entry.get().strip()
+        if not geometry_content or not job_name:
+            messagebox.showwarning("Warning", "Please enter a geometry and a job name.")
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("PES Scan")
+        entries = {}
+        for row, (label, default) in enumerate((("Atoms (2-4, from 1)", "1 2"), ("Start", "0.9"),
+                                                ("Stop", "1.5"), ("Points", "7"))):
+            tk.Label(dialog, text=label).grid(row=row, column=0, sticky="w", padx=5)
+            entries[label] = tk.Entry(dialog, width=12)
+            entries[label].insert(0, default)
+            entries[label].grid(row=row, column=1, padx=5)
+
+        def start_scan():
+            try:
+                atom_numbers = [int(atom) for atom in entries["Atoms (2-4, from 1)"].get().replace(",", " ").split()]
+                atom_count = len(read_xyz(geometry_content)[0])
+                if not all(1 <= atom <= atom_count for atom in atom_numbers):
+                    raise ValueError(f"Atom numbers must lie between 1 and {atom_count}")
+                first, last = float(entries["Start"].get()), float(entries["Stop"].get())
+                count = int(entries["Points"].get())
+                values = [first + (last - first) * i / max(1, count - 1) for i in range(max(1, count))]
+
+                xyz_path = os.path.join(os.getcwd(), f"{job_name}.xyz")
+                with open(xyz_path, 'w') as file:
+                    file.write(geometry_content + "\n")
+                # Keep the selected calculation if it is a single point, else use the scan's default.
+                calc_type = self.calc_type.get()
+                if self.input_generator.templates[calc_type]["input"]["runtype"] != "energy":
+                    calc_type = None
+                scan = PESScan(xyz_path, [atom - 1 for atom in atom_numbers], values, calc_type)
+                scan.write_inputs()
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Error", str(e), parent=dialog)
+                return
+
+            dialog.destroy()
+            thread = threading.Thread(
+                target=scan.run,
+                args=(self.job_manager, self.max_workers_var.get(), self.log_text, self.use_cache_var.get()),
+                daemon=True
+            )
+            thread.start()
+            self.root.after(500, self.finish_scan, scan, thread)
+
+        tk.Button(dialog, text="Run Scan", command=start_scan).grid(row=4, columnspan=2, pady=5)
+
+    def finish_scan(self, scan, thread):
+        """Tk callback: once the scan has run, save its energy curve and show it in the viewer."""
+        if thread.is_alive():
+            self.root.after(500, self.finish_scan, scan, thread)
+            return
+
+        saved = [scan.save_csv(), scan.save_npz()]
+        try:
+            saved.append(scan.plot())
+        except ValueError:
+            pass
+        self.viewer_server.show_trajectory(scan.trajectory(), f"{scan.name} scan")
+        messagebox.showinfo("PES Scan", "Saved " + ", ".join(saved))
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = OpenQPGUI(root)
@@ -0,0 +1,162 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from molden_parser import MoldenFile
+from mo_grid import DEFAULT_PADDING, DEFAULT_SPACING, CubeGrid, mo_cube
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "openqp_gui", "mo")
+
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file, remembered for as long as its size and mtime are unchanged."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        if key in _digests:
+            return _digests[key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    with _digests_lock:
+        _digests[key] = digest.hexdigest()
+    return _digests[key]
+
+
+class MOCache:
+    """Content-addressed cache of parsed Molden files and evaluated MO grids.
+
+    Entries are keyed by the SHA-256 of the Molden file, so renamed or copied
+    files still hit and edited files miss. Recently used entries are kept in
+    memory up to `memory_bytes`; every entry is also written as an .npz under
+    `directory`, which is trimmed to `disk_bytes` by least recent use.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, memory_bytes=256 << 20, disk_bytes=1 << 30):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def molden(self, path):
+        """Parsed MoldenFile for `path`, without MO coefficients."""
+        key = ("molden", file_digest(path))
+        molden = self._get_memory(key)
+        if molden is not None:
+            molden.path = path
+            return molden
+
+        disk_path = self._disk_path(key)
+        try:
+            molden = MoldenFile.load_npz(disk_path, path)
+            self._touch(disk_path)
+        except (OSError, ValueError, KeyError):
+            molden = MoldenFile.read(path, load_coefficients=False)
+            self._put_disk(disk_path, molden.save_npz)
+        self._put_memory(key, molden, self._molden_bytes(molden))
+        return molden
+
+    def cube(self, path, mo_index, spacing=DEFAULT_SPACING, padding=DEFAULT_PADDING):
+        """(grid, values) of one MO, evaluated only on a cache miss."""
+        key = ("cube", file_digest(path), int(mo_index), float(spacing), float(padding))
+        cached = self._get_memory(key)
+        if cached is not None:
+            return cached
+
+        disk_path = self._disk_path(key)
+        try:
+            with np.load(disk_path) as data:
+                cached = CubeGrid(data["origin"], data["spacing"], data["shape"]), data["values"]
+            self._touch(disk_path)
+        except (OSError, ValueError, KeyError):
+            grid, values = mo_cube(self.molden(path), mo_index, spacing, padding)
+            cached = grid, values
+            self._put_disk(disk_path, lambda target: np.savez(
+                target, origin=grid.origin, spacing=grid.spacing, shape=grid.shape, values=values))
+        self._put_memory(key, cached, cached[1].nbytes)
+        return cached
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                os.remove(os.path.join(self.directory, name))
+
+    def _get_memory(self, key):
+        with self._lock:
+            if key not in self._memory:
+                return None
+            self._memory.move_to_end(key)
+            return self._memory[key][0]
+
+    def _put_memory(self, key, value, size):
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory_used -= self._memory.pop(key)[1]
+            self._memory[key] = (value, size)
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes:
+                _, (_, evicted_size) = self._memory.popitem(last=False)
+                self._memory_used -= evicted_size
+
+    def _disk_path(self, key):
+        name = "-".join(str(part) for part in key)
+        return os.path.join(self.directory, f"{name}.npz")
+
+    def _put_disk(self, disk_path, save):
+        """Write an entry atomically, then evict the least recently used files over the cap."""
+        temporary = f"{disk_path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        try:
+            save(temporary)
+            os.replace(temporary, disk_path)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz") and not entry.name.endswith(".tmp.npz"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        used = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if used <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+                used -= size
+            except OSError:
+                pass
+
+    @staticmethod
+    def _touch(disk_path):
+        # Disk recency is tracked by mtime, which unlike atime is always updated.
+        try:
+            os.utime(disk_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _molden_bytes(molden):
+        arrays = (molden.atomic_numbers, molden.coordinates, molden.shell_atom, molden.shell_l,
+                  molden.shell_first_prim, molden.exponents, molden.contractions, molden.mo_energies,
+                  molden.mo_spins, molden.mo_occupations, molden.mo_offsets)
+        return sum(array.nbytes for array in arrays)
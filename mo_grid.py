@@ -0,0 +1,319 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from math import comb, factorial, log, pi, sqrt
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Cartesian component order used by Molden for each angular momentum.
+CARTESIAN_ORDER = {
+    0: [""],
+    1: ["x", "y", "z"],
+    2: ["xx", "yy", "zz", "xy", "xz", "yz"],
+    3: ["xxx", "yyy", "zzz", "xyy", "xxy", "xxz", "xzz", "yzz", "yyz", "xyz"],
+    4: ["xxxx", "yyyy", "zzzz", "xxxy", "xxxz", "yyyx", "yyyz", "zzzx", "zzzy",
+        "xxyy", "xxzz", "yyzz", "xxyz", "yyxz", "zzxy"],
+}
+
+DEFAULT_SPACING = 0.4
+DEFAULT_PADDING = 4.0
+
+
+def _double_factorial(n):
+    result = 1
+    while n > 1:
+        result *= n
+        n -= 2
+    return result
+
+
+def cartesian_powers(l):
+    """(ncart, 3) array of x, y, z exponents in Molden order."""
+    return np.array([[label.count(axis) for axis in "xyz"] for label in CARTESIAN_ORDER[l]], dtype=np.int64)
+
+
+def pure_transform(l):
+    """Racah-normalized real solid harmonics as rows over the Cartesian monomials.
+
+    Rows follow the Molden order m = 0, +1, -1, +2, -2, ...
+    """
+    powers = [tuple(row) for row in cartesian_powers(l)]
+    rows = []
+    for m in [0] + [sign * k for k in range(1, l + 1) for sign in (1, -1)]:
+        am = abs(m)
+        row = np.zeros(len(powers))
+        norm = sqrt(2 * factorial(l + am) * factorial(l - am) / (2 if m == 0 else 1)) / (2 ** am * factorial(l))
+        for t in range((l - am) // 2 + 1):
+            for u in range(t + 1):
+                # v runs over integers for m >= 0 and half-integers for m < 0; k = 2v.
+                for k in range(1 if m < 0 else 0, am + 1, 2):
+                    sign = (-1) ** (t + (k - (1 if m < 0 else 0)) // 2)
+                    coefficient = sign * 0.25 ** t * comb(l, t) * comb(l - t, am + t) * comb(t, u) * comb(am, k)
+                    power = (2 * t + am - 2 * u - k, 2 * u + k, l - 2 * t - am)
+                    row[powers.index(power)] += norm * coefficient
+        rows.append(row)
+    return np.array(rows)
+
+
+class CubeGrid:
+    """Regular, axis-aligned grid in bohr, laid out like a Gaussian cube file."""
+
+    def __init__(self, origin, spacing, shape):
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.spacing = float(spacing)
+        self.shape = tuple(int(n) for n in shape)
+
+    @classmethod
+    def around(cls, coordinates, spacing=DEFAULT_SPACING, padding=DEFAULT_PADDING):
+        """Grid enclosing all atoms with `padding` bohr to spare on each side."""
+        low = coordinates.min(axis=0) - padding
+        high = coordinates.max(axis=0) + padding
+        shape = np.ceil((high - low) / spacing).astype(int) + 1
+        return cls(low, spacing, shape)
+
+    @property
+    def n_points(self):
+        return self.shape[0] * self.shape[1] * self.shape[2]
+
+    def slab_points(self, ix_start, ix_stop):
+        """Cartesian points of the x-slab [ix_start, ix_stop), in cube (x, y, z) order."""
+        x = self.origin[0] + self.spacing * np.arange(ix_start, ix_stop)
+        y = self.origin[1] + self.spacing * np.arange(self.shape[1])
+        z = self.origin[2] + self.spacing * np.arange(self.shape[2])
+        return np.stack(np.meshgrid(x, y, z, indexing='ij'), axis=-1).reshape(-1, 3)
+
+
+class OrbitalGridEvaluator:
+    """Evaluates contracted Gaussian basis functions and MOs of a MoldenFile on a grid."""
+
+    def __init__(self, molden, chunk_points=200_000, cutoff=1e-8, batch_chunk_bytes=64 << 20):
+        self.molden = molden
+        self.chunk_points = chunk_points
+        self.batch_chunk_bytes = batch_chunk_bytes
+        self.atoms = {}
+        offset = 0
+        for shell_index, l in enumerate(molden.shell_l):
+            l = int(l)
+            first, last = molden.shell_first_prim[shell_index], molden.shell_first_prim[shell_index + 1]
+            exponents = molden.exponents[first:last]
+            contractions = molden.contractions[first:last]
+
+            # Primitive normalization for the x^l component, then renormalize the contraction.
+            primitive_norm = (2 * exponents / pi) ** 0.75 * (4 * exponents) ** (l / 2)
+            overlap = (2 * np.sqrt(np.outer(exponents, exponents)) / np.add.outer(exponents, exponents)) ** (l + 1.5)
+            coefficients = contractions * primitive_norm / sqrt(contractions @ overlap @ contractions)
+
+            powers = cartesian_powers(l)
+            if molden.is_pure(l):
+                transform = pure_transform(l) / sqrt(_double_factorial(2 * l - 1))
+            else:
+                component_norm = [sqrt(_double_factorial(2 * a - 1) * _double_factorial(2 * b - 1)
+                                       * _double_factorial(2 * c - 1)) for a, b, c in powers]
+                transform = np.diag(1.0 / np.array(component_norm))
+
+            atom_index = int(molden.shell_atom[shell_index])
+            atom = self.atoms.setdefault(atom_index, {
+                "center": molden.coordinates[atom_index],
+                "shells": [],
+                "l_max": 0,
+                "cutoff_r2": 0.0,
+            })
+            atom["shells"].append({
+                "l": l,
+                "exponents": exponents,
+                "coefficients": coefficients,
+                "powers": powers,
+                "transform": transform,
+                "first_function": offset,
+            })
+            atom["l_max"] = max(atom["l_max"], l)
+            # Beyond this radius every primitive on the atom has decayed below `cutoff`.
+            atom["cutoff_r2"] = max(atom["cutoff_r2"], -log(cutoff) / exponents.min())
+            offset += len(transform)
+        self.n_basis = offset
+
+    def _shell_terms(self, points):
+        """Yield (shell, point indices, radial values, Cartesian monomials) for every shell.
+
+        Distances and coordinate powers are computed once per atom and only for
+        points within the atom's cutoff radius.
+        """
+        for atom in self.atoms.values():
+            delta = points - atom["center"]
+            r2 = np.einsum('ij,ij->i', delta, delta)
+            inside = np.flatnonzero(r2 < atom["cutoff_r2"])
+            if not len(inside):
+                continue
+            delta, r2 = delta[inside], r2[inside]
+
+            exponent_range = np.arange(atom["l_max"] + 1)
+            x_powers = delta[:, 0, None] ** exponent_range
+            y_powers = delta[:, 1, None] ** exponent_range
+            z_powers = delta[:, 2, None] ** exponent_range
+
+            gaussians = {}
+            for shell in atom["shells"]:
+                # Split SP shells share their exponents; evaluate the Gaussians once.
+                key = shell["exponents"].tobytes()
+                if key not in gaussians:
+                    gaussians[key] = np.exp(-np.outer(r2, shell["exponents"]))
+                radial = gaussians[key] @ shell["coefficients"]
+
+                powers = shell["powers"]
+                if shell["l"] == 0:
+                    monomials = None
+                else:
+                    monomials = x_powers[:, powers[:, 0]] * y_powers[:, powers[:, 1]] * z_powers[:, powers[:, 2]]
+                yield shell, inside, radial, monomials
+
+    def basis_values(self, points):
+        """(n_basis, n_points) values of every basis function at `points`."""
+        values = np.zeros((self.n_basis, len(points)))
+        for shell, inside, radial, monomials in self._shell_terms(points):
+            first = shell["first_function"]
+            if monomials is None:
+                values[first, inside] = shell["transform"][0, 0] * radial
+            else:
+                values[first:first + len(shell["transform"]), inside] = \
+                    shell["transform"] @ (monomials * radial[:, None]).T
+        return values
+
+    def evaluate_mo(self, coefficients, grid):
+        """Values of one MO on `grid` as an array shaped like the grid."""
+        coefficients = np.asarray(coefficients, dtype=np.float64)
+        result = np.zeros(grid.shape)
+        for ix_start, ix_stop in self._slabs(grid):
+            points = grid.slab_points(ix_start, ix_stop)
+            values = np.zeros(len(points))
+            for shell, inside, radial, monomials in self._shell_terms(points):
+                first = shell["first_function"]
+                # Fold the MO coefficients into the angular part: one weight per monomial.
+                weights = coefficients[first:first + len(shell["transform"])] @ shell["transform"]
+                if monomials is None:
+                    values[inside] += weights[0] * radial
+                else:
+                    values[inside] += radial * (monomials @ weights)
+            result[ix_start:ix_stop] = values.reshape(ix_stop - ix_start, grid.shape[1], grid.shape[2])
+        return result
+
+    def evaluate_mos(self, coefficient_matrix, grid, workers=None):
+        """Values of several MOs on `grid`, shaped (n_mo,) + grid.shape.
+
+        Basis functions are evaluated once per slab and shared by all orbitals
+        through a single matrix product. With `workers` > 1 the slabs are spread
+        over a process pool that writes straight into shared memory. The pool
+        is spawned, not forked, since the GUI calling this runs other threads.
+        """
+        coefficient_matrix = np.atleast_2d(np.asarray(coefficient_matrix, dtype=np.float64))
+        shape = (len(coefficient_matrix),) + grid.shape
+        workers = workers or os.cpu_count() or 1
+        slabs = list(self._slabs(grid, self.batch_chunk_bytes // (8 * max(1, self.n_basis))))
+
+        if workers == 1 or len(slabs) == 1:
+            result = np.zeros(shape)
+            for ix_start, ix_stop in slabs:
+                self._evaluate_slab(coefficient_matrix, grid, result, ix_start, ix_stop)
+            return result
+
+        memory = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(slabs)),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self, coefficient_matrix, grid, memory.name, shape)
+            ) as pool:
+                for _ in pool.map(_evaluate_worker_slab, slabs):
+                    pass
+            return np.ndarray(shape, dtype=np.float64, buffer=memory.buf).copy()
+        finally:
+            memory.close()
+            memory.unlink()
+
+    def _evaluate_slab(self, coefficient_matrix, grid, result, ix_start, ix_stop):
+        points = grid.slab_points(ix_start, ix_stop)
+        values = coefficient_matrix @ self.basis_values(points)
+        result[:, ix_start:ix_stop] = values.reshape(len(coefficient_matrix), ix_stop - ix_start,
+                                                      grid.shape[1], grid.shape[2])
+
+    def _slabs(self, grid, chunk_points=None):
+        """Split the grid into x-slabs of about `chunk_points` points to bound memory."""
+        slab = max(1, (chunk_points or self.chunk_points) // (grid.shape[1] * grid.shape[2]))
+        for ix_start in range(0, grid.shape[0], slab):
+            yield ix_start, min(grid.shape[0], ix_start + slab)
+
+
+_worker_state = {}
+
+
+def _init_worker(evaluator, coefficient_matrix, grid, memory_name, shape):
+    memory = shared_memory.SharedMemory(name=memory_name)
+    _worker_state.update(
+        evaluator=evaluator,
+        coefficient_matrix=coefficient_matrix,
+        grid=grid,
+        memory=memory,
+        result=np.ndarray(shape, dtype=np.float64, buffer=memory.buf),
+    )
+
+
+def _evaluate_worker_slab(slab):
+    state = _worker_state
+    state["evaluator"]._evaluate_slab(state["coefficient_matrix"], state["grid"], state["result"], *slab)
+
+
+def cube_text(molden, grid, values, comment="Molecular orbital"):
+    """Format grid values as a Gaussian cube file."""
+    lines = [
+        comment,
+        "Generated by OpenQP GUI",
+        f"{len(molden.atomic_numbers):5d}{grid.origin[0]:12.6f}{grid.origin[1]:12.6f}{grid.origin[2]:12.6f}",
+    ]
+    for axis in range(3):
+        step = [0.0, 0.0, 0.0]
+        step[axis] = grid.spacing
+        lines.append(f"{grid.shape[axis]:5d}{step[0]:12.6f}{step[1]:12.6f}{step[2]:12.6f}")
+    for number, (x, y, z) in zip(molden.atomic_numbers, molden.coordinates):
+        lines.append(f"{number:5d}{float(number):12.6f}{x:12.6f}{y:12.6f}{z:12.6f}")
+
+    nz = grid.shape[2]
+    full, rest = divmod(nz, 6)
+    row_format = ("%13.5E" * 6 + "\n") * full + ("%13.5E" * rest + "\n" if rest else "")
+    rows = np.asarray(values, dtype=np.float64).reshape(-1, nz).tolist()
+    return "\n".join(lines) + "\n" + "".join(row_format % tuple(row) for row in rows)
+
+
+def write_cube(path, molden, grid, values, comment="Molecular orbital"):
+    with open(path, 'w') as cube_file:
+        cube_file.write(cube_text(molden, grid, values, comment))
+    return path
+
+
+def mo_cube(molden, mo_index, spacing=DEFAULT_SPACING, padding=DEFAULT_PADDING):
+    """Evaluate one MO around the molecule and return (grid, values)."""
+    grid = CubeGrid.around(molden.coordinates, spacing, padding)
+    values = OrbitalGridEvaluator(molden).evaluate_mo(molden.load_mo(mo_index), grid)
+    return grid, values
+
+
+def mo_cubes(molden, mo_indices, spacing=DEFAULT_SPACING, padding=DEFAULT_PADDING, workers=None):
+    """Evaluate several MOs on one shared grid and return (grid, {index: values})."""
+    mo_indices = list(mo_indices)
+    grid = CubeGrid.around(molden.coordinates, spacing, padding)
+    coefficients = np.array([molden.load_mo(index) for index in mo_indices])
+    values = OrbitalGridEvaluator(molden).evaluate_mos(coefficients, grid, workers)
+    return grid, dict(zip(mo_indices, values))
+
+
+def write_mo_cubes(directory, molden, mo_indices, prefix="mo", spacing=DEFAULT_SPACING,
+                   padding=DEFAULT_PADDING, workers=None):
+    """Evaluate a batch of MOs and write one `<prefix>_<n>.cube` per orbital."""
+    os.makedirs(directory, exist_ok=True)
+    grid, values = mo_cubes(molden, mo_indices, spacing, padding, workers)
+    paths = []
+    for index, mo_values in values.items():
+        path = os.path.join(directory, f"{prefix}_{index + 1}.cube")
+        comment = f"MO {index + 1} E={molden.mo_energies[index]:.6f}"
+        paths.append(write_cube(path, molden, grid, mo_values, comment))
+    return paths
@@ -0,0 +1,347 @@
+import mmap
+import os
+from array import array
+from typing import List, Optional
+
+import numpy as np
+
+from geometry_extractor import PERIODIC_TABLE
+
+BOHR_PER_ANGSTROM = 1.0 / 0.52917721092
+
+ANGULAR_MOMENTUM = {"s": 0, "p": 1, "d": 2, "f": 3, "g": 4}
+
+SYMBOL_TO_NUMBER = {symbol.lower(): number for number, symbol in PERIODIC_TABLE.items()}
+
+
+def _to_float(text):
+    return float(text.replace('D', 'E').replace('d', 'e'))
+
+
+class MoldenFile:
+    """Atoms, contracted Gaussian basis and MOs of a Molden file as NumPy arrays.
+
+    Coordinates are stored in bohr. The basis is flattened into shells: shell i
+    sits on atom `shell_atom[i]` with angular momentum `shell_l[i]`, and its
+    primitives are `exponents[shell_first_prim[i]:shell_first_prim[i + 1]]` with
+    `contractions` alongside. SP shells are split into an S and a P shell.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.symbols: List[str] = []
+        self.atomic_numbers = np.zeros(0, dtype=np.int32)
+        self.coordinates = np.zeros((0, 3))
+        self.shell_atom = np.zeros(0, dtype=np.int32)
+        self.shell_l = np.zeros(0, dtype=np.int32)
+        self.shell_first_prim = np.zeros(1, dtype=np.int64)
+        self.exponents = np.zeros(0)
+        self.contractions = np.zeros(0)
+        self.pure_d = False
+        self.pure_f = False
+        self.pure_g = False
+        self.mo_symmetries: List[str] = []
+        self.mo_energies = np.zeros(0)
+        self.mo_spins = np.zeros(0, dtype=np.int8)
+        self.mo_occupations = np.zeros(0)
+        self.mo_offsets = np.zeros(0, dtype=np.int64)
+        self.mo_coefficients: Optional[np.ndarray] = None
+
+    @classmethod
+    def read(cls, path, load_coefficients=True):
+        """Parse a Molden file in one streaming pass.
+
+        With `load_coefficients=False` the MO coefficient blocks are skipped and
+        single orbitals can be fetched later with `load_mo`.
+        """
+        molden = cls(path)
+        molden._parse(load_coefficients)
+        return molden
+
+    @property
+    def n_mo(self):
+        return len(self.mo_energies)
+
+    @property
+    def n_basis(self):
+        return int(sum(self.shell_size(l) for l in self.shell_l))
+
+    def is_pure(self, l):
+        return (l == 2 and self.pure_d) or (l == 3 and self.pure_f) or (l == 4 and self.pure_g)
+
+    def shell_size(self, l):
+        return 2 * l + 1 if self.is_pure(l) else (l + 1) * (l + 2) // 2
+
+    @property
+    def coordinates_angstrom(self):
+        return self.coordinates / BOHR_PER_ANGSTROM
+
+    def xyz_lines(self):
+        """Atoms as XYZ text lines in Angstrom."""
+        return [
+            f"{symbol} {x:.6f} {y:.6f} {z:.6f}"
+            for symbol, (x, y, z) in zip(self.symbols, self.coordinates_angstrom)
+        ]
+
+    def save_npz(self, path):
+        """Store the parsed arrays; MO coefficients are left to `load_mo`."""
+        np.savez(
+            path,
+            symbols=np.array(self.symbols, dtype=str),
+            atomic_numbers=self.atomic_numbers,
+            coordinates=self.coordinates,
+            shell_atom=self.shell_atom,
+            shell_l=self.shell_l,
+            shell_first_prim=self.shell_first_prim,
+            exponents=self.exponents,
+            contractions=self.contractions,
+            pure=np.array([self.pure_d, self.pure_f, self.pure_g]),
+            mo_symmetries=np.array(self.mo_symmetries, dtype=str),
+            mo_energies=self.mo_energies,
+            mo_spins=self.mo_spins,
+            mo_occupations=self.mo_occupations,
+            mo_offsets=self.mo_offsets
+        )
+        return path
+
+    @classmethod
+    def load_npz(cls, path, molden_path):
+        """Rebuild a MoldenFile saved with `save_npz` for the unchanged file at `molden_path`."""
+        molden = cls(molden_path)
+        with np.load(path) as data:
+            molden.symbols = data["symbols"].tolist()
+            molden.atomic_numbers = data["atomic_numbers"]
+            molden.coordinates = data["coordinates"]
+            molden.shell_atom = data["shell_atom"]
+            molden.shell_l = data["shell_l"]
+            molden.shell_first_prim = data["shell_first_prim"]
+            molden.exponents = data["exponents"]
+            molden.contractions = data["contractions"]
+            molden.pure_d, molden.pure_f, molden.pure_g = (bool(flag) for flag in data["pure"])
+            molden.mo_symmetries = data["mo_symmetries"].tolist()
+            molden.mo_energies = data["mo_energies"]
+            molden.mo_spins = data["mo_spins"]
+            molden.mo_occupations = data["mo_occupations"]
+            molden.mo_offsets = data["mo_offsets"]
+        return molden
+
+    def frontier_indices(self, below=5, above=5):
+        """MO indices from HOMO-`below` to LUMO+`above` for every spin present."""
+        indices = []
+        for spin in np.unique(self.mo_spins):
+            members = np.flatnonzero(self.mo_spins == spin)
+            members = members[np.argsort(self.mo_energies[members], kind='stable')]
+            occupied = np.flatnonzero(self.mo_occupations[members] > 0)
+            homo = int(occupied[-1]) if len(occupied) else -1
+            indices.extend(int(i) for i in members[max(0, homo - below):homo + 2 + above])
+        return indices
+
+    def mo_labels(self):
+        """Menu labels such as "HOMO-1 (α, −0.342 Eh)", one per MO in file order.
+
+        Orbitals are placed relative to the highest occupied orbital of their
+        spin; without occupations they fall back to "MO n".
+        """
+        labels = [f"MO {index + 1}" for index in range(self.n_mo)]
+        for spin in np.unique(self.mo_spins):
+            members = np.flatnonzero(self.mo_spins == spin)
+            members = members[np.argsort(self.mo_energies[members], kind='stable')]
+            occupied = np.flatnonzero(self.mo_occupations[members] > 0)
+            if not len(occupied):
+                continue
+            homo = int(occupied[-1])
+            spin_symbol = "β" if spin else "α"
+            for position, index in enumerate(members):
+                if position <= homo:
+                    name = "HOMO" if position == homo else f"HOMO-{homo - position}"
+                else:
+                    name = "LUMO" if position == homo + 1 else f"LUMO+{position - homo - 1}"
+                energy = f"{self.mo_energies[index]:.3f}".replace("-", "−")
+                labels[index] = f"{name} ({spin_symbol}, {energy} Eh)"
+        return labels
+
+    def load_mo(self, index):
+        """Return the coefficients of one MO, reading only its block from disk."""
+        if self.mo_coefficients is not None:
+            return self.mo_coefficients[index]
+
+        coefficients = np.zeros(self.n_basis)
+        with open(self.path, 'rb') as molden_file:
+            molden_file.seek(int(self.mo_offsets[index]))
+            seen_coefficients = False
+            for raw_line in molden_file:
+                line = raw_line.decode('latin-1')
+                stripped = line.strip()
+                if not stripped:
+                    continue
+                if stripped.startswith('['):
+                    break
+                if '=' in stripped:
+                    if seen_coefficients:
+                        break
+                    continue
+                seen_coefficients = True
+                parts = stripped.split()
+                coefficients[int(parts[0]) - 1] = _to_float(parts[1])
+        return coefficients
+
+    @staticmethod
+    def _scan_mo_headers(molden_file, start):
+        """Read only the "Key= value" MO header lines from `start` to the next section.
+
+        Coefficient lines never contain '=', so jumping between '=' signs skips
+        them without decoding, which is what keeps large files cheap to open.
+        A repeated key starts a new MO.
+        """
+        headers = []
+        if os.fstat(molden_file.fileno()).st_size <= start:
+            return headers
+        with mmap.mmap(molden_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = mm.find(b"\n[", start - 1)
+            end = len(mm) if end == -1 else end + 1
+            position = mm.find(b"=", start, end)
+            while position != -1:
+                line_start = max(start, mm.rfind(b"\n", start, position) + 1)
+                line_end = mm.find(b"\n", position, end)
+                if line_end == -1:
+                    line_end = end
+                key = mm[line_start:position].decode('latin-1').strip().lower()
+                if not headers or key in headers[-1]:
+                    headers.append({"offset": line_start})
+                headers[-1][key] = mm[position + 1:line_end].decode('latin-1').strip()
+                position = mm.find(b"=", line_end, end)
+        return headers
+
+    def _parse(self, load_coefficients):
+        section = None
+        atom_rows = []
+        angstrom = True
+        shell_atom, shell_l, shell_first = array('i'), array('i'), array('q', [0])
+        exponents, contractions = array('d'), array('d')
+        gto_atom = None
+        shell = None  # (label, nprim, scale) of the shell being read
+        prim_rows = []
+        mo_headers = []
+        coefficient_rows, coefficient_columns, coefficient_values = array('q'), array('q'), array('d')
+        in_header = False
+
+        def flush_shell():
+            nonlocal shell
+            if shell is None:
+                return
+            label, _, scale = shell
+            factor = scale * scale if scale else 1.0
+            split = [(0, 1), (1, 2)] if label == "sp" else [(ANGULAR_MOMENTUM[label], 1)]
+            for l, column in split:
+                shell_atom.append(gto_atom)
+                shell_l.append(l)
+                for row in prim_rows:
+                    exponents.append(row[0] * factor)
+                    contractions.append(row[column])
+                shell_first.append(len(exponents))
+            shell = None
+            prim_rows.clear()
+
+        offset = 0
+        with open(self.path, 'rb') as molden_file:
+            for raw_line in molden_file:
+                line_offset = offset
+                offset += len(raw_line)
+                stripped = raw_line.decode('latin-1').strip()
+
+                if stripped.startswith('['):
+                    if section == "gto":
+                        flush_shell()
+                    name = stripped.lower()
+                    section = None
+                    if name.startswith("[atoms]"):
+                        section = "atoms"
+                        angstrom = "au" not in name[len("[atoms]"):]
+                    elif name.startswith("[gto]"):
+                        section = "gto"
+                        gto_atom = None
+                    elif name.startswith("[mo]"):
+                        section = "mo"
+                        in_header = False
+                        if not load_coefficients:
+                            mo_headers = self._scan_mo_headers(molden_file, offset)
+                            break
+                    elif name in ("[5d]", "[5d7f]"):
+                        self.pure_d = self.pure_f = True
+                    elif name == "[5d10f]":
+                        self.pure_d = True
+                    elif name == "[7f]":
+                        self.pure_f = True
+                    elif name == "[9g]":
+                        self.pure_g = True
+                    continue
+
+                if section == "atoms":
+                    parts = stripped.split()
+                    if len(parts) >= 6:
+                        atom_rows.append((parts[0], int(parts[2]), *map(_to_float, parts[3:6])))
+
+                elif section == "gto":
+                    parts = stripped.split()
+                    shell_complete = shell is None or len(prim_rows) >= shell[1]
+                    if not parts:
+                        flush_shell()
+                        gto_atom = None
+                    elif gto_atom is None or (shell_complete and parts[0].isdigit()):
+                        flush_shell()
+                        gto_atom = int(parts[0]) - 1
+                    elif shell_complete and (parts[0].lower() in ANGULAR_MOMENTUM or parts[0].lower() == "sp"):
+                        flush_shell()
+                        scale = _to_float(parts[2]) if len(parts) > 2 else 1.0
+                        shell = (parts[0].lower(), int(parts[1]), scale)
+                    else:
+                        prim_rows.append([_to_float(value) for value in parts])
+
+                elif section == "mo":
+                    if not stripped:
+                        continue
+                    if '=' in stripped:
+                        if not in_header:
+                            in_header = True
+                            mo_headers.append({"offset": line_offset})
+                        key, value = (part.strip() for part in stripped.split('=', 1))
+                        mo_headers[-1][key.lower()] = value
+                    else:
+                        in_header = False
+                        if load_coefficients:
+                            index, value = stripped.split()[:2]
+                            coefficient_rows.append(len(mo_headers) - 1)
+                            coefficient_columns.append(int(index) - 1)
+                            coefficient_values.append(_to_float(value))
+
+        if section == "gto":
+            flush_shell()
+
+        self.symbols = [row[0] for row in atom_rows]
+        self.atomic_numbers = np.array(
+            [row[1] or SYMBOL_TO_NUMBER.get(row[0].lower(), 0) for row in atom_rows], dtype=np.int32
+        )
+        coordinates = np.array([row[2:5] for row in atom_rows], dtype=np.float64).reshape(-1, 3)
+        self.coordinates = coordinates * BOHR_PER_ANGSTROM if angstrom else coordinates
+
+        self.shell_atom = np.array(shell_atom, dtype=np.int32)
+        self.shell_l = np.array(shell_l, dtype=np.int32)
+        self.shell_first_prim = np.array(shell_first, dtype=np.int64)
+        self.exponents = np.array(exponents, dtype=np.float64)
+        self.contractions = np.array(contractions, dtype=np.float64)
+
+        self.mo_symmetries = [header.get("sym", "") for header in mo_headers]
+        self.mo_energies = np.array([_to_float(header.get("ene", "0.0")) for header in mo_headers])
+        self.mo_spins = np.array(
+            [1 if header.get("spin", "alpha").lower().startswith("beta") else 0 for header in mo_headers],
+            dtype=np.int8
+        )
+        self.mo_occupations = np.array([_to_float(header.get("occup", "0.0")) for header in mo_headers])
+        self.mo_offsets = np.array([header["offset"] for header in mo_headers], dtype=np.int64)
+
+        if load_coefficients:
+            rows = np.array(coefficient_rows, dtype=np.int64)
+            columns = np.array(coefficient_columns, dtype=np.int64)
+            n_basis = max(self.n_basis, int(columns.max()) + 1 if len(columns) else 0)
+            self.mo_coefficients = np.zeros((len(mo_headers), n_basis))
+            self.mo_coefficients[rows, columns] = np.array(coefficient_values, dtype=np.float64)
@@ -2,14 +2,20 @@ import tkinter as tk
 from tkinter import messagebox
 import os
 import webbrowser
-import json
+from viewer_assets import PAYLOAD_DECODER, payload_tag, script_tag
 
 class MoleculeVisualizer:
-    def __init__(self, parent):
-        """Initialize the MoleculeVisualizer with a parent window."""
+    def __init__(self, parent, js_mode="shared", server=None):
+        """Initialize the MoleculeVisualizer with a parent window.
+
+        With a running `ViewerServer` molecules are pushed to its browser tab;
+        otherwise an HTML page is written and `js_mode` selects how 3Dmol.js is
+        loaded (see `viewer_assets.script_tag`).
+        """
         self.parent = parent
         self.file_path = None
-        self.js_url = "https://3Dmol.org/build/3Dmol-min.js"
+        self.js_mode = js_mode
+        self.server = server
         
     def set_geometry_path(self, path):
         """Set the path of the geometry file to visualize."""
@@ -39,7 +45,7 @@ class MoleculeVisualizer:
         <html>
         <head>
             <meta charset="utf-8">
-            <script src="{self.js_url}"></script>
+            {script_tag(self.js_mode)}
             <style>
                 #viewer_container {{
                     width: 100%;
@@ -50,14 +56,16 @@ class MoleculeVisualizer:
         </head>
         <body>
             <div id="viewer_container"></div>
+            {payload_tag("xyz_payload", xyz_data)}
             <script>
-                document.addEventListener('DOMContentLoaded', function() {{
+                {PAYLOAD_DECODER}
+                document.addEventListener('DOMContentLoaded', async function() {{
                     let viewer = $3Dmol.createViewer(
                         document.getElementById('viewer_container'),
                         {{backgroundColor: 'white'}}
                     );
                     
-                    viewer.addModel({json.dumps(xyz_data)}, "xyz");
+                    viewer.addModel(await openqpPayload("xyz_payload"), "xyz");
                     viewer.setStyle({{"stick": {{}}}});
                     viewer.zoomTo();
                     viewer.render();
@@ -71,6 +79,10 @@ class MoleculeVisualizer:
         """Display the molecule structure using 3Dmol.js."""
         try:
             xyz_data = self._read_xyz_file()
+
+            if self.server is not None:
+                self.server.show_geometry(xyz_data, os.path.basename(self.file_path))
+                return
             
             html_content = self._generate_html(xyz_data)
             
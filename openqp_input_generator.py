@@ -1,153 +1,145 @@
+import glob
+import itertools
 import os
+import re
+import shutil
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
+# Short names for the keys most often varied, as (section, key).
+PARAMETER_KEYS = {
+    "system": ("input", "system"),
+    "charge": ("input", "charge"),
+    "basis": ("input", "basis"),
+    "functional": ("input", "functional"),
+    "method": ("input", "method"),
+    "multiplicity": ("scf", "multiplicity"),
+    "scf_type": ("scf", "type"),
+    "nstate": ("tdhf", "nstate"),
+    "istate": ("optimize", "istate"),
+}
+
+
+def calculation_template(runtype, method, nstate=None, istate=None, charge=0, basis="3-21g",
+                         functional="bhhlyp"):
+    """Sections of an OpenQP input as {section: {key: value}}.
+
+    MRSF-TDDFT (method=tdhf) runs from a triplet ROHF reference, everything
+    else from a closed-shell RHF.
+    """
+    mrsf = method == "tdhf"
+    sections = {
+        "input": {
+            "system": "water.xyz",
+            "charge": str(charge),
+            "runtype": runtype,
+            "basis": basis,
+            "functional": functional,
+            "method": method,
+        },
+        "guess": {"type": "huckel", "save_mol": "True"},
+        "scf": {
+            "multiplicity": "3" if mrsf else "1",
+            "type": "rohf" if mrsf else "rhf",
+            "save_molden": "True",
+        },
+    }
+    if mrsf:
+        sections["tdhf"] = {"type": "mrsf", "nstate": str(nstate)}
+    if runtype == "optimize":
+        sections["optimize"] = {"istate": str(istate)}
+    return sections
+
+
+def render_input(sections):
+    """Serialize {section: {key: value}} to OpenQP's INI-style input text."""
+    return "\n".join(
+        f"[{section}]\n" + "".join(f"{key}={value}\n" for key, value in keys.items())
+        for section, keys in sections.items()
+    )
+
+
+def parse_input(input_text):
+    """Sections of an OpenQP input text as {section: {key: value}}, the inverse of render_input."""
+    sections = {}
+    current = None
+    for raw_line in input_text.splitlines():
+        line = raw_line.split("#", 1)[0].split(";", 1)[0].strip()
+        if line.startswith("[") and line.endswith("]"):
+            current = sections.setdefault(line[1:-1].strip(), {})
+        elif "=" in line and current is not None:
+            key, value = (part.strip() for part in line.split("=", 1))
+            current[key] = value
+    return sections
+
+
+def warm_start(sections, guess_file, system_file=None):
+    """Copy of `sections` that starts from the orbitals saved by an earlier job (`save_mol` JSON).
+
+    With `system_file` the geometry is replaced as well, e.g. by the result of
+    an optimization.
+    """
+    updated = {section: dict(keys) for section, keys in sections.items()}
+    updated.setdefault("guess", {}).update(type="json", file=guess_file)
+    if system_file is not None:
+        updated.setdefault("input", {})["system"] = system_file
+    return updated
+
+
+def apply_parameters(sections, parameters):
+    """Copy of `sections` with parameters set, named by PARAMETER_KEYS or as "section.key".
+
+    Keys whose section the calculation does not have (e.g. nstate for a
+    ground-state DFT run) are ignored, so such sweep points collapse into one.
+    """
+    updated = {section: dict(keys) for section, keys in sections.items()}
+    for name, value in parameters.items():
+        if name in PARAMETER_KEYS:
+            section, key = PARAMETER_KEYS[name]
+        elif "." in name:
+            section, key = name.split(".", 1)
+        else:
+            raise ValueError(f"Unknown input parameter: {name}")
+        if section in updated:
+            updated[section][key] = str(value)
+    return updated
+
+
+def parameter_grid(parameters):
+    """Cartesian product of {name: [values]} as a list of {name: value}, dropping repeated values."""
+    names = list(parameters)
+    values = [list(dict.fromkeys(str(value).strip() for value in parameters[name])) for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
 class OpenQPInputGenerator:
     def __init__(self, parent):
         self.parent = parent
-        
+
         #  templates for each calculation type
         self.templates = {
-            "DFT Energy": """[input]
-system=water.xyz
-charge=0
-functional=bhhlyp
-basis=3-21g
-method=hf
-runtype=energy
-
-[guess]
-type=huckel
-save_mol=True
-
-[scf]
-multiplicity=1
-type=rhf
-save_molden=True
-
-""",
-            "DFT Geometry Optimization": """[input]
-system=water.xyz
-charge=0
-functional=bhhlyp
-basis=3-21g
-runtype=optimize
-method=hf
-
-[guess]
-type=huckel
-save_mol=True
-
-[scf]
-type=rhf
-multiplicity=1
-save_molden=True
-
-[optimize]
-istate=0
-""",
-            "MRSF-TDDFT Ground State Energy": """[input]
-system=water.xyz
-charge=0
-runtype=energy
-basis=3-21g
-functional=bhhlyp
-method=tdhf
-
-[guess]
-type=huckel
-save_mol=True
-
-[scf]
-multiplicity=3
-type=rohf
-save_molden=True
-
-[tdhf]
-type=mrsf
-nstate=1
-""",
-            "MRSF-TDDFT First Excited State Energy": """[input]
-system=water.xyz
-charge=0
-runtype=energy
-basis=3-21g
-functional=bhhlyp
-method=tdhf
-
-[guess]
-type=huckel
-save_mol=True
-
-[scf]
-multiplicity=3
-type=rohf
-save_molden=True
-
-[tdhf]
-type=mrsf
-nstate=2
-""",
-            "MRSF-TDDFT Ground State Geometry Optimization": """[input]
-system=water.xyz
-charge=0
-runtype=optimize
-basis=3-21g
-functional=bhhlyp
-method=tdhf
-
-[guess]
-type=huckel
-save_mol=True
-
-[scf]
-multiplicity=3
-type=rohf
-save_molden=True
-
-[tdhf]
-type=mrsf
-nstate=3
-
-[optimize]
-istate=1
-""",
-            "MRSF-TDDFT First Excited State Geometry Optimization": """[input]
-system=water.xyz
-charge=0
-runtype=optimize
-basis=3-21g
-functional=bhhlyp
-method=tdhf
-
-[guess]
-type=huckel
-save_mol=True
-
-[scf]
-multiplicity=3
-type=rohf
-save_molden=True
-
-[tdhf]
-type=mrsf
-nstate=3
-
-[optimize]
-istate=2
-"""
+            "DFT Energy": calculation_template("energy", "hf"),
+            "DFT Geometry Optimization": calculation_template("optimize", "hf", istate=0),
+            "MRSF-TDDFT Ground State Energy": calculation_template("energy", "tdhf", nstate=1),
+            "MRSF-TDDFT First Excited State Energy": calculation_template("energy", "tdhf", nstate=2),
+            "MRSF-TDDFT Ground State Geometry Optimization":
+                calculation_template("optimize", "tdhf", nstate=3, istate=1),
+            "MRSF-TDDFT First Excited State Geometry Optimization":
+                calculation_template("optimize", "tdhf", nstate=3, istate=2),
         }
         self.input_file_path = None
 
     def set_geometry_path(self, geometry_filename: str):
         """Set the path of the geometry file within the template."""
         self.geometry_filename = os.path.basename(geometry_filename)
-        
-    def generate_input_text(self, calc_type: str, geometry_filename: str):
+
+    def generate_input_text(self, calc_type: str, geometry_filename: str, parameters: dict = None):
         """Generate the input text based on the selected calculation type."""
-        template = self.templates.get(calc_type, "")
-        input_content = template.replace("system=water.xyz", f"system={self.geometry_filename}")
-        return input_content
+        template = self.templates.get(calc_type)
+        if template is None:
+            return ""
+        geometry_filename = os.path.basename(geometry_filename) if geometry_filename else self.geometry_filename
+        return render_input(apply_parameters(template, {**(parameters or {}), "system": geometry_filename}))
 
     def generate_input_file(self, input_text: str, job_name: str):
         """Save input file to be used with OpenQP in Docker."""
@@ -155,3 +147,49 @@ istate=2
         with open(self.input_file_path, 'w') as file:
             file.write(input_text)
         return self.input_file_path
+
+    def sweep(self, calc_type: str, geometry_filename: str, parameters: dict):
+        """Input texts for every combination of `parameters` ({name: [values]}).
+
+        Returns (assignment, input_text) pairs; combinations that render to the
+        same input are kept only once.
+        """
+        jobs = {}
+        for assignment in parameter_grid(parameters or {}):
+            input_text = self.generate_input_text(calc_type, geometry_filename, assignment)
+            jobs.setdefault(input_text, assignment)
+        return [(assignment, input_text) for input_text, assignment in jobs.items()]
+
+    def generate_batch(self, xyz_source: str, calc_type: str, output_dir: str = None, parameters: dict = None):
+        """Write one input per XYZ file (and per sweep point) of a directory or glob and return their paths.
+
+        Each `<name>.inp` is written next to its geometry, or into `output_dir`
+        with the geometry copied alongside, since OpenQP resolves `system=`
+        relative to the input file. Sweep points add `_<parameter>-<value>`
+        to the name.
+        """
+        if calc_type not in self.templates:
+            raise ValueError(f"Unknown calculation type: {calc_type}")
+        pattern = os.path.join(xyz_source, "*.xyz") if os.path.isdir(xyz_source) else xyz_source
+        xyz_paths = sorted(glob.glob(pattern))
+        if not xyz_paths:
+            raise ValueError(f"No XYZ files found for {xyz_source}")
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        input_paths = []
+        for xyz_path in xyz_paths:
+            target_dir = output_dir or os.path.dirname(os.path.abspath(xyz_path))
+            geometry_filename = os.path.basename(xyz_path)
+            target_xyz = os.path.join(target_dir, geometry_filename)
+            if not os.path.exists(target_xyz) or not os.path.samefile(xyz_path, target_xyz):
+                shutil.copyfile(xyz_path, target_xyz)
+
+            stem = os.path.splitext(geometry_filename)[0]
+            for assignment, input_text in self.sweep(calc_type, geometry_filename, parameters):
+                suffix = "".join(f"_{name.split('.')[-1]}-{value}" for name, value in assignment.items())
+                input_path = os.path.join(target_dir, re.sub(r"[^\w.+-]", "_", stem + suffix) + ".inp")
+                with open(input_path, 'w') as file:
+                    file.write(input_text)
+                input_paths.append(input_path)
+        return input_paths
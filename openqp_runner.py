@@ -0,0 +1,270 @@
+"""Resident OpenQP runner used by the warm container pool.
+
+`serve` runs as the main process of a long-lived container (or locally as a
+stand-in). It imports OpenQP's `openqp` entry point once and forks a child per
+job, so neither the container nor the Python/pyoqp import is paid per job.
+`run` is the short-lived client started for each job with `docker exec`; it
+relays the job's output and exit code and cancels the job if it is killed.
+
+The file has no dependencies on the rest of the GUI because it is mounted
+into the container and run by the image's own python3.
+"""
+import argparse
+import json
+import os
+import selectors
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+import traceback
+
+FORWARDED_ENV = ("OMP_NUM_THREADS", "OMP_PROC_BIND", "OMP_PLACES")
+
+# Connections and output pipes of the jobs being relayed; a forked job closes them.
+_relay_fds = set()
+_relay_fds_lock = threading.Lock()
+
+
+def load_entry_point(name):
+    """Import the console script `name` and return its function, or None if it is not installed."""
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return None
+    try:
+        scripts = entry_points()
+        scripts = scripts.select(group="console_scripts") if hasattr(scripts, "select") \
+            else scripts.get("console_scripts", [])
+        for entry in scripts:
+            if entry.name == name:
+                return entry.load()
+    except Exception:
+        traceback.print_exc()
+    return None
+
+
+def _send_frame(conn, kind, payload):
+    conn.sendall(kind + struct.pack(">I", len(payload)) + payload)
+
+
+def _recv_exact(conn, size):
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("runner connection closed")
+        data += chunk
+    return data
+
+
+def _exit_code(status):
+    if os.WIFEXITED(status):
+        return os.WEXITSTATUS(status)
+    return 128 + os.WTERMSIG(status)
+
+
+def _set_omp_threads(value):
+    """OpenMP reads OMP_NUM_THREADS when it is loaded, which happened before the fork."""
+    if not value:
+        return
+    try:
+        import ctypes
+        ctypes.CDLL("libgomp.so.1").omp_set_num_threads(int(value))
+    except (OSError, AttributeError, ValueError):
+        pass
+
+
+def _run_child(request, entry, command):
+    code = 1
+    try:
+        os.chdir(request["cwd"])
+        os.environ.update(request["env"])
+        if entry is None:
+            os.execvp(command[0], command + request["args"])
+        _set_omp_threads(request["env"].get("OMP_NUM_THREADS"))
+        sys.argv = ["openqp"] + request["args"]
+        try:
+            result = entry()
+            code = result if isinstance(result, int) else 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def _close_relayed(fd):
+    # Forget the fd before closing it, so a fork never closes a reused number.
+    with _relay_fds_lock:
+        _relay_fds.discard(fd)
+    os.close(fd)
+
+
+def _relay(conn, pid, out_fd, err_fd):
+    """Forward a child's stdout/stderr to the client, then its exit code; kill it if the client leaves."""
+    selector = selectors.DefaultSelector()
+    selector.register(out_fd, selectors.EVENT_READ, b"o")
+    selector.register(err_fd, selectors.EVENT_READ, b"e")
+    selector.register(conn, selectors.EVENT_READ, None)
+    open_pipes = 2
+    client_gone = False
+
+    def drop_client():
+        nonlocal client_gone
+        client_gone = True
+        selector.unregister(conn)
+        os.kill(pid, signal.SIGTERM)
+
+    while open_pipes:
+        for key, _ in selector.select():
+            if key.data is None:
+                if not conn.recv(1):
+                    drop_client()
+                continue
+            data = os.read(key.fd, 65536)
+            if not data:
+                selector.unregister(key.fd)
+                _close_relayed(key.fd)
+                open_pipes -= 1
+            elif not client_gone:
+                try:
+                    _send_frame(conn, key.data, data)
+                except OSError:
+                    drop_client()
+    _, status = os.waitpid(pid, 0)
+    if not client_gone:
+        try:
+            _send_frame(conn, b"x", str(_exit_code(status)).encode())
+        except OSError:
+            pass
+    with _relay_fds_lock:
+        _relay_fds.discard(conn.fileno())
+    conn.close()
+
+
+def serve(socket_path, command, preload=True):
+    entry = load_entry_point("openqp") if preload else None
+    if entry is None and not command:
+        sys.exit("openqp entry point not found and no command given")
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(16)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"runner ready on {socket_path} ({'preloaded' if entry else 'exec'} mode)", flush=True)
+
+    while True:
+        conn, _ = server.accept()
+        try:
+            header = b""
+            while not header.endswith(b"\n"):
+                chunk = conn.recv(4096)
+                if not chunk:
+                    raise ConnectionError("empty request")
+                header += chunk
+            request = json.loads(header.decode())
+        except (ConnectionError, ValueError):
+            conn.close()
+            continue
+
+        out_read, out_write = os.pipe()
+        err_read, err_write = os.pipe()
+        with _relay_fds_lock:
+            pid = os.fork()
+            if pid == 0:
+                inherited = list(_relay_fds)
+            else:
+                _relay_fds.update((conn.fileno(), out_read, err_read))
+        if pid == 0:
+            # The server's SIGTERM handler only runs between bytecodes, i.e. not
+            # while OpenQP is in native code; a cancelled job must die at once.
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            server.close()
+            conn.close()
+            os.close(out_read)
+            os.close(err_read)
+            for fd in inherited:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(out_write, 1)
+            os.dup2(err_write, 2)
+            for fd in (devnull, out_write, err_write):
+                os.close(fd)
+            _run_child(request, entry, command)
+        os.close(out_write)
+        os.close(err_write)
+        threading.Thread(target=_relay, args=(conn, pid, out_read, err_read), daemon=True).start()
+
+
+def run(socket_path, cwd, args, env, watch_stdin=False, connect_timeout=60.0):
+    """Submit one job to a serving runner and mirror its output; returns its exit code."""
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(socket_path)
+            break
+        except OSError:
+            conn.close()
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+    conn.sendall(json.dumps({"cwd": cwd, "args": args, "env": env}).encode() + b"\n")
+    selector = selectors.DefaultSelector()
+    selector.register(conn, selectors.EVENT_READ, "conn")
+    if watch_stdin:
+        # The job manager holds our stdin open; EOF means it was killed or cancelled.
+        selector.register(sys.stdin.fileno(), selectors.EVENT_READ, "stdin")
+    streams = {b"o": sys.stdout.buffer, b"e": sys.stderr.buffer}
+    while True:
+        for key, _ in selector.select():
+            if key.data == "stdin":
+                if not os.read(sys.stdin.fileno(), 4096):
+                    conn.close()
+                    return 143
+                continue
+            kind = _recv_exact(conn, 1)
+            payload = _recv_exact(conn, struct.unpack(">I", _recv_exact(conn, 4))[0])
+            if kind == b"x":
+                return int(payload)
+            streams[kind].write(payload)
+            streams[kind].flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="mode", required=True)
+    serve_parser = commands.add_parser("serve", help="run the resident runner")
+    serve_parser.add_argument("--socket", required=True)
+    serve_parser.add_argument("--no-preload", action="store_true", help="exec the command for every job")
+    serve_parser.add_argument("command", nargs="*", help="fallback command, e.g. /usr/local/bin/openqp")
+    run_parser = commands.add_parser("run", help="run one job on a serving runner")
+    run_parser.add_argument("--socket", required=True)
+    run_parser.add_argument("--cwd", default=os.getcwd())
+    run_parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE")
+    run_parser.add_argument("--watch-stdin", action="store_true")
+    run_parser.add_argument("args", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.mode == "serve":
+        serve(args.socket, args.command, preload=not args.no_preload)
+        return 0
+    env = {name: os.environ[name] for name in FORWARDED_ENV if name in os.environ}
+    env.update(item.split("=", 1) for item in args.env if "=" in item)
+    return run(args.socket, args.cwd, args.args, env, args.watch_stdin)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+import re
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+from geometry_extractor import OPT_STEP_MARKER, CARTESIAN_MARKER, PERIODIC_TABLE
+
+ENERGY_PATTERN = re.compile(r"\benergy\s*[:=]\s*(-?\d+\.\d+(?:[eEdD][-+]?\d+)?)", re.IGNORECASE)
+GRADIENT_PATTERN = re.compile(
+    r"\bgradient(?:\s+norm|\s+rms|\s+max)?\s*[:=]\s*(-?\d+\.\d+(?:[eEdD][-+]?\d+)?)",
+    re.IGNORECASE
+)
+
+
+def _to_float(text):
+    return float(text.replace('D', 'E').replace('d', 'e'))
+
+
+def format_frame_xyz(atomic_numbers, coordinates, step, energy=float("nan"), gradient_norm=float("nan")):
+    """Format one optimization frame as XYZ text with step, energy and gradient in the comment."""
+    comment = f"Step {step}"
+    if not np.isnan(energy):
+        comment += f" E={energy:.10f}"
+    if not np.isnan(gradient_norm):
+        comment += f" |g|={gradient_norm:.6e}"
+
+    lines = [f"{len(atomic_numbers)}", comment]
+    for number, (x, y, z) in zip(atomic_numbers, coordinates):
+        element = PERIODIC_TABLE.get(int(number), "X")
+        lines.append(f"{element:<2} {x:>10.6f} {y:>10.6f} {z:>10.6f}")
+    return "\n".join(lines)
+
+
+class OptimizationTrajectory:
+    """All frames of a geometry optimization stored as NumPy arrays."""
+
+    def __init__(self, atomic_numbers, coordinates, energies, gradient_norms, steps=None):
+        self.atomic_numbers = np.asarray(atomic_numbers, dtype=np.int32)
+        self.coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, len(self.atomic_numbers), 3)
+        self.energies = np.asarray(energies, dtype=np.float64)
+        self.gradient_norms = np.asarray(gradient_norms, dtype=np.float64)
+        if steps is None:
+            steps = np.arange(1, len(self.coordinates) + 1)
+        self.steps = np.asarray(steps, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.coordinates)
+
+    @property
+    def symbols(self):
+        return [PERIODIC_TABLE.get(int(z), "X") for z in self.atomic_numbers]
+
+    def frame_xyz(self, index):
+        """Return a single frame as XYZ text."""
+        return format_frame_xyz(self.atomic_numbers, self.coordinates[index], self.steps[index],
+                                self.energies[index], self.gradient_norms[index])
+
+    def to_xyz(self):
+        """Return the whole trajectory as multi-frame XYZ text."""
+        return "\n".join(self.frame_xyz(i) for i in range(len(self))) + "\n"
+
+    def save_xyz(self, path):
+        with open(path, 'w') as xyz_file:
+            xyz_file.write(self.to_xyz())
+        return path
+
+    def save_npz(self, path):
+        np.savez_compressed(
+            path,
+            atomic_numbers=self.atomic_numbers,
+            coordinates=self.coordinates,
+            energies=self.energies,
+            gradient_norms=self.gradient_norms,
+            steps=self.steps
+        )
+        return path
+
+    @classmethod
+    def load_npz(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data["atomic_numbers"],
+                data["coordinates"],
+                data["energies"],
+                data["gradient_norms"],
+                data["steps"]
+            )
+
+
+class TrajectoryParser:
+    """Incremental parser for optimization steps in an OpenQP log.
+
+    Lines are fed one at a time; a frame is emitted as soon as its Cartesian
+    block has closed and its energy is known, so a live view follows the
+    optimization without waiting for the next step. Lines after that (e.g. the
+    gradient norm) still update the frame stored in the trajectory, which is
+    completed by the next step marker or the end of input.
+    """
+
+    def __init__(self):
+        self.atomic_numbers = None
+        self._coordinates = array('d')
+        self._energies = array('d')
+        self._gradients = array('d')
+        self._steps = array('i')
+        self._current = None
+        self._emitted = False
+        self._state = None
+        self._partial_line = ""
+
+    def feed_text(self, text):
+        """Consume an arbitrary chunk of log text, e.g. from a LogTailer, and return completed frames."""
+        lines = (self._partial_line + text).split("\n")
+        self._partial_line = lines.pop()
+        completed = []
+        for line in lines:
+            completed.extend(self.feed(line + "\n"))
+        return completed
+
+    def feed(self, line):
+        """Consume one log line and return the frames completed by it."""
+        completed = []
+        if OPT_STEP_MARKER in line:
+            if self._current is not None:
+                completed.extend(self._finish_frame())
+            step = line.split(OPT_STEP_MARKER, 1)[1].split()
+            self._current = {
+                "step": int(step[0]) if step and step[0].isdigit() else len(self._steps) + 1,
+                "atomic_numbers": [],
+                "coordinates": [],
+                "energy": float("nan"),
+                "gradient_norm": float("nan")
+            }
+            self._state = None
+            self._emitted = False
+            return completed
+
+        if self._current is None:
+            return completed
+
+        if self._state is None:
+            if CARTESIAN_MARKER in line and not self._current["coordinates"]:
+                self._state = "header"
+                return completed
+            match = ENERGY_PATTERN.search(line)
+            if match:
+                self._current["energy"] = _to_float(match.group(1))
+            match = GRADIENT_PATTERN.search(line)
+            if match:
+                self._current["gradient_norm"] = _to_float(match.group(1))
+        elif self._state == "header":
+            self._state = "atoms"
+        elif self._state == "atoms":
+            if not line.strip():
+                self._state = None
+            elif "ATOM" not in line and "ZNUC" not in line:
+                parts = line.split()
+                if len(parts) >= 5:
+                    self._current["atomic_numbers"].append(int(float(parts[1])))
+                    self._current["coordinates"].append(tuple(map(float, parts[2:5])))
+
+        if (not self._emitted and self._state is None and self._current["coordinates"]
+                and not np.isnan(self._current["energy"])):
+            self._emitted = True
+            completed.append(self._current)
+        return completed
+
+    def finish(self):
+        """Flush the last frame at the end of input."""
+        if self._partial_line:
+            completed = self.feed(self._partial_line)
+            self._partial_line = ""
+            if completed:
+                return completed + self.finish()
+        if self._current is None:
+            return []
+        return self._finish_frame()
+
+    def _finish_frame(self):
+        """Store the current frame in the trajectory; returns it unless it was emitted already."""
+        frame, self._current, self._state = self._current, None, None
+        completed = [] if self._emitted else [frame]
+        self._emitted = False
+        if not frame["coordinates"]:
+            return completed
+        if self.atomic_numbers is None:
+            self.atomic_numbers = frame["atomic_numbers"]
+        if frame["atomic_numbers"] == self.atomic_numbers:
+            for xyz in frame["coordinates"]:
+                self._coordinates.extend(xyz)
+            self._energies.append(frame["energy"])
+            self._gradients.append(frame["gradient_norm"])
+            self._steps.append(frame["step"])
+        return completed
+
+    def trajectory(self):
+        """Return the frames parsed so far as an OptimizationTrajectory."""
+        if self.atomic_numbers is None:
+            raise ValueError("No optimization steps found in log file.")
+        return OptimizationTrajectory(
+            self.atomic_numbers,
+            np.array(self._coordinates, dtype=np.float64),
+            np.array(self._energies, dtype=np.float64),
+            np.array(self._gradients, dtype=np.float64),
+            np.array(self._steps, dtype=np.int32)
+        )
+
+
+def parse_trajectory(log_file_path):
+    """Parse every optimization step of a log in a single pass."""
+    parser = TrajectoryParser()
+    with open(log_file_path, 'r', errors='replace') as log_file:
+        for line in log_file:
+            parser.feed(line)
+    parser.finish()
+    return parser.trajectory()
+
+
+def save_trajectory(log_file_path, job_name):
+    """Write `<job>_traj.xyz` and `<job>_traj.npz` in the current directory."""
+    trajectory = parse_trajectory(log_file_path)
+    xyz_path = trajectory.save_xyz(Path(f"{job_name}_traj.xyz"))
+    npz_path = trajectory.save_npz(Path(f"{job_name}_traj.npz"))
+    return trajectory, xyz_path, npz_path
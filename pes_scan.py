@@ -0,0 +1,375 @@
+"""Rigid potential energy surface scans along one internal coordinate."""
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+
+from batch_runner import BACKENDS, make_backend
+from container_pool import ContainerPool
+from geometry_extractor import PERIODIC_TABLE
+from job_chain import JobChain
+from job_manager import JobManager
+from log_parser import parse_log
+from openqp_input_generator import OpenQPInputGenerator
+from optimization_trajectory import OptimizationTrajectory
+from result_cache import ResultCache
+
+ATOMIC_NUMBERS = {symbol: number for number, symbol in PERIODIC_TABLE.items()}
+COORDINATE_KINDS = {2: "bond", 3: "angle", 4: "dihedral"}
+COORDINATE_UNITS = {"bond": "angstrom", "angle": "degree", "dihedral": "degree"}
+HARTREE_TO_KCAL_MOL = 627.509474
+# Covalent radii in Angstrom, used to find the atoms that move with a scanned atom.
+COVALENT_RADII = {
+    "H": 0.31, "B": 0.84, "C": 0.76, "N": 0.71, "O": 0.66, "F": 0.57, "Si": 1.11, "P": 1.07,
+    "S": 1.05, "Cl": 1.02, "Br": 1.20, "I": 1.39,
+}
+
+
+def read_xyz(xyz_text):
+    """Symbols and an (atoms, 3) coordinate array from XYZ text."""
+    lines = xyz_text.strip().splitlines()
+    try:
+        atom_count = int(lines[0].split()[0])
+        atom_lines = [line.split() for line in lines[2:2 + atom_count]]
+        symbols = [fields[0].capitalize() for fields in atom_lines]
+        coordinates = np.array([[float(value) for value in fields[1:4]] for fields in atom_lines])
+    except (IndexError, ValueError):
+        raise ValueError("Geometry is not valid XYZ text")
+    if len(symbols) != atom_count or coordinates.shape != (atom_count, 3):
+        raise ValueError(f"XYZ header announces {atom_count} atoms but {len(symbols)} were found")
+    return symbols, coordinates
+
+
+def format_xyz(symbols, coordinates, comment=""):
+    lines = [f"{len(symbols)}", comment]
+    for symbol, (x, y, z) in zip(symbols, coordinates):
+        lines.append(f"{symbol:<2} {x:>10.6f} {y:>10.6f} {z:>10.6f}")
+    return "\n".join(lines) + "\n"
+
+
+def measure(coordinates, atoms):
+    """Bond length, angle or dihedral (degrees) of `atoms` in (..., atoms, 3) coordinates."""
+    points = np.asarray(coordinates)[..., list(atoms), :]
+    if len(atoms) == 2:
+        return np.linalg.norm(points[..., 1, :] - points[..., 0, :], axis=-1)
+    if len(atoms) == 3:
+        first = points[..., 0, :] - points[..., 1, :]
+        second = points[..., 2, :] - points[..., 1, :]
+        cosine = np.sum(first * second, axis=-1) / (
+            np.linalg.norm(first, axis=-1) * np.linalg.norm(second, axis=-1)
+        )
+        return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+    b1 = points[..., 1, :] - points[..., 0, :]
+    b2 = points[..., 2, :] - points[..., 1, :]
+    b3 = points[..., 3, :] - points[..., 2, :]
+    n1 = np.cross(b1, b2)
+    n2 = np.cross(b2, b3)
+    m1 = np.cross(n1, b2 / np.linalg.norm(b2, axis=-1, keepdims=True))
+    return np.degrees(np.arctan2(np.sum(m1 * n2, axis=-1), np.sum(n1 * n2, axis=-1)))
+
+
+def moving_atoms(symbols, coordinates, atoms):
+    """Boolean mask of the atoms displaced together with the last scanned atom.
+
+    That is the fragment on the far side of the scanned bond (the last two
+    atoms for bonds and angles, the middle two for dihedrals). If the bond is
+    part of a ring, only the last atom moves.
+    """
+    fixed, pivot = (atoms[0], atoms[1]) if len(atoms) == 2 else (atoms[1], atoms[2])
+    radii = np.array([COVALENT_RADII.get(symbol, 0.8) for symbol in symbols])
+    distances = np.linalg.norm(coordinates[:, None, :] - coordinates[None, :, :], axis=-1)
+    bonded = (distances < 1.2 * (radii[:, None] + radii[None, :])) & ~np.eye(len(symbols), dtype=bool)
+    bonded[fixed, pivot] = bonded[pivot, fixed] = False
+
+    mask = np.zeros(len(symbols), dtype=bool)
+    mask[pivot] = True
+    frontier = [pivot]
+    while frontier:
+        neighbours = np.flatnonzero(bonded[frontier].any(axis=0) & ~mask)
+        mask[neighbours] = True
+        frontier = list(neighbours)
+    if mask[fixed]:
+        mask[:] = False
+        mask[atoms[-1]] = True
+    return mask
+
+
+def _rotate(vectors, axis, angles):
+    """Rotate (atoms, 3) vectors about a unit axis by each angle (radians), giving (angles, atoms, 3)."""
+    cosine = np.cos(angles)[:, None, None]
+    sine = np.sin(angles)[:, None, None]
+    return (vectors * cosine + np.cross(axis, vectors) * sine
+            + np.outer(vectors @ axis, axis) * (1.0 - cosine))
+
+
+def displace(symbols, coordinates, atoms, values):
+    """Geometries, as a (values, atoms, 3) array, with the coordinate of `atoms` set to each value.
+
+    Bonds are stretched along the bond and angles and dihedrals rotated about
+    their vertex or central bond, moving the whole fragment found by
+    `moving_atoms`.
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    mask = moving_atoms(symbols, coordinates, atoms)
+    delta = values - measure(coordinates, atoms)
+    frames = np.repeat(coordinates[None], len(values), axis=0)
+
+    if len(atoms) == 2:
+        bond = coordinates[atoms[1]] - coordinates[atoms[0]]
+        frames[:, mask] += delta[:, None, None] * (bond / np.linalg.norm(bond))
+        return frames
+
+    if len(atoms) == 3:
+        origin = coordinates[atoms[1]]
+        axis = np.cross(coordinates[atoms[0]] - origin, coordinates[atoms[2]] - origin)
+        if np.linalg.norm(axis) < 1e-8:
+            # A linear angle has no plane; any axis perpendicular to the bond will do.
+            bond = coordinates[atoms[2]] - origin
+            axis = np.cross(bond, [1.0, 0.0, 0.0] if abs(bond[0]) < 0.9 * np.linalg.norm(bond) else [0.0, 1.0, 0.0])
+    else:
+        origin = coordinates[atoms[2]]
+        # Turning the far fragment clockwise seen along j->k increases the dihedral.
+        axis = coordinates[atoms[1]] - coordinates[atoms[2]]
+        delta = (delta + 180.0) % 360.0 - 180.0
+    axis = axis / np.linalg.norm(axis)
+    frames[:, mask] = origin + _rotate(coordinates[mask] - origin, axis, np.radians(delta))
+    return frames
+
+
+class PESScan:
+    """Scan of one internal coordinate: displaced geometries, their inputs and the energy curve.
+
+    `atoms` are zero-based; two, three or four atoms scan a bond (Angstrom),
+    an angle or a dihedral (degrees). Every displaced geometry gets a single
+    point calculation. Relaxed scans are not offered: the input templates
+    cannot hold the scanned coordinate fixed, so an optimization would just
+    relax each point back towards the same minimum.
+    """
+
+    def __init__(self, xyz_path, atoms, values, calc_type=None, output_dir=None, parameters=None):
+        with open(xyz_path, 'r') as xyz_file:
+            self.symbols, self.coordinates = read_xyz(xyz_file.read())
+        self.atoms = [int(atom) for atom in atoms]
+        if len(self.atoms) not in COORDINATE_KINDS:
+            raise ValueError("A scan coordinate needs 2 (bond), 3 (angle) or 4 (dihedral) atoms")
+        if len(set(self.atoms)) != len(self.atoms) or not all(0 <= atom < len(self.symbols) for atom in self.atoms):
+            raise ValueError(f"Scan atoms must be distinct zero-based indices from 0 to {len(self.symbols) - 1}")
+        self.kind = COORDINATE_KINDS[len(self.atoms)]
+        self.values = np.asarray(values, dtype=np.float64)
+        if self.values.ndim != 1 or not len(self.values):
+            raise ValueError("A scan needs at least one value")
+        if self.kind == "bond" and np.any(self.values <= 0):
+            raise ValueError("Bond lengths must be positive")
+        if self.kind == "angle" and np.any((self.values <= 0) | (self.values >= 180)):
+            raise ValueError("Angles must lie between 0 and 180 degrees")
+
+        self.calc_type = calc_type or "DFT Energy"
+        self.parameters = parameters or {}
+        self.output_dir = os.path.abspath(output_dir or os.path.dirname(os.path.abspath(xyz_path)))
+        stem = os.path.splitext(os.path.basename(xyz_path))[0]
+        self.name = f"{stem}_{self.kind}_{'-'.join(str(atom + 1) for atom in self.atoms)}"
+        self.geometries = displace(self.symbols, self.coordinates, self.atoms, self.values)
+        self.input_paths = []
+        self.energies = np.full(len(self.values), np.nan)
+
+    def write_inputs(self):
+        """Write one geometry and input per scan point, `<name>_<point>.xyz/.inp`, and return the inputs."""
+        generator = OpenQPInputGenerator(None)
+        template = generator.templates.get(self.calc_type)
+        if template is None:
+            raise ValueError(f"Unknown calculation type: {self.calc_type}")
+        if template["input"]["runtype"] != "energy":
+            raise ValueError("A scan needs a single-point calculation type")
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.input_paths = []
+        unit = COORDINATE_UNITS[self.kind]
+        for point, (value, geometry) in enumerate(zip(self.values, self.geometries)):
+            stem = os.path.join(self.output_dir, f"{self.name}_{point:03d}")
+            with open(f"{stem}.xyz", 'w') as xyz_file:
+                xyz_file.write(format_xyz(self.symbols, geometry, f"{self.kind} {value:.6f} {unit}"))
+            with open(f"{stem}.inp", 'w') as input_file:
+                input_file.write(
+                    generator.generate_input_text(self.calc_type, f"{stem}.xyz", self.parameters)
+                )
+            # A log left by an earlier scan would otherwise be read as this point's result.
+            for stale in (f"{stem}.log", f"{stem}.log.index.json"):
+                if os.path.exists(stale):
+                    os.remove(stale)
+            self.input_paths.append(f"{stem}.inp")
+        return self.input_paths
+
+    def run(self, job_manager, chains=1, log_text_widget=None, use_cache=True, on_finished=None):
+        """Run the points through a JobManager and collect the energies.
+
+        The points are split into `chains` contiguous segments that run in
+        parallel; within a segment each point starts from the orbitals of its
+        neighbour. A point that fails (e.g. an SCF that does not converge far
+        from equilibrium) is left as NaN and the next one starts cold.
+        """
+        if not self.input_paths:
+            self.write_inputs()
+        segments = [segment for segment in np.array_split(np.arange(len(self.input_paths)), max(1, chains))
+                    if len(segment)]
+        running = [
+            job_manager.submit_chain(
+                JobChain([self.input_paths[point] for point in segment], on_finished=on_finished,
+                         continue_on_failure=True),
+                log_text_widget, use_cache
+            )
+            for segment in segments
+        ]
+        for chain in running:
+            chain.join()
+        return self.collect()
+
+    def collect(self):
+        """Read the energy of every point from its log."""
+        for point, input_path in enumerate(self.input_paths):
+            log_path = f"{os.path.splitext(input_path)[0]}.log"
+            if not os.path.exists(log_path):
+                continue
+            energy = parse_log(log_path).final_energy()
+            self.energies[point] = np.nan if energy is None else energy
+        return self.energies
+
+    def relative_energies(self):
+        """Energies in kcal/mol relative to the lowest point."""
+        if np.all(np.isnan(self.energies)):
+            return np.full(len(self.energies), np.nan)
+        return (self.energies - np.nanmin(self.energies)) * HARTREE_TO_KCAL_MOL
+
+    def save_csv(self, path=None):
+        path = path or os.path.join(self.output_dir, f"{self.name}.csv")
+        unit = COORDINATE_UNITS[self.kind]
+        with open(path, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["point", f"{self.kind}_{unit}", "energy_hartree", "relative_kcal_mol"])
+            rows = zip(self.values, self.energies, self.relative_energies())
+            for point, row in enumerate(rows):
+                writer.writerow([point] + ["" if np.isnan(value) else f"{value:.{digits}f}"
+                                           for value, digits in zip(row, (6, 10, 4))])
+        return path
+
+    def save_npz(self, path=None):
+        path = path or os.path.join(self.output_dir, f"{self.name}.npz")
+        np.savez_compressed(
+            path,
+            atoms=np.asarray(self.atoms),
+            values=self.values,
+            energies=self.energies,
+            atomic_numbers=self.atomic_numbers(),
+            coordinates=self.geometries
+        )
+        return path
+
+    def atomic_numbers(self):
+        return np.array([ATOMIC_NUMBERS.get(symbol, 0) for symbol in self.symbols])
+
+    def trajectory(self):
+        """The scan as an OptimizationTrajectory, one frame per point, for the viewer or XYZ export."""
+        return OptimizationTrajectory(self.atomic_numbers(), self.geometries, self.energies,
+                                      np.full(len(self.values), np.nan), steps=np.arange(len(self.values)))
+
+    def plot(self, path=None):
+        """Save the energy curve as an image; needs matplotlib."""
+        try:
+            import matplotlib
+            matplotlib.use("Agg")
+            import matplotlib.pyplot as plt
+        except ImportError:
+            raise ValueError("Plotting needs matplotlib (pip install matplotlib); the CSV holds the same data")
+        path = path or os.path.join(self.output_dir, f"{self.name}.png")
+        unit = "Å" if self.kind == "bond" else "°"
+        figure, axes = plt.subplots(figsize=(6, 4))
+        axes.plot(self.values, self.relative_energies(), "o-")
+        axes.set_xlabel(f"{self.kind} {'-'.join(str(atom + 1) for atom in self.atoms)} ({unit})")
+        axes.set_ylabel("Relative energy (kcal/mol)")
+        axes.set_title(f"Rigid scan: {self.name}")
+        figure.tight_layout()
+        figure.savefig(path, dpi=150)
+        plt.close(figure)
+        return path
+
+
+def main(argv=None):
+    calc_types = [name for name, template in OpenQPInputGenerator(None).templates.items()
+                  if template["input"]["runtype"] == "energy"]
+    parser = argparse.ArgumentParser(description="Scan a bond, angle or dihedral and collect the energy curve.")
+    parser.add_argument("xyz_file", help="base geometry")
+    parser.add_argument("--atoms", type=int, nargs="+", required=True,
+                        help="2, 3 or 4 atom numbers (1-based) defining a bond, angle or dihedral")
+    points = parser.add_mutually_exclusive_group(required=True)
+    points.add_argument("--range", type=float, nargs=3, metavar=("START", "STOP", "POINTS"),
+                        help="evenly spaced values, both ends included (Angstrom or degrees)")
+    points.add_argument("--values", type=float, nargs="+", help="explicit values")
+    parser.add_argument("--calc-type", choices=calc_types, default="DFT Energy",
+                        help="single-point template (default: DFT Energy)")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="input parameter for every point, e.g. basis=6-31g* or scf.conv=1e-6; repeatable")
+    parser.add_argument("--output-dir", help="where to write the points (default: next to the geometry)")
+    parser.add_argument("--workers", type=int, default=1, help="scan segments to run at the same time")
+    parser.add_argument("--cpus-per-job", type=int, help="cores per job (default: split evenly)")
+    parser.add_argument("--backend", choices=BACKENDS, default="docker", help="how to run OpenQP (see batch_runner)")
+    parser.add_argument("--openqp", default="openqp", help="openqp executable for the native and scheduler backends")
+    parser.add_argument("--mpi-ranks", type=int, default=1, help="MPI ranks per job (native and scheduler backends)")
+    parser.add_argument("--no-cache", action="store_true", help="always run, ignoring cached results")
+    parser.add_argument("--no-submit", action="store_true", help="only write the geometries and inputs")
+    parser.add_argument("--no-plot", action="store_true", help="skip the PNG plot")
+    args = parser.parse_args(argv)
+
+    try:
+        values = np.linspace(args.range[0], args.range[1], int(args.range[2])) if args.range else args.values
+        parameters = {}
+        for option in args.set:
+            name, separator, value = option.partition("=")
+            if not separator:
+                raise ValueError(f"Parameter must look like name=value: {option}")
+            parameters[name.strip()] = value.strip()
+        with open(args.xyz_file, 'r') as xyz_file:
+            atom_count = len(read_xyz(xyz_file.read())[0])
+        if not all(1 <= atom <= atom_count for atom in args.atoms):
+            raise ValueError(f"--atoms must be atom numbers between 1 and {atom_count}")
+        scan = PESScan(args.xyz_file, [atom - 1 for atom in args.atoms], values, args.calc_type,
+                       args.output_dir, parameters)
+        input_paths = scan.write_inputs()
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(f"Wrote {len(input_paths)} scan points to {scan.output_dir}")
+    if args.no_submit:
+        return 0
+
+    backend = make_backend(args.backend, input_paths, args.workers, args.cpus_per_job,
+                           openqp=args.openqp, mpi_ranks=args.mpi_ranks)
+    job_manager = JobManager(None, max_workers=args.workers, cpus_per_job=args.cpus_per_job,
+                             result_cache=None if args.no_cache else ResultCache(), backend=backend)
+
+    def report(job):
+        print(f"{job.name}: {job.status}{' (cached)' if job.cached else ''}", flush=True)
+
+    try:
+        scan.run(job_manager, chains=args.workers, use_cache=not args.no_cache, on_finished=report)
+    except KeyboardInterrupt:
+        job_manager.cancel_all()
+        job_manager.wait()
+        return 130
+    finally:
+        if isinstance(backend, ContainerPool):
+            backend.stop()
+
+    xyz_path = scan.trajectory().save_xyz(os.path.join(scan.output_dir, f"{scan.name}_scan.xyz"))
+    print(f"Wrote {scan.save_csv()}, {scan.save_npz()} and {xyz_path}")
+    if not args.no_plot:
+        try:
+            print(f"Plot: {scan.plot()}")
+        except ValueError as e:
+            print(f"No plot: {e}", file=sys.stderr)
+    return 0 if not np.any(np.isnan(scan.energies)) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
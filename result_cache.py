@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from geometry_extractor import GeometryExtractor
+
+DEFAULT_RESULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "openqp_gui", "results")
+
+# Files OpenQP writes for a job, named `<job><suffix>`.
+OUTPUT_SUFFIXES = (".log", ".json", ".molden", "_opt_geo.xyz")
+
+
+def normalize_input(input_text):
+    """Canonical form of an OpenQP input: no comments or blank lines, case-folded names, sorted keys.
+
+    The `system=` and guess `file=` entries are dropped because the geometry
+    and the starting orbitals enter the key by content, not by file name.
+    """
+    sections = {}
+    current = sections.setdefault("", {})
+    for raw_line in input_text.splitlines():
+        line = raw_line.split("#", 1)[0].split(";", 1)[0].strip()
+        if not line:
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            current = sections.setdefault(line[1:-1].strip().lower(), {})
+        elif "=" in line:
+            key, value = (part.strip() for part in line.split("=", 1))
+            current[key.lower()] = value
+    sections.get("input", {}).pop("system", None)
+    sections.get("guess", {}).pop("file", None)
+    return "\n".join(
+        f"[{section}]\n" + "".join(f"{key}={keys[key]}\n" for key in sorted(keys))
+        for section, keys in sorted(sections.items()) if keys
+    )
+
+
+def _referenced_path(input_file_path, input_text, section_name, key_name):
+    """The file named by `key_name` in a section, resolved like OpenQP does: relative to the input."""
+    section = ""
+    for raw_line in input_text.splitlines():
+        line = raw_line.split("#", 1)[0].strip()
+        if line.startswith("["):
+            section = line.strip("[]").strip().lower()
+        elif section == section_name and "=" in line:
+            key, value = (part.strip() for part in line.split("=", 1))
+            if key.lower() == key_name:
+                return os.path.join(os.path.dirname(os.path.abspath(input_file_path)), value)
+    return None
+
+
+def _system_path(input_file_path, input_text):
+    return _referenced_path(input_file_path, input_text, "input", "system")
+
+
+class ResultCache:
+    """Content-addressed store of finished OpenQP runs.
+
+    A run is identified by its normalized input text, the SHA-256 of the
+    geometry its `system=` points to (and of the orbitals a warm start reads
+    from `[guess] file=`) and the container image. Each entry
+    holds the job's output files (OUTPUT_SUFFIXES) renamed relative to the
+    job name, plus the optimized geometry when the log has one. Entries are
+    evicted least recently used first once they exceed `max_bytes`.
+    """
+
+    def __init__(self, directory=DEFAULT_RESULT_DIR, max_bytes=2 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, input_file_path, image):
+        """Cache key for an input file, or None if its geometry or guess orbitals cannot be read."""
+        with open(input_file_path, 'r') as input_file:
+            input_text = input_file.read()
+        system_path = _system_path(input_file_path, input_text)
+        if system_path is None or not os.path.isfile(system_path):
+            return None
+        guess_path = _referenced_path(input_file_path, input_text, "guess", "file")
+        if guess_path is not None and not os.path.isfile(guess_path):
+            return None
+
+        digest = hashlib.sha256()
+        digest.update(image.encode('utf-8') + b"\0")
+        digest.update(normalize_input(input_text).encode('utf-8') + b"\0")
+        with open(system_path, 'rb') as system_file:
+            digest.update(system_file.read())
+        if guess_path is not None:
+            digest.update(b"\0")
+            with open(guess_path, 'rb') as guess_file:
+                digest.update(guess_file.read())
+        return digest.hexdigest()
+
+    def contains(self, key):
+        return os.path.isfile(os.path.join(self.directory, key, "manifest.json"))
+
+    def restore(self, key, input_file_path):
+        """Copy a stored result next to the input under its job name; return the restored paths."""
+        entry = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(entry, "manifest.json"), 'r') as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return []
+
+        stem = os.path.splitext(os.path.abspath(input_file_path))[0]
+        restored = []
+        for suffix in manifest["files"]:
+            target = stem + suffix
+            shutil.copyfile(os.path.join(entry, "files", suffix), target)
+            restored.append(target)
+        # The manifest's mtime records the last use for LRU eviction.
+        os.utime(os.path.join(entry, "manifest.json"))
+        return restored
+
+    def store(self, key, input_file_path, since=None):
+        """Save the outputs of a finished job, its `<job><suffix>` files (OUTPUT_SUFFIXES) written after `since`.
+
+        Only these exact names are taken, so the outputs of another job whose
+        name starts with this one (`mol_opt` next to `mol`) are never stored.
+        """
+        stem = os.path.splitext(os.path.abspath(input_file_path))[0]
+        with open(input_file_path, 'r') as input_file:
+            system_path = _system_path(input_file_path, input_file.read())
+        outputs = {}
+        for suffix in OUTPUT_SUFFIXES:
+            path = stem + suffix
+            if system_path is not None and os.path.abspath(path) == os.path.abspath(system_path):
+                continue
+            if not os.path.isfile(path) or (since is not None and os.path.getmtime(path) < since - 1):
+                continue
+            outputs[suffix] = path
+        if ".log" not in outputs:
+            return None
+
+        # Unique per store call, so threads and processes storing the same key never share it.
+        temporary = tempfile.mkdtemp(prefix=f".{key}.", suffix=".tmp", dir=self.directory)
+        try:
+            os.makedirs(os.path.join(temporary, "files"))
+            for suffix, path in outputs.items():
+                shutil.copyfile(path, os.path.join(temporary, "files", suffix))
+            if "_opt_geo.xyz" not in outputs:
+                try:
+                    geometry = GeometryExtractor(outputs[".log"]).extract_optimized_geometry()
+                    with open(os.path.join(temporary, "files", "_opt_geo.xyz"), 'w') as xyz_file:
+                        xyz_file.write(geometry)
+                    outputs["_opt_geo.xyz"] = None
+                except (OSError, ValueError):
+                    pass
+
+            size = sum(os.path.getsize(os.path.join(temporary, "files", suffix)) for suffix in outputs)
+            with open(os.path.join(temporary, "manifest.json"), 'w') as manifest_file:
+                json.dump({"files": sorted(outputs), "size": size, "stored_at": time.time()}, manifest_file)
+
+            entry = os.path.join(self.directory, key)
+            shutil.rmtree(entry, ignore_errors=True)
+            try:
+                os.replace(temporary, entry)
+            except OSError:
+                # Another store of the same key got there first; keep its entry.
+                if not self.contains(key):
+                    raise
+                shutil.rmtree(temporary, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(temporary, ignore_errors=True)
+            raise
+        self._evict()
+        return entry
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue  # an entry still being stored
+            manifest_path = os.path.join(self.directory, name, "manifest.json")
+            try:
+                with open(manifest_path, 'r') as manifest_file:
+                    size = json.load(manifest_file)["size"]
+                entries.append((os.path.getmtime(manifest_path), size, os.path.join(self.directory, name)))
+            except (OSError, ValueError, KeyError):
+                continue
+        used = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if used <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            used -= size
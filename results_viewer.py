@@ -1,16 +1,34 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext, StringVar, OptionMenu
+from tkinter import filedialog, messagebox, StringVar, OptionMenu
 import os
 import webbrowser
 from pathlib import Path
 import tempfile
+import shutil
+import queue
+import re
+import threading
+from log_viewer import PagedLogViewer
+from log_search import LogSearch, job_log_files
+from mo_grid import cube_text, write_mo_cubes
+from mo_cache import MOCache
+from viewer_assets import PAYLOAD_DECODER, payload_tag, script_tag
+import numpy as np
 
 class ResultsViewer:
-    def __init__(self, parent):
-        """Initialize the ResultsViewer with a parent window."""
+    def __init__(self, parent, server=None):
+        """Initialize the ResultsViewer with a parent window.
+
+        Orbitals are pushed to `server` (a running ViewerServer) when given,
+        instead of being written to temporary HTML files.
+        """
         self.parent = parent
+        self.server = server
         self.temp_files = []
         self.mo_data = []  
+        self.mo_indices = {}
+        self.mo_cache = MOCache()
+        self.js_mode = "shared"
 
     def __del__(self):
         """Cleanup temporary files when the object is destroyed."""
@@ -25,7 +43,7 @@ class ResultsViewer:
         """Main function to display options for viewing results."""
         results_window = tk.Toplevel(self.parent)
         results_window.title("Results Viewer")
-        results_window.geometry("300x300")
+        results_window.geometry("320x340")
 
         frame = tk.Frame(results_window, padx=20, pady=20)
         frame.pack(expand=True, fill='both')
@@ -38,27 +56,34 @@ class ResultsViewer:
                   width=25, 
                   relief=tk.GROOVE).pack(pady=5)
 
+        tk.Button(frame, text="Load Molden File",
+                  command=self.load_molden_file,
+                  width=25,
+                  relief=tk.GROOVE).pack(pady=5)
+
         tk.Label(frame, text="Choose Molecular Orbital:").pack(pady=5)
-        
-        
-        if not self.mo_data:
-            self.mo_data = ["MO 1"]  
-        
+
         self.mo_var = StringVar(value="Select MO")
-        self.mo_options = [f"MO {i + 1}" for i in range(len(self.mo_data))]
-        
-        mo_menu = OptionMenu(frame, self.mo_var, *self.mo_options, command=self.visualize_selected_mo)
-        mo_menu.pack(pady=5)
+        self.mo_menu = OptionMenu(frame, self.mo_var, "Select MO")
+        self.mo_menu.pack(pady=5)
+        if getattr(self, 'molden_file_path', None):
+            self.fill_mo_menu()
+
+        tk.Button(frame, text="Export Frontier Orbitals",
+                  command=self.export_frontier_orbitals,
+                  width=25,
+                  relief=tk.GROOVE).pack(pady=5)
 
 
 
-    def open_log_file(self):
+    def open_log_file(self, log_file_path=None, search_string=None):
         """Open and display the contents of a selected log file."""
         try:
-            log_file_path = filedialog.askopenfilename(
-                title="Select Log File",
-                filetypes=[("Log files", "*.log"), ("All files", "*.*")]
-            )
+            if log_file_path is None:
+                log_file_path = filedialog.askopenfilename(
+                    title="Select Log File",
+                    filetypes=[("Log files", "*.log"), ("All files", "*.*")]
+                )
             
             if not log_file_path:  
                 return
@@ -74,7 +99,7 @@ class ResultsViewer:
             menubar = tk.Menu(log_window)
             file_menu = tk.Menu(menubar, tearoff=0)
             file_menu.add_command(label="Save As...", 
-                                  command=lambda: self.save_log_content(log_text))
+                                  command=lambda: self.save_log_file(log_file_path))
             menubar.add_cascade(label="File", menu=file_menu)
             log_window.config(menu=menubar)
 
@@ -85,63 +110,175 @@ class ResultsViewer:
             search_frame.pack(fill='x', padx=5, pady=(0, 5))
             
             tk.Label(search_frame, text="Search:").pack(side='left')
-            search_var = tk.StringVar()
+            search_var = tk.StringVar(value=search_string or "")
             search_entry = tk.Entry(search_frame, textvariable=search_var)
             search_entry.pack(side='left', padx=5)
-            
-            tk.Button(search_frame, text="Find",
-                      command=lambda: self.search_text(log_text, search_var.get())
-                      ).pack(side='left')
-
-            log_text = scrolledtext.ScrolledText(
-                frame, 
-                wrap=tk.WORD, 
-                width=80, 
-                height=20,
-                font=('Courier', 10)
-            )
-            log_text.pack(expand=True, fill='both')
-
-            try:
-                with open(log_file_path, 'r', encoding='utf-8') as log_file:
-                    log_text.insert(tk.END, log_file.read())
-                log_text.config(state='disabled')  
-            except UnicodeDecodeError:
-                with open(log_file_path, 'r', encoding='latin-1') as log_file:
-                    log_text.insert(tk.END, log_file.read())
-                log_text.config(state='disabled')
+            regex_var = tk.BooleanVar(value=False)
+            tk.Checkbutton(search_frame, text="Regex", variable=regex_var).pack(side='left')
+
+            run_search = lambda: self.search_text(log_view, search_var.get(), regex_var.get(), status_var)
+            search_entry.bind("<Return>", lambda event: run_search())
+            tk.Button(search_frame, text="Find", command=run_search).pack(side='left')
+            tk.Button(search_frame, text="<", command=lambda: log_view.goto_match(-1)).pack(side='left')
+            tk.Button(search_frame, text=">", command=lambda: log_view.goto_match(1)).pack(side='left')
+            tk.Button(search_frame, text="Search Job Directory",
+                      command=lambda: self.search_job_directory(
+                          os.path.dirname(os.path.abspath(log_file_path)), search_var.get(), regex_var.get())
+                      ).pack(side='left', padx=5)
+            status_var = tk.StringVar()
+            tk.Label(search_frame, textvariable=status_var).pack(side='left', padx=5)
+
+            log_view = PagedLogViewer(frame, log_file_path)
+            log_view.pack(expand=True, fill='both')
+
+            if search_string:
+                run_search()
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open log file: {str(e)}")
 
-    def save_log_content(self, text_widget):
-        """Save the content of the text widget to a file."""
+    def save_log_file(self, log_file_path):
+        """Save a copy of the log file."""
         try:
             file_path = filedialog.asksaveasfilename(
                 defaultextension=".txt",
                 filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
             )
             if file_path:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(text_widget.get(1.0, tk.END))
+                shutil.copyfile(log_file_path, file_path)
                 messagebox.showinfo("Success", "File saved successfully!")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save file: {str(e)}")
 
-    def search_text(self, text_widget, search_string):
-        """Search for text in the text widget and highlight matches."""
-        text_widget.tag_remove('search', '1.0', tk.END)
-        if search_string:
-            pos = '1.0'
-            while True:
-                pos = text_widget.search(search_string, pos, tk.END, nocase=True)
-                if not pos:
-                    break
-                end_pos = f"{pos}+{len(search_string)}c"
-                text_widget.tag_add('search', pos, end_pos)
-                pos = end_pos
-            text_widget.tag_config('search', background='yellow')
+    def search_text(self, log_view, search_string, use_regex=False, status_var=None):
+        """Search the open log in the background and highlight matches as they arrive."""
+        previous = getattr(log_view, "search", None)
+        if previous is not None:
+            previous.cancel()
+        log_view.clear_matches()
+        if not search_string:
+            return
+
+        try:
+            search = LogSearch(search_string, [log_view.log_file_path], use_regex=use_regex).start()
+        except re.error as e:
+            messagebox.showerror("Error", f"Invalid search pattern: {e}")
+            return
+        log_view.search = search
+
+        def on_batch(path, batch):
+            first_batch = not log_view.match_starts
+            log_view.add_matches(batch)
+            if first_batch:
+                log_view.goto_match(1)
+            if status_var is not None:
+                status_var.set(f"{len(log_view.match_starts)} matches...")
+
+        def on_done():
+            if status_var is not None:
+                status_var.set(f"{len(log_view.match_starts)} matches")
+
+        self._poll_search(log_view, search, on_batch, on_done)
+
+    def search_job_directory(self, directory, search_string, use_regex=False):
+        """Search every log in a job directory and list the files that match."""
+        paths = job_log_files(directory)
+        if not search_string or not paths:
+            messagebox.showinfo("Search", "Nothing to search.")
+            return
+
+        try:
+            search = LogSearch(search_string, paths, use_regex=use_regex).start()
+        except re.error as e:
+            messagebox.showerror("Error", f"Invalid search pattern: {e}")
+            return
 
+        results_window = tk.Toplevel(self.parent)
+        results_window.title(f"Search '{search_string}' in {directory}")
+        results_window.geometry("500x300")
+        results_window.protocol("WM_DELETE_WINDOW", lambda: (search.cancel(), results_window.destroy()))
+
+        listbox = tk.Listbox(results_window, font=('Courier', 10))
+        listbox.pack(expand=True, fill='both', padx=5, pady=5)
+        status_var = tk.StringVar(value="Searching...")
+        tk.Label(results_window, textvariable=status_var).pack(pady=(0, 5))
+
+        rows = []
+
+        def show(path):
+            label = f"{search.match_counts[path]:>8}  {os.path.basename(path)}"
+            if path in rows:
+                listbox.delete(rows.index(path))
+                listbox.insert(rows.index(path), label)
+            else:
+                rows.append(path)
+                listbox.insert(tk.END, label)
+
+        def on_batch(path, batch):
+            show(path)
+
+        def on_done():
+            status_var.set(f"{sum(search.match_counts.values())} matches in {len(rows)} of {len(paths)} logs")
+
+        def open_selected(event):
+            selection = listbox.curselection()
+            if selection:
+                self.open_log_file(rows[selection[0]], search_string)
+
+        listbox.bind("<Double-Button-1>", open_selected)
+        self._poll_search(results_window, search, on_batch, on_done)
+
+    def _poll_search(self, widget, search, on_batch, on_done):
+        """Hand search results to the Tk thread until the search finishes."""
+        if search.is_cancelled() or getattr(widget, "search", search) is not search:
+            # A newer search replaced this one; its results must not mix in.
+            return
+        try:
+            while True:
+                path, batch = search.results.get_nowait()
+                if batch:
+                    on_batch(path, batch)
+        except queue.Empty:
+            pass
+        except tk.TclError:
+            # The window showing the results was closed.
+            search.cancel()
+            return
+
+        if search.is_running() or not search.results.empty():
+            widget.after(100, self._poll_search, widget, search, on_batch, on_done)
+        elif search.error is not None:
+            messagebox.showerror("Error", f"Search failed: {search.error}")
+        else:
+            on_done()
+
+    def load_molden_file(self):
+        """Ask for a Molden file and list its orbitals in the MO menu."""
+        molden_file_path = filedialog.askopenfilename(
+            title="Select Molden File",
+            filetypes=[("Molden files", "*.molden"), ("All files", "*.*")]
+        )
+        if molden_file_path:
+            self.molden_file_path = molden_file_path
+            self.fill_mo_menu()
+
+    def fill_mo_menu(self):
+        """Fill the MO menu from the MO headers of the current Molden file, by spin and energy."""
+        _, molden = self.parse_molden_file(self.molden_file_path)
+        if molden is None or not molden.n_mo:
+            messagebox.showerror("Error", "No MO data found in the Molden file.")
+            return
+
+        labels = molden.mo_labels()
+        order = np.lexsort((molden.mo_energies, molden.mo_spins))
+        self.mo_data = [labels[index] for index in order]
+        self.mo_indices = {labels[index]: int(index) for index in order}
+
+        menu = self.mo_menu["menu"]
+        menu.delete(0, tk.END)
+        for label in self.mo_data:
+            menu.add_command(label=label, command=lambda l=label: (self.mo_var.set(l), self.visualize_selected_mo(l)))
+        self.mo_var.set(f"Select MO ({molden.n_mo} in {Path(self.molden_file_path).name})")
 
     def visualize_selected_mo(self, selected_mo):
         """Visualize the selected molecular orbital using 3Dmol.js."""
@@ -158,79 +295,132 @@ class ResultsViewer:
                     messagebox.showwarning("Warning", "No Molden file selected.")
                     return
 
-            mo_index = int(selected_mo.split()[1]) - 1
-            xyz_data, mo_data = self.parse_molden_file(self.molden_file_path)
+            mo_index = self.mo_indices.get(selected_mo)
+            if mo_index is None:
+                mo_index = int(selected_mo.split()[1]) - 1
+            xyz_data, molden = self.parse_molden_file(self.molden_file_path)
 
-            if not xyz_data or not mo_data:
+            if not xyz_data or molden is None or not molden.n_mo:
                 messagebox.showerror("Error", "No atomic coordinates or MO data found in the Molden file.")
                 return
+            if mo_index >= molden.n_mo:
+                messagebox.showerror("Error", f"The Molden file has only {molden.n_mo} MOs.")
+                return
 
-            html_content = self.create_visualization_html(xyz_data, mo_data[mo_index])
+            molden_file_path = self.molden_file_path
+            title = f"{selected_mo} - {Path(molden_file_path).name}"
 
-            with tempfile.NamedTemporaryFile(
-                mode='w',
-                suffix='.html',
-                delete=False,
-                encoding='utf-8'
-            ) as temp_file:
-                temp_file.write(html_content)
-                self.temp_files.append(temp_file.name)
-                
-            webbrowser.open(f"file://{temp_file.name}")
+            def evaluate():
+                grid, values = self.mo_cache.cube(molden_file_path, mo_index)
+                return cube_text(molden, grid, values, f"MO {mo_index + 1} E={molden.mo_energies[mo_index]:.6f}")
+
+            self._run_in_background(
+                evaluate,
+                lambda cube_data: self._show_cube(xyz_data, cube_data, title),
+                "Failed to visualize molecular orbitals"
+            )
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to visualize molecular orbitals: {str(e)}")
 
+    def _show_cube(self, xyz_data, cube_data, title):
+        """Show an evaluated orbital in the viewer server or, without one, a temporary HTML page."""
+        if self.server is not None:
+            xyz_text = "\n".join([str(len(xyz_data)), "Molecular orbital"] + list(xyz_data))
+            self.server.show_cube(xyz_text, cube_data, title=title)
+            return
 
+        html_content = self.create_visualization_html(xyz_data, cube_data)
 
-    def parse_molden_file(self, molden_file_path):
-        """Parse atomic coordinates and MO data from the Molden file."""
+        with tempfile.NamedTemporaryFile(
+            mode='w',
+            suffix='.html',
+            delete=False,
+            encoding='utf-8'
+        ) as temp_file:
+            temp_file.write(html_content)
+            self.temp_files.append(temp_file.name)
+
+        webbrowser.open(f"file://{temp_file.name}")
+
+    def _run_in_background(self, work, on_done, error_message):
+        """Run `work` off the Tk thread and hand its result to `on_done` on the Tk thread."""
+        result = {}
+
+        def run():
+            try:
+                result["value"] = work()
+            except Exception as e:
+                result["error"] = e
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+
+        def poll():
+            if worker.is_alive():
+                self.parent.after(100, poll)
+            elif "error" in result:
+                messagebox.showerror("Error", f"{error_message}: {str(result['error'])}")
+            else:
+                on_done(result["value"])
+
+        self.parent.after(100, poll)
+
+    def export_frontier_orbitals(self, below=5, above=5):
+        """Write cube files for HOMO-`below` to LUMO+`above` of every spin in one batch."""
         try:
-            xyz_data = []
-            mo_data = []  
-            with open(molden_file_path, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
-
-            reading_atoms = False
-            reading_mos = False
-            for line in lines:
-                if "[Atoms]" in line:
-                    reading_atoms = True
-                    reading_mos = False
-                    continue
-                elif "[MO]" in line:
-                    reading_atoms = False
-                    reading_mos = True
-                    continue
-                elif line.strip() == "" or "[" in line:
-                    reading_atoms = False
-                    reading_mos = False
-
-                if reading_atoms:
-                    parts = line.split()
-                    if len(parts) >= 5:
-                        element = parts[0]
-                        x, y, z = map(float, parts[2:5])
-                        xyz_data.append(f"{element} {x:.6f} {y:.6f} {z:.6f}")
-                
-                if reading_mos:
-                    mo_data.append(line.strip())  
+            molden_file_path = getattr(self, 'molden_file_path', None) or filedialog.askopenfilename(
+                title="Select Molden File",
+                filetypes=[("Molden files", "*.molden"), ("All files", "*.*")]
+            )
+            if not molden_file_path:
+                return
+            self.molden_file_path = molden_file_path
 
-            return xyz_data, mo_data
+            directory = filedialog.askdirectory(title="Select Output Directory")
+            if not directory:
+                return
+
+            _, molden = self.parse_molden_file(molden_file_path)
+            if molden is None or not molden.n_mo:
+                messagebox.showerror("Error", "No MO data found in the Molden file.")
+                return
+
+            prefix = Path(molden_file_path).stem
+            mo_indices = molden.frontier_indices(below, above)
+            self._run_in_background(
+                lambda: write_mo_cubes(directory, molden, mo_indices, prefix),
+                lambda paths: messagebox.showinfo("Success", f"Wrote {len(paths)} cube files to {directory}"),
+                "Failed to export molecular orbitals"
+            )
+
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export molecular orbitals: {str(e)}")
+
+    def parse_molden_file(self, molden_file_path):
+        """Parse atomic coordinates and the MO index from the Molden file.
+
+        MO coefficients are not loaded here; fetch a single orbital with
+        `molden.load_mo(index)`. Parsed files are shared through the MO cache.
+        """
+        try:
+            molden = self.mo_cache.molden(molden_file_path)
+            return molden.xyz_lines(), molden
 
         except Exception as e:
             print(f"Error parsing Molden file: {e}")
             return None, None
 
-    def create_visualization_html(self, xyz_data, mo_data):
+    def create_visualization_html(self, xyz_data, cube_data, isovalue=0.02):
         """Create HTML content for molecular orbital visualization."""
+        xyz_text = "\n".join([str(len(xyz_data)), "Molecular orbital"] + list(xyz_data))
         return f"""
         <!DOCTYPE html>
         <html lang="en">
         <head>
             <meta charset="UTF-8">
             <title>Molecular Orbital Visualization</title>
-            <script src="https://3Dmol.org/build/3Dmol-min.js"></script>
+            {script_tag(self.js_mode)}
             <style>
                 body {{ margin: 0; padding: 0; }}
                 #viewer {{ width: 100vw; height: 100vh; }}
@@ -238,22 +428,25 @@ class ResultsViewer:
         </head>
         <body>
             <div id="viewer"></div>
+            {payload_tag("xyz_payload", xyz_text)}
+            {payload_tag("cube_payload", cube_data)}
             <script>
-                let viewer = $3Dmol.createViewer(document.getElementById("viewer"), {{
-                    backgroundColor: "white"
-                }});
-                
-                viewer.addModel({xyz_data}, "xyz");
-                viewer.setStyle({{"stick":{{}}}});
-                
-                viewer.addSurface($3Dmol.SurfaceType.VDW, {{
-                    opacity: 0.85,
-                    colorscheme: 'orangeCarbon',
-                    voldata: {mo_data}
-                }});
-
-                viewer.zoomTo();
-                viewer.render();
+                {PAYLOAD_DECODER}
+                (async function() {{
+                    let viewer = $3Dmol.createViewer(document.getElementById("viewer"), {{
+                        backgroundColor: "white"
+                    }});
+
+                    viewer.addModel(await openqpPayload("xyz_payload"), "xyz");
+                    viewer.setStyle({{"stick":{{}}}});
+
+                    let cube = await openqpPayload("cube_payload");
+                    viewer.addVolumetricData(cube, "cube", {{isoval: {isovalue}, color: "blue", opacity: 0.85}});
+                    viewer.addVolumetricData(cube, "cube", {{isoval: {-isovalue}, color: "red", opacity: 0.85}});
+
+                    viewer.zoomTo();
+                    viewer.render();
+                }})();
             </script>
         </body>
         </html>
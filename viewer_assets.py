@@ -0,0 +1,57 @@
+import base64
+import gzip
+import os
+import shutil
+from pathlib import Path
+
+BUNDLED_3DMOL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "3Dmol-min.js")
+REMOTE_3DMOL = "https://3Dmol.org/build/3Dmol-min.js"
+DEFAULT_ASSET_DIR = os.path.join(os.path.expanduser("~"), ".cache", "openqp_gui", "viewer")
+
+# Decodes a gzip+base64 payload embedded with `payload_tag` back into text.
+PAYLOAD_DECODER = """
+async function openqpPayload(id) {
+    const encoded = document.getElementById(id).textContent.trim();
+    const bytes = Uint8Array.from(atob(encoded), c => c.charCodeAt(0));
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+    return await new Response(stream).text();
+}
+"""
+
+
+def shared_3dmol_path(asset_dir=DEFAULT_ASSET_DIR):
+    """Path of the single cached copy of the bundled 3Dmol.js, refreshed if the bundle changes."""
+    os.makedirs(asset_dir, exist_ok=True)
+    target = os.path.join(asset_dir, "3Dmol-min.js")
+    if not os.path.exists(target) or os.path.getsize(target) != os.path.getsize(BUNDLED_3DMOL):
+        temporary = f"{target}.{os.getpid()}.tmp"
+        shutil.copyfile(BUNDLED_3DMOL, temporary)
+        os.replace(temporary, target)
+    return target
+
+
+def script_tag(mode="shared", asset_dir=DEFAULT_ASSET_DIR):
+    """<script> element loading 3Dmol.js.
+
+    "shared" points every page at one cached copy of the bundled file,
+    "inline" embeds it so the page is a single self-contained file and
+    "remote" loads it from 3Dmol.org.
+    """
+    if mode == "remote":
+        return f'<script src="{REMOTE_3DMOL}"></script>'
+    if mode == "inline":
+        with open(BUNDLED_3DMOL, 'r', encoding='utf-8') as js_file:
+            return f"<script>{js_file.read()}</script>"
+    if mode == "shared":
+        return f'<script src="{Path(shared_3dmol_path(asset_dir)).as_uri()}"></script>'
+    raise ValueError(f"Unknown 3Dmol mode: {mode}")
+
+
+def encode_payload(text):
+    """Gzip and base64-encode text for embedding in a page."""
+    return base64.b64encode(gzip.compress(text.encode('utf-8'), compresslevel=1)).decode('ascii')
+
+
+def payload_tag(element_id, text):
+    """Inert <script> block holding a compressed payload, read back with `openqpPayload(id)`."""
+    return f'<script type="application/octet-stream" id="{element_id}">{encode_payload(text)}</script>'
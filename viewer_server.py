@@ -0,0 +1,302 @@
+import gzip
+import itertools
+import json
+import queue
+import select
+import socket
+import threading
+import time
+import webbrowser
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from viewer_assets import BUNDLED_3DMOL
+
+VIEWER_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>OpenQP Viewer</title>
+    <script src="/3Dmol-min.js"></script>
+    <style>
+        body { margin: 0; padding: 0; }
+        #viewer { width: 100vw; height: 100vh; position: relative; }
+        #panel { position: absolute; top: 8px; left: 8px; z-index: 10; padding: 4px 8px;
+                 font: 13px sans-serif; background: rgba(255, 255, 255, 0.85); }
+    </style>
+</head>
+<body>
+    <div id="viewer"></div>
+    <div id="panel">
+        <div id="title">Waiting for data...</div>
+        <div id="frames" style="display: none">
+            <input id="slider" type="range" min="0" max="0" value="0">
+            <span id="frame_label"></span>
+        </div>
+    </div>
+    <script>
+        const viewer = $3Dmol.createViewer(document.getElementById("viewer"), {backgroundColor: "white"});
+        const slider = document.getElementById("slider");
+        let frames = [], labels = [], chain = Promise.resolve();
+
+        function draw(xyz, cube, isovalue, keepView) {
+            const view = keepView ? viewer.getView() : null;
+            viewer.clear();
+            if (xyz) {
+                viewer.addModel(xyz, "xyz");
+                viewer.setStyle({"stick": {}});
+            }
+            if (cube) {
+                viewer.addVolumetricData(cube, "cube", {isoval: isovalue, color: "blue", opacity: 0.85});
+                viewer.addVolumetricData(cube, "cube", {isoval: -isovalue, color: "red", opacity: 0.85});
+            }
+            if (view) viewer.setView(view); else viewer.zoomTo();
+            viewer.render();
+        }
+
+        function showFrame(index, keepView) {
+            slider.max = Math.max(0, frames.length - 1);
+            slider.value = index;
+            document.getElementById("frames").style.display = frames.length > 1 ? "" : "none";
+            document.getElementById("frame_label").textContent = labels[index] || "";
+            draw(frames[index], null, 0, keepView);
+        }
+
+        slider.addEventListener("input", () => showFrame(Number(slider.value), true));
+
+        // Events are applied strictly in order, even though scenes are fetched asynchronously.
+        function enqueue(handler) { chain = chain.then(handler).catch(error => console.error(error)); }
+
+        const events = new EventSource("/events");
+        events.addEventListener("scene", event => enqueue(async () => {
+            const scene = await (await fetch(JSON.parse(event.data).url)).json();
+            document.title = scene.title;
+            document.getElementById("title").textContent = scene.title;
+            frames = scene.frames || [];
+            labels = scene.labels || [];
+            if (scene.kind === "trajectory") {
+                showFrame(Math.max(0, frames.length - 1), false);
+            } else {
+                document.getElementById("frames").style.display = "none";
+                draw(scene.xyz, scene.cube, scene.isovalue, false);
+            }
+        }));
+        events.addEventListener("frame", event => enqueue(async () => {
+            const frame = JSON.parse(event.data);
+            const following = Number(slider.value) >= frames.length - 1;
+            frames.push(frame.xyz);
+            labels.push(frame.label);
+            if (following) showFrame(frames.length - 1, frames.length > 1);
+            else slider.max = frames.length - 1;
+        }));
+    </script>
+</body>
+</html>
+"""
+
+
+class ViewerServer:
+    """Localhost viewer that pushes scenes to one open browser tab.
+
+    The page subscribes to /events with Server-Sent Events. Each new scene
+    (geometry, trajectory or MO cube) is kept in memory as gzip-compressed
+    JSON under /data/<id> and announced on the stream, so the tab redraws in
+    place instead of a new HTML file being written and opened per click.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, keep_scenes=8, reopen_after=10.0):
+        self.host = host
+        self.port = port
+        self.keep_scenes = keep_scenes
+        self.reopen_after = reopen_after
+        self.httpd = None
+        self.thread = None
+        self._lock = threading.Lock()
+        # Event stream queues of connected tabs, with their sockets.
+        self._clients = {}
+        self._scenes = OrderedDict()
+        self._scene_ids = itertools.count(1)
+        self._current_scene = None
+        self._current_frames = []
+        self._browser_opened_at = None
+
+    def start(self):
+        handler = type("ViewerRequestHandler", (_ViewerRequestHandler,), {"viewer": self})
+        self.httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="viewer-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd is None:
+            return
+        with self._lock:
+            for client in self._clients:
+                client.put(None)
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.httpd = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    @property
+    def client_count(self):
+        with self._lock:
+            return len(self._clients)
+
+    def show_geometry(self, xyz_text, title="Molecule"):
+        self._publish_scene({"kind": "geometry", "title": title, "xyz": xyz_text})
+
+    def show_cube(self, xyz_text, cube_text, isovalue=0.02, title="Molecular orbital"):
+        self._publish_scene({"kind": "cube", "title": title, "xyz": xyz_text, "cube": cube_text,
+                             "isovalue": isovalue})
+
+    def show_trajectory(self, trajectory=None, title="Optimization trajectory"):
+        """Show every frame of an OptimizationTrajectory; with None, start an empty one for `append_frame`."""
+        frames = [] if trajectory is None else [trajectory.frame_xyz(i) for i in range(len(trajectory))]
+        self._publish_scene({"kind": "trajectory", "title": title, "frames": frames,
+                             "labels": [frame.split("\n", 2)[1] for frame in frames]})
+
+    def append_frame(self, xyz_text, label=None):
+        """Add one frame to the trajectory on screen, following it if the slider is at the end."""
+        if label is None:
+            lines = xyz_text.split("\n", 2)
+            label = lines[1] if len(lines) > 1 else ""
+        frame = {"xyz": xyz_text, "label": label}
+        with self._lock:
+            self._current_frames.append(frame)
+        self._broadcast("frame", frame)
+
+    def _publish_scene(self, scene):
+        payload = gzip.compress(json.dumps(scene).encode('utf-8'), compresslevel=1)
+        with self._lock:
+            scene_id = next(self._scene_ids)
+            self._scenes[scene_id] = payload
+            while len(self._scenes) > self.keep_scenes:
+                self._scenes.popitem(last=False)
+            self._current_scene = scene_id
+            self._current_frames = []
+        self._broadcast("scene", {"url": f"/data/{scene_id}"})
+        self._ensure_browser()
+
+    def _broadcast(self, event, data):
+        message = _sse_message(event, data)
+        with self._lock:
+            for client in self._clients:
+                client.put(message)
+
+    def _ensure_browser(self):
+        """Open the viewer tab unless one is connected or was opened moments ago.
+
+        A closed tab stays registered until its next write fails, so the
+        sockets are checked here and the streams of closed tabs are ended.
+        """
+        now = time.monotonic()
+        with self._lock:
+            closed = [client for client, connection in self._clients.items() if _peer_closed(connection)]
+            for client in closed:
+                del self._clients[client]
+                client.put(None)
+            if self._clients:
+                return
+            if self._browser_opened_at is not None and now - self._browser_opened_at < self.reopen_after:
+                return
+            self._browser_opened_at = now
+        webbrowser.open(self.url)
+
+    def _connect(self, connection):
+        """Register an event stream, primed with the current scene and its frames."""
+        client = queue.Queue()
+        with self._lock:
+            if self._current_scene is not None:
+                client.put(_sse_message("scene", {"url": f"/data/{self._current_scene}"}))
+                for frame in self._current_frames:
+                    client.put(_sse_message("frame", frame))
+            self._clients[client] = connection
+        return client
+
+    def _disconnect(self, client):
+        with self._lock:
+            self._clients.pop(client, None)
+
+    def _scene_payload(self, scene_id):
+        with self._lock:
+            return self._scenes.get(scene_id)
+
+
+def _peer_closed(connection):
+    """Whether the browser has closed an event stream; it never sends on one, so readable means EOF."""
+    try:
+        readable, _, _ = select.select([connection], [], [], 0)
+        return bool(readable) and not connection.recv(1, socket.MSG_PEEK)
+    except (OSError, ValueError):
+        return True
+
+
+def _sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+class _ViewerRequestHandler(BaseHTTPRequestHandler):
+    viewer = None  # set on the per-server subclass
+    keepalive_interval = 15.0
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/":
+            self._send(VIEWER_PAGE.encode('utf-8'), "text/html; charset=utf-8")
+        elif path == "/3Dmol-min.js":
+            with open(BUNDLED_3DMOL, 'rb') as js_file:
+                self._send(js_file.read(), "application/javascript", cache=True)
+        elif path.startswith("/data/"):
+            try:
+                payload = self.viewer._scene_payload(int(path[len("/data/"):]))
+            except ValueError:
+                payload = None
+            if payload is None:
+                self.send_error(404)
+            else:
+                self._send(payload, "application/json", encoding="gzip")
+        elif path == "/events":
+            self._stream_events()
+        else:
+            self.send_error(404)
+
+    def _send(self, body, content_type, cache=False, encoding=None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "max-age=86400" if cache else "no-store")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        client = self.viewer._connect(self.connection)
+        try:
+            while True:
+                try:
+                    message = client.get(timeout=self.keepalive_interval)
+                except queue.Empty:
+                    # Comment lines keep the stream open and reveal closed tabs.
+                    message = b": keepalive\n\n"
+                if message is None:
+                    break
+                self.wfile.write(message)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.viewer._disconnect(client)
+
+    def log_message(self, format, *args):
+        pass